@@ -1,5 +1,36 @@
+import subprocess
+from collections import deque
+
 from graphviz import Digraph
 
+
+def dot_id(name):
+    return '"' + str(name).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def symbol_ranges(symbols):
+    # "a,b,c,d,x" -> "a-d,x": runs of three or more consecutive characters become ranges
+    symbols = sorted(symbols, key=lambda symbol: (len(symbol) != 1, symbol))
+    parts = []
+    i = 0
+    while i < len(symbols):
+        j = i
+        if len(symbols[i]) == 1:
+            while (j + 1 < len(symbols) and len(symbols[j + 1]) == 1 and
+                   ord(symbols[j + 1]) == ord(symbols[j]) + 1):
+                j += 1
+        parts.append(f"{symbols[i]}-{symbols[j]}" if j - i >= 2 else ','.join(symbols[i:j + 1]))
+        i = j + 1
+    return ','.join(parts)
+
+
+def render_dot(path, format="png", output=None):
+    # Runs Graphviz in a background process and returns the Popen; call
+    # wait() on it when the image is needed
+    output = output or f"{path.rsplit('.', 1)[0]}.{format}"
+    return subprocess.Popen(["dot", f"-T{format}", path, "-o", output])
+
+
 class FiniteAutomaton:
     def __init__(self, q, sigma, delta, q0, f):
         self.q = q
@@ -85,3 +116,92 @@ class FiniteAutomaton:
 
         dot.render(filename, format="png", cleanup=False)
         print(f"Automaton visualization saved as {filename}.png")
+
+    def to_dfa(self):
+        # convert_ndfa_to_dfa as a FiniteAutomaton
+        dfa_transitions, dfa_states = self.convert_ndfa_to_dfa()
+        delta = {}
+        for (state, symbol), next_state in dfa_transitions.items():
+            delta.setdefault(state, {})[symbol] = {next_state}
+        f = {name for subset, name in dfa_states.items() if subset & set(self.f)}
+        return FiniteAutomaton(set(dfa_states.values()), set(self.sigma), delta, "q0", f)
+
+    def neighbourhood(self, state, radius=1):
+        # States at most `radius` transitions away from state, in either direction
+        incoming = {}
+        for source, transitions in self.delta.items():
+            for next_states in transitions.values():
+                for target in next_states:
+                    incoming.setdefault(target, set()).add(source)
+
+        found = {state}
+        frontier = [state]
+        for _ in range(radius):
+            next_frontier = []
+            for current in frontier:
+                neighbours = set(incoming.get(current, ()))
+                for next_states in self.delta.get(current, {}).values():
+                    neighbours.update(next_states)
+                for neighbour in neighbours - found:
+                    found.add(neighbour)
+                    next_frontier.append(neighbour)
+            frontier = next_frontier
+        return found
+
+    def write_dot(self, out, states=None, max_states=None):
+        # Streams DOT text to a file-like object, one line per state and one
+        # edge per (state, target) pair with all its symbols merged into a
+        # single label. states limits the output to a subset, e.g. a
+        # neighbourhood(); max_states keeps only the first states found
+        # breadth-first from q0 (or from any kept state, if q0 is left out).
+        keep = set(self.q) if states is None else set(states)
+        if max_states is not None and len(keep) > max_states:
+            keep = self._first_states(keep, max_states)
+
+        write = out.write
+        write("digraph {\n")
+        write('    rankdir=LR size="8"\n')
+        write("    node [shape=circle]\n")
+        if self.q0 in keep:
+            write('    "start" [shape=none label=""]\n')
+            write(f'    "start" -> {dot_id(self.q0)}\n')
+
+        for state in sorted(keep):
+            shape = "doublecircle" if state in self.f else "circle"
+            write(f"    {dot_id(state)} [shape={shape}]\n")
+
+        for state, transitions in self.delta.items():
+            if state not in keep:
+                continue
+            merged = {}
+            for symbol, next_states in transitions.items():
+                for next_state in next_states:
+                    if next_state in keep:
+                        merged.setdefault(next_state, []).append(symbol)
+            for next_state in sorted(merged):
+                label = dot_id(symbol_ranges(merged[next_state]))
+                write(f"    {dot_id(state)} -> {dot_id(next_state)} [label={label} arrowsize=0.7]\n")
+        write("}\n")
+
+    def _first_states(self, keep, limit):
+        start = self.q0 if self.q0 in keep else min(keep)
+        found = {start}
+        queue = deque([start])
+        while queue and len(found) < limit:
+            state = queue.popleft()
+            for symbol in sorted(self.delta.get(state, {})):
+                for next_state in sorted(self.delta[state][symbol]):
+                    if next_state in keep and next_state not in found and len(found) < limit:
+                        found.add(next_state)
+                        queue.append(next_state)
+        return found
+
+    def export_dot(self, filename="finite_automaton", states=None, max_states=None, render=False, format="png"):
+        # Writes filename.dot without building a Digraph; with render=True,
+        # Graphviz runs in the background and its Popen is returned
+        path = f"{filename}.dot"
+        with open(path, "w", encoding="utf-8") as out:
+            self.write_dot(out, states, max_states)
+        if render:
+            return render_dot(path, format)
+        return None
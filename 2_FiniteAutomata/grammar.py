@@ -1,26 +1,54 @@
+import itertools
 import random
+import string
 from finite_automaton import FiniteAutomaton
 
+def nonterminal_names():
+    # S, then the other capital letters, then A1, B1, ..., Z1, A2, ... without end
+    letters = [c for c in string.ascii_uppercase if c != 'S']
+    yield 'S'
+    yield from letters
+    for number in itertools.count(1):
+        for letter in letters:
+            yield f"{letter}{number}"
+
+
 class Grammar:
-    def __init__(self):
-        self.vn = {'S', 'A', 'B', 'C'}
-        self.vt = {'a', 'b'}
-        self.p = {
+    def __init__(self, vn=None, vt=None, p=None, start_symbol=None):
+        # Without arguments, the grammar of the Lab 1 variant
+        self.vn = vn if vn is not None else {'S', 'A', 'B', 'C'}
+        self.vt = vt if vt is not None else {'a', 'b'}
+        self.p = p if p is not None else {
             'S': ['aA'],
             'A': ['bS', 'aB'],
             'B': ['bC', 'aB'],
             'C': ['aA', 'b']
         }
-        self.start_symbol = 'S'
+        self.start_symbol = start_symbol if start_symbol is not None else 'S'
+
+    def split_symbols(self, text, known=None):
+        # Non-terminals such as A1 are longer than one character, so a
+        # production is split by matching the longest known symbol first
+        if known is None:
+            known = sorted(self.vn | self.vt, key=len, reverse=True)
+        symbols = []
+        i = 0
+        while i < len(text):
+            symbol = next((s for s in known if text.startswith(s, i)), text[i])
+            symbols.append(symbol)
+            i += len(symbol)
+        return symbols
 
     def generate_string(self):
-        string = self.start_symbol
-        while any(v in string for v in self.vn):
-            for v in string:
-                if v in self.vn:
-                    string = string.replace(v, random.choice(self.p[v]), 1)
-                    break
-        return string
+        known = sorted(self.vn | self.vt, key=len, reverse=True)
+        symbols = [self.start_symbol]
+        while True:
+            index = next((i for i, v in enumerate(symbols) if v in self.vn), None)
+            if index is None:
+                break
+            rule = random.choice(self.p[symbols[index]])
+            symbols[index:index + 1] = [] if rule == 'ε' else self.split_symbols(rule, known)
+        return ''.join(symbols)
 
     def classify_chomsky(self):
         is_type_3 = True  # Regular grammar
@@ -28,13 +56,16 @@ class Grammar:
         is_type_1 = True  # Context-sensitive grammar
         is_type_0 = True  # Unrestricted grammar (default)
 
+        known = sorted(self.vn | self.vt, key=len, reverse=True)
         for left, right_rules in self.p.items():
+            left_symbols = self.split_symbols(left, known)
             for right in right_rules:
-                if len(left) > len(right):  # Context-sensitive check
+                right_symbols = self.split_symbols(right, known)
+                if len(left_symbols) > len(right_symbols):  # Context-sensitive check
                     is_type_1 = False
-                if len(left) > 1 or not left.isupper():  # Context-free check
+                if len(left_symbols) > 1 or left not in self.vn:  # Context-free check
                     is_type_2 = False
-                if len(right) > 2 or (len(right) == 2 and not right[0].islower()):
+                if len(right_symbols) > 2 or (len(right_symbols) == 2 and right_symbols[0] not in self.vt):
                     is_type_3 = False  # Regular grammar check
 
         if is_type_3:
@@ -47,55 +78,86 @@ class Grammar:
             return "Type 0: Unrestricted Grammar"
 
     def to_finite_automaton(self):
-        q = self.vn
+        # 'aB' moves to B on a, 'a' moves to an extra final state, and 'ε'
+        # makes its left-hand side final; names may be longer than one letter
+        q = set(self.vn)
         sigma = self.vt
         q0 = self.start_symbol
         delta = {}
+        f = set()
 
-        for key in self.p.keys():
+        final_state = next(name for name in nonterminal_names() if name not in q)
+
+        for key, rules in self.p.items():
             if key not in delta:
                 delta[key] = {}
 
-            for rule in self.p[key]:
+            for rule in rules:
+                if rule == 'ε':
+                    f.add(key)
+                    continue
+
                 symbol = rule[0]
-                next_state = rule[1] if len(rule) > 1 else None
+                next_state = rule[1:]
+                if not next_state:
+                    next_state = final_state
+                    q.add(final_state)
+                    f.add(final_state)
 
                 if symbol not in delta[key]:
                     delta[key][symbol] = set()
                 delta[key][symbol].add(next_state)
 
-        f = {key for key in self.p if all(rule in self.vt for rule in self.p[key])}
-        f.add('C')
-
         return FiniteAutomaton(q, sigma, delta, q0, f)
+
     def finite_automaton_to_grammar(self, fa):
         grammar_rules = {}
-
-        states = sorted(fa.q)
-        state_mapping = {}
-
-        if len(states) >= 1:
-            state_mapping[states[0]] = 'S'
-        if len(states) >= 2:
-            state_mapping[states[1]] = 'A'
-        if len(states) >= 3:
-            state_mapping[states[2]] = 'B'
-        if len(states) >= 4:
-            state_mapping[states[3]] = 'C'
-
-        for state in states:
-            new_state_name = state_mapping.get(state, "")
-            if new_state_name:
-                grammar_rules[new_state_name] = []
-
-                #add ε-production if the state is final
-                if state in fa.f:
-                    grammar_rules[new_state_name].append("ε")
-
-                #transitions as grammar rules
-                if state in fa.delta:
-                    for symbol, next_states in fa.delta[state].items():
-                        for next_state in next_states:
-                            mapped_next_state = state_mapping.get(next_state, "")
-                            grammar_rules[new_state_name].append(symbol + mapped_next_state)
-        return grammar_rules
\ No newline at end of file
+        for left, right in self.finite_automaton_rules(fa):
+            if left not in grammar_rules:
+                grammar_rules[left] = []
+            grammar_rules[left].append(right)
+        return grammar_rules
+
+    def name_states(self, fa):
+        # The start state becomes S, the others get generated names in sorted order
+        generated = nonterminal_names()
+        names = {fa.q0: next(generated)}
+        for state in sorted(fa.q):
+            if state not in names:
+                names[state] = next(generated)
+        return names
+
+    def finite_automaton_rules(self, fa, names=None):
+        # Yields (non-terminal, production) pairs in one pass over fa.delta, so
+        # automata with any number of states can be written out rule by rule.
+        # names maps states to non-terminals (integer ids work too).
+        if names is None:
+            names = self.name_states(fa)
+
+        for state, transitions in fa.delta.items():
+            left = names[state]
+
+            #add ε-production if the state is final
+            if state in fa.f:
+                yield left, "ε"
+
+            #transitions as grammar rules
+            for symbol, next_states in transitions.items():
+                for next_state in sorted(next_states):
+                    yield left, f"{symbol}{names[next_state]}"
+
+        # Final states without transitions still need their ε-production
+        for state in sorted(fa.f):
+            if state not in fa.delta:
+                yield names[state], "ε"
+
+    def from_finite_automaton(self, fa, names=None):
+        # The same conversion, as a new Grammar
+        if names is None:
+            names = self.name_states(fa)
+        p = {}
+        for left, right in self.finite_automaton_rules(fa, names):
+            if left not in p:
+                p[left] = []
+            p[left].append(right)
+        return Grammar(set(names.values()), set(fa.sigma), p, names[fa.q0])
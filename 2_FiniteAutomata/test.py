@@ -0,0 +1,153 @@
+import io
+import os
+import random
+import re
+import tempfile
+import unittest
+
+from grammar import Grammar
+from finite_automaton import FiniteAutomaton, symbol_ranges
+
+
+def random_automaton(state_count, rng, alphabet='abc'):
+    # A random DFA with states q0..qN
+    states = [f"q{i}" for i in range(state_count)]
+    delta = {}
+    for state in states:
+        transitions = {symbol: {rng.choice(states)} for symbol in alphabet if rng.random() < 0.8}
+        if transitions:
+            delta[state] = transitions
+    final = {state for state in states if rng.random() < 0.3}
+    return FiniteAutomaton(set(states), set(alphabet), delta, 'q0', final)
+
+
+class TestGrammar(unittest.TestCase):
+    def test_variant_automaton_to_grammar(self):
+        fa = FiniteAutomaton(
+            {"q0", "q1", "q2", "q3"}, {"a", "b", "c"},
+            {"q0": {"a": {"q0", "q1"}, "b": {"q2"}},
+             "q1": {"a": {"q1"}, "b": {"q3"}, "c": {"q2"}},
+             "q2": {"b": {"q3"}}},
+            "q0", {"q3"})
+        rules = Grammar().finite_automaton_to_grammar(fa)
+        self.assertEqual(rules, {'S': ['aS', 'aA', 'bB'], 'A': ['aA', 'bC', 'cB'], 'B': ['bC'], 'C': ['ε']})
+
+    def test_names_beyond_the_alphabet(self):
+        fa = random_automaton(2000, random.Random(1))
+        names = Grammar().name_states(fa)
+        self.assertEqual(names['q0'], 'S')
+        self.assertEqual(len(set(names.values())), 2000)
+        self.assertTrue(all(len(rule) >= 2 or rule == 'ε'
+                            for _, rule in Grammar().finite_automaton_rules(fa)))
+
+    def test_round_trip_large_automata(self):
+        rng = random.Random(2)
+        for state_count in (5, 300, 3000):
+            fa = random_automaton(state_count, rng)
+            grammar = Grammar().from_finite_automaton(fa)
+            back = grammar.to_finite_automaton()
+
+            names = Grammar().name_states(fa)
+            self.assertEqual(back.q0, 'S')
+            self.assertEqual(back.f, {names[state] for state in fa.f})
+            expected = {names[state]: {symbol: {names[t] for t in targets} for symbol, targets in moves.items()}
+                        for state, moves in fa.delta.items()}
+            self.assertEqual({state: moves for state, moves in back.delta.items() if moves}, expected)
+
+            for _ in range(200):
+                word = ''.join(rng.choice('abc') for _ in range(rng.randint(0, 30)))
+                self.assertEqual(back.string_belongs_to_language(word), fa.string_belongs_to_language(word))
+
+    def test_integer_ids(self):
+        fa = random_automaton(50, random.Random(3))
+        ids = {state: index for index, state in enumerate(sorted(fa.q))}
+        rules = list(Grammar().finite_automaton_rules(fa, ids))
+        self.assertTrue(all(isinstance(left, int) for left, _ in rules))
+        for left, rule in rules:
+            if rule != 'ε':
+                self.assertIn(int(rule[1:]), ids.values())
+
+    def test_terminal_only_productions(self):
+        # S -> aA, A -> bS | aB, B -> bC | aB, C -> aA | b
+        fa = Grammar().to_finite_automaton()
+        self.assertTrue(fa.string_belongs_to_language('aabb'))
+        self.assertTrue(fa.string_belongs_to_language('abaabb'))
+        self.assertFalse(fa.string_belongs_to_language('aab'))
+        self.assertFalse(fa.string_belongs_to_language('ab'))
+
+    def test_many_states_generate_and_classify(self):
+        # q0 -a-> q1 -a-> ... -> q39, each with a b self-loop; q39 is final
+        states = [f"q{i}" for i in range(40)]
+        delta = {state: {'a': {states[i + 1]}, 'b': {state}} for i, state in enumerate(states[:-1])}
+        fa = FiniteAutomaton(set(states), {'a', 'b'}, delta, 'q0', {'q39'})
+        grammar = Grammar().from_finite_automaton(fa)
+        self.assertTrue(any(len(name) > 1 for name in grammar.vn))
+        self.assertEqual(grammar.classify_chomsky(), "Type 3: Regular Grammar")
+
+        random.seed(9)
+        for _ in range(20):
+            word = grammar.generate_string()
+            self.assertEqual(word.count('a'), 39)
+            self.assertTrue(fa.string_belongs_to_language(word))
+
+        back = grammar.to_finite_automaton()
+        self.assertTrue(back.string_belongs_to_language('a' * 39))
+        self.assertFalse(back.string_belongs_to_language('a' * 38))
+
+
+class TestDotExport(unittest.TestCase):
+    def dot_edges(self, fa, states=None, max_states=None):
+        out = io.StringIO()
+        fa.write_dot(out, states, max_states)
+        return re.findall(r'"(\w+)" -> "(\w+)" \[label="([^"]*)"', out.getvalue())
+
+    def test_symbol_ranges(self):
+        self.assertEqual(symbol_ranges(['c', 'a', 'b', 'd', 'x', 'z']), 'a-d,x,z')
+        self.assertEqual(symbol_ranges(['a', 'b']), 'a,b')
+        self.assertEqual(symbol_ranges(['ab', 'a']), 'a,ab')
+
+    def test_parallel_edges_are_merged(self):
+        fa = random_automaton(300, random.Random(4), alphabet='abcdef')
+        edges = self.dot_edges(fa)
+        pairs = {(state, target) for state, moves in fa.delta.items()
+                 for targets in moves.values() for target in targets}
+        self.assertEqual(len(edges), len(pairs))
+        self.assertEqual({(state, target) for state, target, _ in edges}, pairs)
+
+    def test_neighbourhood(self):
+        fa = random_automaton(200, random.Random(5))
+        state = sorted(fa.q)[10]
+        near = fa.neighbourhood(state, 1)
+        self.assertIn(state, near)
+        self.assertLessEqual(near, fa.neighbourhood(state, 2))
+        for source, target, _ in self.dot_edges(fa, near):
+            self.assertIn(source, near)
+            self.assertIn(target, near)
+
+    def test_max_states(self):
+        fa = random_automaton(500, random.Random(6))
+        edges = self.dot_edges(fa, max_states=20)
+        self.assertLessEqual(len({state for edge in edges for state in edge[:2]}), 20)
+
+    def test_export_to_file(self):
+        fa = Grammar().to_finite_automaton().to_dfa()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'dfa')
+            self.assertIsNone(fa.export_dot(path))
+            with open(path + '.dot', encoding='utf-8') as file:
+                text = file.read()
+        self.assertTrue(text.startswith('digraph {'))
+        self.assertIn('"start" -> "q0"', text)
+
+    def test_to_dfa(self):
+        fa = random_automaton(40, random.Random(7))
+        dfa = fa.to_dfa()
+        self.assertTrue(dfa.is_deterministic())
+        rng = random.Random(8)
+        for _ in range(300):
+            word = ''.join(rng.choice('abc') for _ in range(rng.randint(0, 20)))
+            self.assertEqual(dfa.string_belongs_to_language(word), fa.string_belongs_to_language(word))
+
+
+if __name__ == '__main__':
+    unittest.main()
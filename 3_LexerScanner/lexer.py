@@ -1,9 +1,14 @@
 from tokenizer import Tokenizer, TokenType
 
+# Shared by every Lexer; add a name here to recognise a new function
+FUNCTIONS = {"sin", "cos", "tan", "cot", "exp", "sqrt"}
+
 
 class Lexer:
-    def __init__(self, text):
+    def __init__(self, text, symbols=None):
         self.text = text
+        # Maps each identifier to its first occurrence so repeats share one string
+        self.symbols = symbols if symbols is not None else {}
         self.pos = 0
         self.current_char = self.set_current_char()
 
@@ -43,17 +48,25 @@ class Lexer:
         return Tokenizer(TokenType.NUMBER, float(result) if "." in result else int(result))
 
     def identifier(self):
-        result = ""
+        start = self.pos
         while self.current_char is not None and (self.current_char.isalnum() or self.current_char == "_"):
-            result += self.current_char
             self.advance()
 
-        if result in {"sin", "cos", "tan", "cot", "exp", "sqrt"}:
+        name = self.text[start:self.pos]
+        result = self.symbols.setdefault(name, name)
+        if result in FUNCTIONS:
             return Tokenizer(TokenType.FUNCTION, result)
         return Tokenizer(TokenType.IDENTIFIER, result)
 
     def get_next_token(self):
         """Lexical analyzer (scanner/tokenizer)"""
+        self.skip_whitespace()
+        start = self.pos
+        token = self.scan_token()
+        token.start, token.end, token.source = start, self.pos, self.text
+        return token
+
+    def scan_token(self):
         while self.current_char is not None:
             if self.current_char.isspace():
                 self.skip_whitespace()
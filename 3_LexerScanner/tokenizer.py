@@ -21,9 +21,25 @@ class TokenType(str, Enum):
 
 
 class Tokenizer:
-    def __init__(self, type, value):
+    __slots__ = ("type", "value", "start", "end", "source")
+
+    def __init__(self, type, value, start=None, end=None, source=None):
         self.type = type
         self.value = value
+        self.start = start  # offset of the first character in the source
+        self.end = end  # offset just past the last character
+        self.source = source
+
+    @property
+    def span(self):
+        return self.start, self.end
+
+    @property
+    def text(self):
+        # Sliced from the source on demand instead of being stored per token
+        if self.source is None or self.start is None:
+            return None if self.value is None else str(self.value)
+        return self.source[self.start:self.end]
 
     def __str__(self):
         return f"Token({self.type}, {self.value})"
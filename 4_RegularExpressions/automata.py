@@ -0,0 +1,298 @@
+from regex_parser import parse_regex, Literal, CharClass, Empty, Concat, Alternation, Repeat
+
+
+class NFA:
+    # States are integers; transitions[s] holds (char, target) pairs and
+    # epsilons[s] the targets reachable without reading anything
+    def __init__(self):
+        self.transitions = []
+        self.epsilons = []
+        self.start = None
+        self.accepting = set()
+
+    def __len__(self):
+        return len(self.transitions)
+
+    def add_state(self):
+        self.transitions.append([])
+        self.epsilons.append([])
+        return len(self.transitions) - 1
+
+    def add_transition(self, source, char, target):
+        self.transitions[source].append((char, target))
+
+    def add_epsilon(self, source, target):
+        self.epsilons[source].append(target)
+
+    def closure(self, states):
+        result = set(states)
+        stack = list(states)
+        epsilons = self.epsilons
+        while stack:
+            for target in epsilons[stack.pop()]:
+                if target not in result:
+                    result.add(target)
+                    stack.append(target)
+        return frozenset(result)
+
+    @classmethod
+    def from_regex(cls, expr):
+        # Thompson construction from a pattern string or an already parsed AST
+        node = parse_regex(expr) if isinstance(expr, str) else expr
+        nfa = cls()
+        start, end = ThompsonBuilder(nfa).build(node)
+        nfa.start = start
+        nfa.accepting = {end}
+        return nfa
+
+    @classmethod
+    def from_finite_automaton(cls, automaton):
+        # Any object shaped like the Lab 2 FiniteAutomaton: q, delta, q0, f,
+        # with delta[state][symbol] a set of states
+        nfa = cls()
+        ids = {}
+        for state in sorted(automaton.q):
+            ids[state] = nfa.add_state()
+        for state, moves in automaton.delta.items():
+            for symbol, targets in moves.items():
+                for target in targets:
+                    nfa.add_transition(ids[state], symbol, ids[target])
+        nfa.start = ids[automaton.q0]
+        nfa.accepting = {ids[state] for state in automaton.f}
+        return nfa
+
+
+class ThompsonBuilder:
+    # Each subexpression becomes a fragment with one entry and one exit state
+    def __init__(self, nfa):
+        self.nfa = nfa
+
+    def build(self, node):
+        nfa = self.nfa
+        if isinstance(node, Literal):
+            start, end = nfa.add_state(), nfa.add_state()
+            nfa.add_transition(start, node.char, end)
+            return start, end
+
+        if isinstance(node, CharClass):
+            start, end = nfa.add_state(), nfa.add_state()
+            for char in node.chars:
+                nfa.add_transition(start, char, end)
+            return start, end
+
+        if isinstance(node, Empty):
+            start, end = nfa.add_state(), nfa.add_state()
+            nfa.add_epsilon(start, end)
+            return start, end
+
+        if isinstance(node, Concat):
+            return self.chain([lambda item=item: self.build(item) for item in node.items])
+
+        if isinstance(node, Alternation):
+            start, end = nfa.add_state(), nfa.add_state()
+            for option in node.options:
+                option_start, option_end = self.build(option)
+                nfa.add_epsilon(start, option_start)
+                nfa.add_epsilon(option_end, end)
+            return start, end
+
+        if isinstance(node, Repeat):
+            # x{m,n} is m copies of x followed by n - m optional copies;
+            # x{m,} ends in a starred copy instead
+            pieces = [lambda: self.build(node.node)] * node.min_count
+            if node.max_count is None:
+                pieces.append(lambda: self.star(node.node))
+            else:
+                pieces.extend([lambda: self.optional(node.node)] * (node.max_count - node.min_count))
+            if not pieces:
+                return self.build(Empty())
+            return self.chain(pieces)
+
+        raise ValueError(f"Unsupported regex node: {node.__class__.__name__}")
+
+    def chain(self, builders):
+        start, end = builders[0]()
+        for builder in builders[1:]:
+            next_start, next_end = builder()
+            self.nfa.add_epsilon(end, next_start)
+            end = next_end
+        return start, end
+
+    def star(self, node):
+        nfa = self.nfa
+        start, end = nfa.add_state(), nfa.add_state()
+        inner_start, inner_end = self.build(node)
+        nfa.add_epsilon(start, inner_start)
+        nfa.add_epsilon(start, end)
+        nfa.add_epsilon(inner_end, inner_start)
+        nfa.add_epsilon(inner_end, end)
+        return start, end
+
+    def optional(self, node):
+        start, end = self.build(node)
+        self.nfa.add_epsilon(start, end)
+        return start, end
+
+
+class DFA:
+    # States are integers 0..n-1; transitions[s] maps a character to the next
+    # state, and a missing entry means the input is rejected
+    def __init__(self, transitions, start, accepting):
+        self.transitions = transitions
+        self.start = start
+        self.accepting = frozenset(accepting)
+
+    def __len__(self):
+        return len(self.transitions)
+
+    @property
+    def alphabet(self):
+        chars = set()
+        for moves in self.transitions:
+            chars.update(moves)
+        return chars
+
+    def match(self, string):
+        # One dictionary lookup per character, no backtracking
+        transitions = self.transitions
+        state = self.start
+        for char in string:
+            state = transitions[state].get(char)
+            if state is None:
+                return False
+        return state in self.accepting
+
+    def match_many(self, strings):
+        # Yields one bool per input string
+        transitions = self.transitions
+        start = self.start
+        accepting = self.accepting
+        for string in strings:
+            state = start
+            for char in string:
+                state = transitions[state].get(char)
+                if state is None:
+                    break
+            yield state is not None and state in accepting
+
+    @classmethod
+    def from_nfa(cls, nfa):
+        # Subset construction; every DFA state is the epsilon closure of a set of NFA states
+        start = nfa.closure([nfa.start])
+        ids = {start: 0}
+        sets = [start]
+        transitions = []
+
+        for current in sets:
+            moves = {}
+            for state in current:
+                for char, target in nfa.transitions[state]:
+                    moves.setdefault(char, set()).add(target)
+
+            row = {}
+            for char, targets in moves.items():
+                target_set = nfa.closure(targets)
+                target = ids.get(target_set)
+                if target is None:
+                    target = ids[target_set] = len(sets)
+                    sets.append(target_set)
+                row[char] = target
+            transitions.append(row)
+
+        accepting = {ids[s] for s in sets if not s.isdisjoint(nfa.accepting)}
+        return cls(transitions, 0, accepting)
+
+    @classmethod
+    def from_regex(cls, expr):
+        # parse -> Thompson NFA -> subset construction -> minimization
+        return cls.from_nfa(NFA.from_regex(expr)).minimize()
+
+    @classmethod
+    def from_finite_automaton(cls, automaton):
+        return cls.from_nfa(NFA.from_finite_automaton(automaton)).minimize()
+
+    def minimize(self):
+        # Hopcroft's partition refinement over the DFA completed with a dead state
+        count = len(self.transitions)
+        dead = count
+        alphabet = sorted(self.alphabet)
+
+        inverse = {char: [[] for _ in range(count + 1)] for char in alphabet}
+        for state, moves in enumerate(self.transitions):
+            for char in alphabet:
+                inverse[char][moves.get(char, dead)].append(state)
+        for char in alphabet:
+            inverse[char][dead].append(dead)
+
+        accepting = set(self.accepting)
+        rejecting = set(range(count + 1)) - accepting
+        blocks = [block for block in (accepting, rejecting) if block]
+        block_of = [0] * (count + 1)
+        for index, block in enumerate(blocks):
+            for state in block:
+                block_of[state] = index
+        waiting = set(range(len(blocks)))
+
+        while waiting:
+            splitter = list(blocks[waiting.pop()])
+            for char in alphabet:
+                predecessors = inverse[char]
+                touched = {}
+                for state in splitter:
+                    for source in predecessors[state]:
+                        touched.setdefault(block_of[source], set()).add(source)
+
+                for index, inside in touched.items():
+                    block = blocks[index]
+                    if len(inside) == len(block):
+                        continue
+                    block -= inside
+                    new_index = len(blocks)
+                    blocks.append(inside)
+                    for state in inside:
+                        block_of[state] = new_index
+                    if index in waiting or len(inside) <= len(block):
+                        waiting.add(new_index)
+                    else:
+                        waiting.add(index)
+
+        dead_block = block_of[dead]
+        if block_of[self.start] == dead_block:
+            # The language is empty: a single rejecting state
+            return DFA([{}], 0, ())
+
+        # Number the blocks in breadth-first order from the start, leaving out
+        # the block of the dead state
+        numbering = {block_of[self.start]: 0}
+        order = [block_of[self.start]]
+        transitions = []
+        for index in order:
+            representative = next(iter(blocks[index]))
+            row = {}
+            for char, target in sorted(self.transitions[representative].items()):
+                target_block = block_of[target]
+                if target_block == dead_block:
+                    continue
+                if target_block not in numbering:
+                    numbering[target_block] = len(order)
+                    order.append(target_block)
+                row[char] = numbering[target_block]
+            transitions.append(row)
+
+        accepting = {numbering[index] for index in numbering if blocks[index] & self.accepting}
+        return DFA(transitions, 0, accepting)
+
+    def to_finite_automaton(self, automaton_class):
+        # Builds an instance of the Lab 2 FiniteAutomaton (or anything with the
+        # same constructor) with states named q0, q1, ...
+        names = [f"q{state}" for state in range(len(self.transitions))]
+        delta = {}
+        for state, moves in enumerate(self.transitions):
+            if moves:
+                delta[names[state]] = {char: {names[target]} for char, target in moves.items()}
+        return automaton_class(set(names), self.alphabet, delta, names[self.start],
+                               {names[state] for state in self.accepting})
+
+
+def compile_regex(expr):
+    return DFA.from_regex(expr)
@@ -0,0 +1,99 @@
+import hashlib
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from generator import Generator
+
+# Samplers already compiled in this process, keyed by their configuration, so
+# pool workers compile each pattern once rather than once per batch
+_generators = {}
+
+
+def derive_seed(seed, index):
+    # Independent 64-bit seed for batch `index` of a run started from `seed`;
+    # any batch can be regenerated on its own, on any worker
+    digest = hashlib.blake2b(f"{seed}:{index}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def freeze_weights(weights):
+    # Hashable form of the weight dictionaries, for the generator cache
+    if not weights:
+        return ()
+    return tuple(sorted((key, tuple(sorted(value.items())) if isinstance(value, dict) else tuple(value))
+                        for key, value in weights.items()))
+
+
+def sample_batch(config, seed, index, size, joined=False):
+    # Runs in the pool workers: the strings of one batch, or all of them as
+    # one newline-terminated text when joined is set
+    generator = _generators.get(config)
+    if generator is None:
+        expr, max_repeat, alternative_weights, repeat_weights = config
+        generator = _generators[config] = Generator(
+            expr, max_repeat,
+            alternative_weights={key: list(value) for key, value in alternative_weights},
+            repeat_weights={key: dict(value) for key, value in repeat_weights})
+
+    generator.rng = random.Random(derive_seed(seed, index))
+    strings = list(generator.generate_n(size))
+    if joined:
+        return '\n'.join(strings) + '\n' if strings else ''
+    return strings
+
+
+class BulkSampler:
+    # Splits `count` samples into fixed-size batches; batch i always uses the
+    # seed derived from (seed, i), so the output does not depend on how many
+    # workers produced it
+    def __init__(self, expr, seed=0, max_repeat=5, alternative_weights=None, repeat_weights=None,
+                 batch_size=10000):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.config = (expr, max_repeat, freeze_weights(alternative_weights), freeze_weights(repeat_weights))
+        self.seed = seed
+        self.batch_size = batch_size
+        # Fail early, in this process, on a bad pattern or bad weights
+        Generator(expr, max_repeat, alternative_weights=alternative_weights, repeat_weights=repeat_weights)
+
+    def batch_sizes(self, count):
+        full, rest = divmod(count, self.batch_size)
+        sizes = [self.batch_size] * full
+        if rest:
+            sizes.append(rest)
+        return sizes
+
+    def batch(self, index, size=None):
+        return sample_batch(self.config, self.seed, index, size or self.batch_size)
+
+    def batches(self, count, workers=None):
+        # Yields lists of strings, in batch order; workers > 1 fans out over a process pool
+        return self.run(count, workers, joined=False)
+
+    def write(self, file, count, workers=None):
+        # Writes `count` newline-terminated samples to a path or text file object
+        if isinstance(file, str):
+            with open(file, 'w', encoding='utf-8') as handle:
+                return self.write(handle, count, workers)
+        for text in self.run(count, workers, joined=True):
+            file.write(text)
+        return count
+
+    def run(self, count, workers, joined):
+        sizes = self.batch_sizes(count)
+        if not workers or workers == 1:
+            for index, size in enumerate(sizes):
+                yield sample_batch(self.config, self.seed, index, size, joined)
+            return
+
+        # Keep a bounded number of batches in flight so a slow consumer does
+        # not pile up finished results in memory
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for index, size in enumerate(sizes):
+                pending.append(executor.submit(sample_batch, self.config, self.seed, index, size, joined))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
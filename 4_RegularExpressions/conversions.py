@@ -0,0 +1,222 @@
+import string
+
+from regex_parser import (
+    format_regex,
+    Literal,
+    CharClass,
+    Empty,
+    Concat,
+    Alternation,
+    Repeat
+)
+from automata import DFA
+
+EPSILON = 'ε'
+
+
+class RegularGrammar:
+    # Same attributes as the Lab 1/2 Grammar: productions are 'aB' (read a,
+    # continue in B), 'a' (read a and stop) or 'ε'
+    def __init__(self, vn, vt, p, start_symbol):
+        self.vn = vn
+        self.vt = vt
+        self.p = p
+        self.start_symbol = start_symbol
+
+
+def nonterminal_names(count, terminals):
+    # S first, then the other capital letters, skipping any that are also terminals
+    letters = [c for c in 'S' + string.ascii_uppercase.replace('S', '') if c not in terminals]
+    names = letters[:count]
+    index = 0
+    while len(names) < count:
+        name = f"X{index}"
+        if name not in terminals:
+            names.append(name)
+        index += 1
+    return names
+
+
+def regex_to_grammar(expr, grammar_class=None):
+    # Right-linear grammar with one nonterminal per state of the minimal DFA.
+    # With grammar_class (e.g. the Lab 2 Grammar), an instance of it is created
+    # without arguments and given vn, vt, p and start_symbol.
+    dfa = DFA.from_regex(expr) if isinstance(expr, str) else expr
+    terminals = dfa.alphabet
+    names = nonterminal_names(len(dfa), terminals)
+
+    rules = {}
+    for state, moves in enumerate(dfa.transitions):
+        if not moves and state != dfa.start:
+            continue  # only ever reached by a terminal-only production
+        productions = []
+        if state == dfa.start and state in dfa.accepting:
+            productions.append(EPSILON)
+        for char, target in sorted(moves.items()):
+            if dfa.transitions[target]:
+                productions.append(char + names[target])
+            if target in dfa.accepting:
+                productions.append(char)
+        rules[names[state]] = productions
+
+    vn = set(rules)
+    if grammar_class is None:
+        return RegularGrammar(vn, set(terminals), rules, names[dfa.start])
+    grammar = grammar_class()
+    grammar.vn = vn
+    grammar.vt = set(terminals)
+    grammar.p = rules
+    grammar.start_symbol = names[dfa.start]
+    return grammar
+
+
+def size(node):
+    # Number of AST nodes, used to break ties between elimination candidates
+    if isinstance(node, Concat):
+        return 1 + sum(size(item) for item in node.items)
+    if isinstance(node, Alternation):
+        return 1 + sum(size(option) for option in node.options)
+    if isinstance(node, Repeat):
+        return 1 + size(node.node)
+    return 1
+
+
+def same(a, b):
+    return format_regex(a) == format_regex(b)
+
+
+# Smart constructors for the labels of the generalized automaton; None stands
+# for the empty language, and each one simplifies what it can
+
+def union(a, b):
+    if a is None:
+        return b
+    if b is None or same(a, b):
+        return a
+    if isinstance(a, Empty):
+        a, b = b, a
+    if isinstance(b, Empty):
+        # r|ε is r?, unless r already matches the empty string
+        if isinstance(a, Repeat) and a.min_count == 0:
+            return a
+        if isinstance(a, Repeat) and a.min_count == 1 and a.max_count is None:
+            return Repeat(a.node, 0, None)
+        return Repeat(a, 0, 1)
+
+    options = []
+    chars = set()
+    for node in (a, b):
+        for option in (node.options if isinstance(node, Alternation) else [node]):
+            # Single characters merge into one class
+            if isinstance(option, Literal):
+                chars.add(option.char)
+            elif isinstance(option, CharClass):
+                chars.update(option.chars)
+            elif not any(same(option, other) for other in options):
+                options.append(option)
+    if chars:
+        chars = tuple(sorted(chars))
+        options.insert(0, Literal(chars[0]) if len(chars) == 1 else CharClass(chars))
+    return options[0] if len(options) == 1 else Alternation(options)
+
+
+def concat(a, b):
+    if a is None or b is None:
+        return None
+    if isinstance(a, Empty):
+        return b
+    if isinstance(b, Empty):
+        return a
+    items = (a.items if isinstance(a, Concat) else [a]) + (b.items if isinstance(b, Concat) else [b])
+
+    merged = []
+    for item in items:
+        last = merged[-1] if merged else None
+        if (last is not None and isinstance(item, Repeat) and item.min_count == 0 and item.max_count is None
+                and same(last, item.node)):
+            # r r* is r+
+            merged[-1] = Repeat(item.node, 1, None)
+            continue
+        if last is not None:
+            # r r is r{2}, and r{n} r is r{n+1}, where that is shorter
+            if isinstance(last, Repeat) and last.min_count == last.max_count and same(last.node, item):
+                repeated = Repeat(item, last.min_count + 1, last.min_count + 1)
+            elif same(last, item):
+                repeated = Repeat(item, 2, 2)
+            else:
+                repeated = None
+            if repeated is not None and len(format_regex(repeated)) <= len(format_regex(last)) + len(format_regex(item)):
+                merged[-1] = repeated
+                continue
+        merged.append(item)
+    return merged[0] if len(merged) == 1 else Concat(merged)
+
+
+def star(a):
+    if a is None or isinstance(a, Empty):
+        return Empty()
+    if isinstance(a, Repeat) and a.max_count is None and a.min_count <= 1:
+        return Repeat(a.node, 0, None)
+    if isinstance(a, Repeat) and a.min_count == 0:
+        # (r?)* and (r{0,n})* are r*
+        return Repeat(a.node, 0, None)
+    return Repeat(a, 0, None)
+
+
+def automaton_to_regex(automaton, order='min_degree'):
+    # State elimination. automaton is a DFA from automata.py or anything shaped
+    # like the Lab 2 FiniteAutomaton; it is minimized first. order='min_degree'
+    # removes the state with the fewest in x out edges next, which keeps the
+    # labels small; order='naive' removes states in numbering order.
+    # Returns a pattern string, or None when the language is empty.
+    dfa = automaton if isinstance(automaton, DFA) else DFA.from_finite_automaton(automaton)
+    dfa = dfa.minimize()
+
+    count = len(dfa)
+    initial, final = count, count + 1
+    edges = {}  # (source, target) -> label
+    for state, moves in enumerate(dfa.transitions):
+        for char, target in moves.items():
+            edges[state, target] = union(edges.get((state, target)), Literal(char))
+    edges[initial, dfa.start] = Empty()
+    for state in dfa.accepting:
+        edges[state, final] = Empty()
+
+    outgoing = {state: set() for state in range(count + 2)}
+    incoming = {state: set() for state in range(count + 2)}
+    for source, target in edges:
+        outgoing[source].add(target)
+        incoming[target].add(source)
+
+    remaining = set(range(count))
+    while remaining:
+        if order == 'naive':
+            state = min(remaining)
+        elif order == 'min_degree':
+            state = min(remaining, key=lambda s: (
+                len(incoming[s] - {s}) * len(outgoing[s] - {s}),
+                sum(size(edges[p, s]) for p in incoming[s]) + sum(size(edges[s, q]) for q in outgoing[s]),
+                s))
+        else:
+            raise ValueError(f"Unknown elimination order: {order}")
+        remaining.discard(state)
+
+        loop = star(edges.pop((state, state), None))
+        incoming[state].discard(state)
+        outgoing[state].discard(state)
+        for source in incoming[state]:
+            into = edges.pop((source, state))
+            outgoing[source].discard(state)
+            for target in outgoing[state]:
+                path = concat(concat(into, loop), edges[state, target])
+                edges[source, target] = union(edges.get((source, target)), path)
+                outgoing[source].add(target)
+                incoming[target].add(source)
+        for target in outgoing[state]:
+            del edges[state, target]
+            incoming[target].discard(state)
+        incoming[state].clear()
+        outgoing[state].clear()
+
+    label = edges.get((initial, final))
+    return None if label is None else format_regex(label)
@@ -0,0 +1,166 @@
+from regex_parser import parse_regex, Concat, Alternation, Repeat
+from automata import DFA
+
+
+def bound_repeats(node, max_repeat):
+    # Copy of the AST with every unbounded repeat capped like Generator caps it
+    if isinstance(node, Concat):
+        return Concat([bound_repeats(item, max_repeat) for item in node.items])
+    if isinstance(node, Alternation):
+        return Alternation([bound_repeats(option, max_repeat) for option in node.options])
+    if isinstance(node, Repeat):
+        max_count = node.max_count
+        if max_count is None:
+            max_count = max(node.min_count, max_repeat)
+        return Repeat(bound_repeats(node.node, max_repeat), node.min_count, max_count)
+    return node
+
+
+class Enumerator:
+    # Every string of a pattern's language, each exactly once, in lexicographic
+    # order. Strings are paths through the minimal DFA, which is what rules out
+    # duplicates; counts[state][r] is the number of strings of length at most r
+    # accepted from state.
+    def __init__(self, expr, max_repeat=5, max_length=None):
+        self.expr = expr
+        self.max_repeat = max_repeat
+        self.max_length = max_length
+
+        node = parse_regex(expr)
+        if max_repeat is not None:
+            node = bound_repeats(node, max_repeat)
+        self.dfa = DFA.from_regex(node)
+        self.moves = [sorted(moves.items()) for moves in self.dfa.transitions]
+
+        if max_length is None:
+            max_length = self.longest_path()
+            if max_length is None:
+                raise ValueError(f"The language of {expr!r} is infinite; give max_repeat or max_length")
+        self.length = max_length
+        self.counts = self.count_table()
+        self.total = self.counts[self.dfa.start][self.length]
+
+    def __len__(self):
+        return self.total
+
+    def __iter__(self):
+        counts = self.counts
+        moves = self.moves
+        accepting = self.dfa.accepting
+        if not self.total:
+            return
+
+        # Frames are [state, remaining length, next transition index]; index -1
+        # means the string spelled so far has not been considered yet
+        chars = []
+        stack = [[self.dfa.start, self.length, -1]]
+        while stack:
+            frame = stack[-1]
+            state, remaining, index = frame
+            if index == -1:
+                frame[2] = 0
+                if state in accepting:
+                    yield ''.join(chars)
+                continue
+
+            row = moves[state]
+            if remaining == 0 or index == len(row):
+                stack.pop()
+                if stack:
+                    chars.pop()
+                continue
+
+            frame[2] = index + 1
+            char, target = row[index]
+            if counts[target][remaining - 1]:
+                chars.append(char)
+                stack.append([target, remaining - 1, -1])
+
+    def longest_path(self):
+        # Length of the longest accepted string, or None if the DFA has a cycle.
+        # Every state of a minimal DFA leads to acceptance, so any cycle makes the language infinite.
+        moves = self.moves
+        longest = [None] * len(moves)
+        on_path = [False] * len(moves)
+        stack = [(self.dfa.start, False)]
+        while stack:
+            state, expanded = stack.pop()
+            if expanded:
+                on_path[state] = False
+                longest[state] = max([longest[target] + 1 for _, target in moves[state]], default=0)
+                continue
+            if longest[state] is not None:
+                continue
+            if on_path[state]:
+                return None
+            on_path[state] = True
+            stack.append((state, True))
+            for _, target in moves[state]:
+                if on_path[target]:
+                    return None
+                if longest[target] is None:
+                    stack.append((target, False))
+        return longest[self.dfa.start]
+
+    def count_table(self):
+        accepting = self.dfa.accepting
+        states = range(len(self.moves))
+        base = [1 if state in accepting else 0 for state in states]
+        counts = [[value] for value in base]
+        for remaining in range(1, self.length + 1):
+            for state in states:
+                total = base[state]
+                for _, target in self.moves[state]:
+                    total += counts[target][remaining - 1]
+                counts[state].append(total)
+        return counts
+
+    def rank(self, string):
+        # Position of string in the enumeration order
+        if len(string) > self.length:
+            raise ValueError(f"{string!r} is longer than {self.length}")
+        counts = self.counts
+        state = self.dfa.start
+        remaining = self.length
+        index = 0
+        for char in string:
+            if state in self.dfa.accepting:
+                index += 1  # the prefix itself comes first
+            for move_char, target in self.moves[state]:
+                if move_char == char:
+                    break
+                index += counts[target][remaining - 1]
+            else:
+                raise ValueError(f"{string!r} is not in the language of {self.expr!r}")
+            state = target
+            remaining -= 1
+        if state not in self.dfa.accepting:
+            raise ValueError(f"{string!r} is not in the language of {self.expr!r}")
+        return index
+
+    def unrank(self, index):
+        # The string at position index of the enumeration order
+        if index < 0:
+            index += self.total
+        if not 0 <= index < self.total:
+            raise IndexError("Enumerator index out of range")
+        counts = self.counts
+        state = self.dfa.start
+        remaining = self.length
+        chars = []
+        while True:
+            if state in self.dfa.accepting:
+                if index == 0:
+                    return ''.join(chars)
+                index -= 1
+            for char, target in self.moves[state]:
+                count = counts[target][remaining - 1]
+                if index < count:
+                    break
+                index -= count
+            chars.append(char)
+            state = target
+            remaining -= 1
+
+    def __getitem__(self, index):
+        return self.unrank(index)
@@ -1,63 +1,182 @@
 import random
+from bisect import bisect
+from itertools import accumulate
+
+from regex_parser import parse_regex, Literal, CharClass, Empty, Concat, Alternation, Repeat
+
+# Compiled forms of a subexpression, from cheapest to most general:
+CONST = 'const'  # always the same string
+PICK = 'pick'    # one string out of a tuple, uniformly
+PART = 'part'    # a function(rng, out) appending its pieces to the list out
+
+
+class SamplerCompiler:
+    # Choices index a tuple with rng.random() directly, which is about twice
+    # as fast as rng.choice() and uniform to within float precision
+    def __init__(self, max_repeat=5, alternative_weights=None, repeat_weights=None):
+        # Upper limit for unbounded repeats such as * and +
+        self.max_repeat = max_repeat
+        # Alternations and repeats are numbered 0, 1, ... in the order they
+        # open in the pattern. alternative_weights maps an alternation's number
+        # to one weight per option; repeat_weights maps a repeat's number to
+        # {count: weight}, where counts left out are never drawn.
+        self.alternative_weights = alternative_weights or {}
+        self.repeat_weights = repeat_weights or {}
+        self.alternations = 0
+        self.repeats = 0
+
+    def compile(self, node):
+        # Returns a function(rng) -> string that draws one random match
+        kind, value = self.compile_node(node)
+        if kind == CONST:
+            return lambda rng: value
+        if kind == PICK:
+            size = len(value)
+            return lambda rng: value[int(rng.random() * size)]
+
+        def sample(rng):
+            out = []
+            value(rng, out)
+            return ''.join(out)
+        return sample
+
+    def compile_node(self, node):
+        if isinstance(node, Literal):
+            return CONST, node.char
+        if isinstance(node, Empty):
+            return CONST, ''
+        if isinstance(node, CharClass):
+            return (CONST, node.chars[0]) if len(node.chars) == 1 else (PICK, node.chars)
+        if isinstance(node, Concat):
+            return self.compile_concat(node)
+        if isinstance(node, Alternation):
+            return self.compile_alternation(node)
+        if isinstance(node, Repeat):
+            return self.compile_repeat(node)
+        raise ValueError(f"Unsupported regex node: {node.__class__.__name__}")
+
+    def compile_concat(self, node):
+        # Runs of fixed text are merged into one string
+        parts = []
+        for item in node.items:
+            kind, value = self.compile_node(item)
+            if kind == CONST and parts and parts[-1][0] == CONST:
+                parts[-1] = (CONST, parts[-1][1] + value)
+            elif kind != CONST or value:
+                parts.append((kind, value))
+
+        if not parts:
+            return CONST, ''
+        if len(parts) == 1:
+            return parts[0]
+
+        functions = [self.as_part(kind, value) for kind, value in parts]
+
+        def sequence(rng, out):
+            for function in functions:
+                function(rng, out)
+        return PART, sequence
+
+    def compile_alternation(self, node):
+        weights = self.alternative_weights.get(self.alternations)
+        self.alternations += 1
+        options = [self.compile_node(option) for option in node.options]
+
+        if weights is not None:
+            if len(weights) != len(options):
+                raise ValueError(f"Expected {len(options)} alternative weights, got {len(weights)}")
+            cumulative = self.cumulative(weights)
+            total = cumulative[-1]
+            functions = tuple(self.as_part(kind, value) for kind, value in options)
+
+            def weighted_alternation(rng, out):
+                functions[bisect(cumulative, rng.random() * total)](rng, out)
+            return PART, weighted_alternation
+
+        if all(kind == CONST for kind, _ in options):
+            return PICK, tuple(value for _, value in options)
+
+        functions = tuple(self.as_part(kind, value) for kind, value in options)
+        size = len(functions)
+
+        def alternation(rng, out):
+            functions[int(rng.random() * size)](rng, out)
+        return PART, alternation
+
+    def compile_repeat(self, node):
+        weights = self.repeat_weights.get(self.repeats)
+        self.repeats += 1
+        kind, value = self.compile_node(node.node)
+        max_count = node.max_count
+        if max_count is None:
+            max_count = max(node.min_count, self.max_repeat)
+        counts = tuple(range(node.min_count, max_count + 1))
+
+        # A count is drawn as counts[bisect(cumulative, random() * total)];
+        # with equal weights that is the same as indexing by int(random() * len(counts))
+        if weights is None:
+            cumulative = list(range(1, len(counts) + 1))
+        else:
+            cumulative = self.cumulative([weights.get(count, 0) for count in counts])
+        total = cumulative[-1]
+
+        if kind == CONST:
+            if len(counts) == 1:
+                return CONST, value * counts[0]
+
+            def repeat_const(rng, out):
+                out.append(value * counts[bisect(cumulative, rng.random() * total)])
+            return PART, repeat_const
+
+        if kind == PICK:
+            def repeat_pick(rng, out):
+                out.extend(rng.choices(value, k=counts[bisect(cumulative, rng.random() * total)]))
+            return PART, repeat_pick
+
+        def repeat(rng, out):
+            for _ in range(counts[bisect(cumulative, rng.random() * total)]):
+                value(rng, out)
+        return PART, repeat
+
+    def cumulative(self, weights):
+        cumulative = list(accumulate(weights))
+        if any(weight < 0 for weight in weights) or not cumulative or cumulative[-1] <= 0:
+            raise ValueError(f"Weights must be non-negative with a positive sum: {weights}")
+        return cumulative
+
+    def as_part(self, kind, value):
+        if kind == CONST:
+            return lambda rng, out: out.append(value)
+        if kind == PICK:
+            size = len(value)
+            return lambda rng, out: out.append(value[int(rng.random() * size)])
+        return value
 
 
 class Generator:
-    def __init__(self, expr):
+    def __init__(self, expr, max_repeat=5, rng=None, alternative_weights=None, repeat_weights=None):
         self.expr = expr
         self.chars = []
+        self.max_repeat = max_repeat
+        # Any object with random() and choices(), e.g. random.Random(seed);
+        # the random module itself by default
+        self.rng = rng if rng is not None else random
 
-    def generate_string(self):
-        string = []
-        i = 0
-
-        while i < len(self.expr):
-            char = self.expr[i]
-
-            if char == "(":
-                group_end = self.expr.find(")", i)
-                group_content = self.expr[i + 1:group_end]
-                selected = self.generate_group(group_content)
-                string.append(selected)
-                i = group_end
-
-            elif char == "*":
-                last = string.pop()
-                string.append(last * random.randint(0, 5))
-
-            elif char == "+":
-                last = string.pop()
-                string.append(last * random.randint(1, 5))
-
-            elif char == "^":
-                repeat = int(self.expr[i + 1])
-                last = string.pop()
-                string.append(last * repeat)
-                i += 1
-
-            elif char == "?":
-                last = string.pop()
-                string.append(last * random.randint(0, 1))
+        # The pattern is parsed and compiled once, not on every sample
+        self.ast = parse_regex(expr)
+        self.sampler = SamplerCompiler(max_repeat, alternative_weights, repeat_weights).compile(self.ast)
 
-            elif char == "{" and i + 2 < len(self.expr) and self.expr[i + 2] == "}":
-                repeat = int(self.expr[i + 1])
-                last = string.pop()
-                string.append(last * repeat)
-                i += 2
-
-            elif char in {"|", ")", "}"}:
-                pass
-
-            else:
-                string.append(char)
-
-            i += 1
-
-        return ' '.join(string)
-
-    def generate_group(self, group_expr):
-        options = group_expr.split("|")
-        return random.choice(options)
-
-    def generate_n_strings(self):
-        for _ in range(5):
-            print(self.generate_string())
+    def generate_string(self):
+        return self.sampler(self.rng)
+
+    def generate_n(self, n):
+        sampler = self.sampler
+        rng = self.rng
+        for _ in range(n):
+            yield sampler(rng)
+
+    def generate_n_strings(self, n=5):
+        strings = list(self.generate_n(n))
+        for string in strings:
+            print(string)
+        return strings
@@ -1,4 +1,5 @@
 from generator import Generator
+from automata import DFA
 
 expressions = [
     "(S|T)(U|V)W*Y+24",
@@ -9,4 +10,8 @@ expressions = [
 for expr in expressions:
         print(f"\nGenerated strings for expression: {expr}")
         generator = Generator(expr)
-        generator.generate_n_strings()
\ No newline at end of file
+        generator.generate_n_strings()
+
+        dfa = DFA.from_regex(expr)
+        matched = sum(dfa.match_many(generator.generate_n(10000)))
+        print(f"Minimal DFA has {len(dfa)} states and accepts {matched} of 10000 generated strings")
@@ -0,0 +1,270 @@
+import string
+
+# Characters a negated class or '.' may stand for
+ALPHABET = tuple(string.digits + string.ascii_letters + string.punctuation + ' ')
+
+# Characters with a meaning of their own; escape them with '\' to match them literally
+SPECIAL = set('()|*+?{[\\.^')
+
+
+class Literal:
+    def __init__(self, char):
+        self.char = char
+
+    def __repr__(self):
+        return f"Literal({self.char!r})"
+
+
+class CharClass:
+    def __init__(self, chars):
+        # Sorted tuple of the distinct characters the class matches
+        self.chars = chars
+
+    def __repr__(self):
+        return f"CharClass({''.join(self.chars)!r})"
+
+
+class Empty:
+    # Matches only the empty string, e.g. the second option of (a|)
+    def __repr__(self):
+        return "Empty()"
+
+
+class Concat:
+    def __init__(self, items):
+        self.items = items
+
+    def __repr__(self):
+        return f"Concat({self.items})"
+
+
+class Alternation:
+    def __init__(self, options):
+        self.options = options
+
+    def __repr__(self):
+        return f"Alternation({self.options})"
+
+
+class Repeat:
+    def __init__(self, node, min_count, max_count):
+        self.node = node
+        self.min_count = min_count
+        self.max_count = max_count  # None when unbounded, as for * and +
+
+    def __repr__(self):
+        return f"Repeat({self.node}, {self.min_count}, {self.max_count})"
+
+
+class RegexParser:
+    # alternation := concat ('|' concat)*
+    # concat      := repeat*
+    # repeat      := atom ('*' | '+' | '?' | '{m}' | '{m,}' | '{m,n}' | '^n')*
+    # atom        := '(' alternation ')' | '[' class ']' | '.' | '\' char | char
+    def __init__(self, expr):
+        self.expr = expr
+        self.pos = 0
+
+    def error(self, message):
+        raise ValueError(f"Regex error: {message} at position {self.pos} in {self.expr!r}")
+
+    def peek(self):
+        return self.expr[self.pos] if self.pos < len(self.expr) else None
+
+    def advance(self):
+        char = self.peek()
+        self.pos += 1
+        return char
+
+    def expect(self, char):
+        if self.peek() != char:
+            self.error(f"Expected {char!r}")
+        self.pos += 1
+
+    def parse(self):
+        node = self.alternation()
+        if self.peek() is not None:
+            self.error(f"Unexpected {self.peek()!r}")
+        return node
+
+    def alternation(self):
+        options = [self.concat()]
+        while self.peek() == '|':
+            self.advance()
+            options.append(self.concat())
+        return options[0] if len(options) == 1 else Alternation(options)
+
+    def concat(self):
+        items = []
+        while self.peek() is not None and self.peek() not in '|)':
+            items.append(self.repeat())
+        if not items:
+            return Empty()
+        return items[0] if len(items) == 1 else Concat(items)
+
+    def repeat(self):
+        node = self.atom()
+        while True:
+            char = self.peek()
+            if char == '*':
+                bounds = (0, None)
+            elif char == '+':
+                bounds = (1, None)
+            elif char == '?':
+                bounds = (0, 1)
+            elif char == '{':
+                self.advance()
+                bounds = self.braces()
+                node = Repeat(node, *bounds)
+                continue
+            elif char == '^':
+                self.advance()
+                count = self.number()
+                node = Repeat(node, count, count)
+                continue
+            else:
+                return node
+            self.advance()
+            node = Repeat(node, *bounds)
+
+    def braces(self):
+        # After '{': m}, m,} or m,n}
+        min_count = self.number()
+        max_count = min_count
+        if self.peek() == ',':
+            self.advance()
+            max_count = self.number() if self.peek() != '}' else None
+        self.expect('}')
+        if max_count is not None and max_count < min_count:
+            self.error(f"Bad repeat range {{{min_count},{max_count}}}")
+        return min_count, max_count
+
+    def number(self):
+        start = self.pos
+        while self.peek() is not None and self.peek().isdigit():
+            self.advance()
+        if start == self.pos:
+            self.error("Expected a repeat count")
+        return int(self.expr[start:self.pos])
+
+    def atom(self):
+        char = self.peek()
+        if char is None:
+            self.error("Unexpected end of pattern")
+
+        if char == '(':
+            self.advance()
+            node = self.alternation()
+            self.expect(')')
+            return node
+        if char == '[':
+            self.advance()
+            return self.char_class()
+        if char == '.':
+            self.advance()
+            return CharClass(tuple(sorted(ALPHABET)))
+        if char == '\\':
+            self.advance()
+            if self.peek() is None:
+                self.error("Dangling escape")
+            return Literal(self.advance())
+        if char in SPECIAL:
+            self.error(f"Nothing to repeat before {char!r}" if char in '*+?{^' else f"Unexpected {char!r}")
+        return Literal(self.advance())
+
+    def char_class(self):
+        # After '[': members and a-z ranges up to ']'; a leading '^' negates
+        negated = self.peek() == '^'
+        if negated:
+            self.advance()
+
+        chars = set()
+        first = True
+        while self.peek() != ']' or first:
+            char = self.advance()
+            if char is None:
+                self.error("Unterminated character class")
+            if char == '\\':
+                char = self.advance()
+                if char is None:
+                    self.error("Dangling escape")
+            first = False
+
+            if self.peek() == '-' and self.pos + 1 < len(self.expr) and self.expr[self.pos + 1] != ']':
+                self.advance()
+                end = self.advance()
+                if end == '\\':
+                    end = self.advance()
+                if end is None or ord(end) < ord(char):
+                    self.error(f"Bad class range {char}-{end}")
+                chars.update(chr(code) for code in range(ord(char), ord(end) + 1))
+            else:
+                chars.add(char)
+        self.advance()  # consume ']'
+
+        if negated:
+            chars = set(ALPHABET) - chars
+        if not chars:
+            self.error("Empty character class")
+        return CharClass(tuple(sorted(chars)))
+
+
+def parse_regex(expr):
+    return RegexParser(expr).parse()
+
+
+# Characters escaped when an AST is written back as a pattern
+ESCAPED = SPECIAL | set(')}]')
+CLASS_ESCAPED = set('\\]^-')
+
+
+def format_class(chars):
+    if len(chars) == len(ALPHABET) and set(chars) == set(ALPHABET):
+        return '.'
+    # Runs of three or more consecutive characters become ranges
+    parts = []
+    i = 0
+    while i < len(chars):
+        j = i
+        while j + 1 < len(chars) and ord(chars[j + 1]) == ord(chars[j]) + 1:
+            j += 1
+        run = [('\\' + c if c in CLASS_ESCAPED else c) for c in chars[i:j + 1]]
+        parts.append(f"{run[0]}-{run[-1]}" if len(run) >= 3 else ''.join(run))
+        i = j + 1
+    return f"[{''.join(parts)}]"
+
+
+def format_regex(node, precedence=0):
+    # Inverse of parse_regex, with as few parentheses as possible; precedence
+    # is 0 inside an alternation, 1 inside a concatenation, 2 under a quantifier
+    if isinstance(node, Literal):
+        return '\\' + node.char if node.char in ESCAPED else node.char
+    if isinstance(node, CharClass):
+        if len(node.chars) == 1:
+            return format_regex(Literal(node.chars[0]))
+        return format_class(node.chars)
+    if isinstance(node, Empty):
+        return '()' if precedence == 2 else ''
+    if isinstance(node, Concat):
+        text = ''.join(format_regex(item, 1) for item in node.items)
+        return f"({text})" if precedence == 2 else text
+    if isinstance(node, Alternation):
+        text = '|'.join(format_regex(option, 0) for option in node.options)
+        return f"({text})" if precedence > 0 else text
+    if isinstance(node, Repeat):
+        inner = format_regex(node.node, 2)
+        if isinstance(node.node, Repeat):
+            inner = f"({inner})"
+        bounds = (node.min_count, node.max_count)
+        if bounds == (0, None):
+            return inner + '*'
+        if bounds == (1, None):
+            return inner + '+'
+        if bounds == (0, 1):
+            return inner + '?'
+        if node.max_count is None:
+            return f"{inner}{{{node.min_count},}}"
+        if node.min_count == node.max_count:
+            return f"{inner}{{{node.min_count}}}"
+        return f"{inner}{{{node.min_count},{node.max_count}}}"
+    raise ValueError(f"Unsupported regex node: {node.__class__.__name__}")
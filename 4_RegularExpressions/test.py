@@ -0,0 +1,262 @@
+import importlib.util
+import io
+import itertools
+import os
+import random
+import re
+import unittest
+
+from generator import Generator
+from automata import NFA, DFA
+from enumerator import Enumerator
+from bulk_sampler import BulkSampler
+from conversions import regex_to_grammar, automaton_to_regex, EPSILON
+from regex_parser import format_regex
+from regex_parser import parse_regex, Literal, Concat, Alternation, Repeat
+
+
+def to_python_regex(expr):
+    # Same patterns for the re module, which spells x^n as x{n}
+    return re.compile(re.sub(r"\^(\d+)", r"{\1}", expr))
+
+
+class TestRegexParser(unittest.TestCase):
+    def test_nested_groups_and_repeats(self):
+        ast = parse_regex("a(b|(c|d)e){2,10}^2")
+        self.assertIsInstance(ast, Concat)
+        outer = ast.items[1]
+        self.assertIsInstance(outer, Repeat)
+        self.assertEqual((outer.min_count, outer.max_count), (2, 2))
+        inner = outer.node
+        self.assertEqual((inner.min_count, inner.max_count), (2, 10))
+        self.assertIsInstance(inner.node, Alternation)
+        self.assertIsInstance(inner.node.options[1].items[0], Alternation)
+
+    def test_character_classes(self):
+        self.assertEqual(parse_regex("[a-c9]").chars, ('9', 'a', 'b', 'c'))
+        self.assertNotIn('a', parse_regex("[^a]").chars)
+        self.assertIsInstance(parse_regex("\\*"), Literal)
+
+    def test_errors(self):
+        for expr in ["(a", "a)", "*a", "a{3,1}", "[z-a]", "a{x}", "[ab", "a\\"]:
+            with self.assertRaises(ValueError):
+                parse_regex(expr)
+
+
+class TestGenerator(unittest.TestCase):
+    patterns = [
+        "(S|T)(U|V)W*Y+24",
+        "L(M|N)O{3}P*Q(2|3)",
+        "R*S(T|U|V)W(X|Y|Z){2}",
+        "((a|b(c|d)*)|e)+f{2,4}[x-z0-2]?",
+        "(ab|)c{1,}[^a-y]\\.",
+        "a^12(b|(c|(d|e)))",
+    ]
+
+    def test_generated_strings_match(self):
+        for expr in self.patterns:
+            regex = to_python_regex(expr)
+            generator = Generator(expr, rng=random.Random(4))
+            for string in generator.generate_n(500):
+                self.assertTrue(regex.fullmatch(string), (expr, string))
+
+    def test_repeat_limit(self):
+        generator = Generator("a*b+", max_repeat=3, rng=random.Random(1))
+        strings = set(generator.generate_n(2000))
+        self.assertEqual(max(len(s) for s in strings), 6)
+        self.assertIn("b", strings)
+
+    def test_seeded_generation_is_repeatable(self):
+        first = list(Generator(self.patterns[0], rng=random.Random(7)).generate_n(20))
+        second = list(Generator(self.patterns[0], rng=random.Random(7)).generate_n(20))
+        self.assertEqual(first, second)
+
+
+class TestBulkSampler(unittest.TestCase):
+    def test_weights(self):
+        generator = Generator("(S|T)(U|V)W*", rng=random.Random(1),
+                              alternative_weights={0: [1, 0]}, repeat_weights={0: {2: 1, 4: 3}})
+        strings = list(generator.generate_n(4000))
+        self.assertTrue(all(s[0] == 'S' for s in strings))
+        lengths = [len(s) for s in strings]
+        self.assertEqual(set(lengths), {4, 6})
+        self.assertGreater(lengths.count(6), 2 * lengths.count(4))
+        with self.assertRaises(ValueError):
+            Generator("(a|b)", alternative_weights={0: [1, 2, 3]})
+        with self.assertRaises(ValueError):
+            Generator("a*", repeat_weights={0: {9: 1}})
+
+    def test_output_independent_of_workers(self):
+        sampler = BulkSampler("R*S(T|U|V)W(X|Y|Z){2}", seed=7, batch_size=300)
+        serial = [s for batch in sampler.batches(1000) for s in batch]
+        self.assertEqual(len(serial), 1000)
+        self.assertEqual([len(batch) for batch in sampler.batches(1000)], [300, 300, 300, 100])
+        self.assertEqual(sampler.batch(2), serial[600:900])
+
+        out = io.StringIO()
+        self.assertEqual(sampler.write(out, 1000, workers=2), 1000)
+        self.assertEqual(out.getvalue(), '\n'.join(serial) + '\n')
+
+        regex = to_python_regex("R*S(T|U|V)W(X|Y|Z){2}")
+        self.assertTrue(all(regex.fullmatch(s) for s in serial))
+        other = BulkSampler("R*S(T|U|V)W(X|Y|Z){2}", seed=8, batch_size=300)
+        self.assertNotEqual(next(other.batches(300)), serial[:300])
+
+
+class GrammarAutomaton:
+    # The q/sigma/delta/q0/f view of a right-linear grammar, with one extra final state
+    def __init__(self, grammar):
+        final = '<final>'
+        self.q = set(grammar.vn) | {final}
+        self.sigma = set(grammar.vt)
+        self.delta = {}
+        self.q0 = grammar.start_symbol
+        self.f = {final}
+        for left, productions in grammar.p.items():
+            for production in productions:
+                if production == EPSILON:
+                    self.f.add(left)
+                    continue
+                target = production[1:] or final
+                self.delta.setdefault(left, {}).setdefault(production[0], set()).add(target)
+
+
+def canonical(dfa):
+    # Minimal DFAs number their states canonically, so equal languages give equal tables
+    dfa = dfa.minimize()
+    return dfa.transitions, dfa.accepting
+
+
+class TestConversions(unittest.TestCase):
+    patterns = TestGenerator.patterns + ["(a|b)*abb", "(ab)*", "a|", ""]
+
+    def test_regex_to_grammar(self):
+        for expr in self.patterns:
+            grammar = regex_to_grammar(expr)
+            self.assertTrue(grammar.vn.isdisjoint(grammar.vt))
+            for productions in grammar.p.values():
+                for production in productions:
+                    self.assertTrue(production == EPSILON or production[0] in grammar.vt)
+                    self.assertTrue(len(production) == 1 or production[1:] in grammar.vn)
+            automaton = DFA.from_finite_automaton(GrammarAutomaton(grammar))
+            self.assertEqual(canonical(automaton), canonical(DFA.from_regex(expr)), expr)
+
+    def test_automaton_to_regex(self):
+        for expr in self.patterns:
+            dfa = DFA.from_regex(expr)
+            for order in ('min_degree', 'naive'):
+                result = automaton_to_regex(dfa, order)
+                self.assertEqual(canonical(DFA.from_regex(result)), canonical(dfa), (expr, result))
+        self.assertEqual(automaton_to_regex(DFA.from_regex("(S|T)(U|V)W*Y+24")), "[ST][UV]W*Y+24")
+        self.assertIsNone(automaton_to_regex(DFA([{'a': 0}], 0, ())))
+
+    def test_elimination_order_keeps_output_small(self):
+        rng = random.Random(3)
+        sizes = {'min_degree': 0, 'naive': 0}
+        for _ in range(100):
+            count = rng.randint(2, 6)
+            transitions = [{c: rng.randrange(count) for c in 'abc' if rng.random() < 0.7} for _ in range(count)]
+            dfa = DFA(transitions, 0, {s for s in range(count) if rng.random() < 0.4})
+            for order in sizes:
+                result = automaton_to_regex(dfa, order)
+                if result is not None:
+                    self.assertEqual(canonical(DFA.from_regex(result)), canonical(dfa))
+                    sizes[order] += len(result)
+        self.assertLess(sizes['min_degree'] * 2, sizes['naive'])
+
+    def test_format_round_trip(self):
+        for expr in self.patterns:
+            text = format_regex(parse_regex(expr))
+            self.assertEqual(format_regex(parse_regex(text)), text)
+
+
+def load_lab2_automaton():
+    # The Lab 2 FiniteAutomaton class, or None when it cannot be imported (it needs graphviz)
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '2_FiniteAutomata', 'finite_automaton.py')
+    try:
+        spec = importlib.util.spec_from_file_location('lab2_finite_automaton', path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    except (ImportError, OSError):
+        return None
+    return module.FiniteAutomaton
+
+
+class TestAutomata(unittest.TestCase):
+    def test_dfa_agrees_with_re(self):
+        rng = random.Random(0)
+        for expr in TestGenerator.patterns + ["(a|b)*abb", "(a|ab)(c|bcd)(d*)", "(a*)*b"]:
+            regex = to_python_regex(expr)
+            dfa = DFA.from_regex(expr)
+            alphabet = sorted(dfa.alphabet | {'#'})
+            strings = [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 12))) for _ in range(500)]
+            strings += list(Generator(expr, rng=rng).generate_n(200))
+            expected = [bool(regex.fullmatch(s)) for s in strings]
+            self.assertEqual(list(dfa.match_many(strings)), expected, expr)
+            self.assertEqual([dfa.match(s) for s in strings], expected, expr)
+
+    def test_minimization(self):
+        self.assertEqual(len(DFA.from_regex("(a|b)*abb")), 4)
+        self.assertEqual(len(DFA.from_regex("R*S(T|U|V)W(X|Y|Z){2}")), 6)
+        nfa = NFA.from_regex("(S|T)(U|V)W*Y+24")
+        self.assertGreater(len(DFA.from_nfa(nfa)), len(DFA.from_nfa(nfa).minimize()))
+        self.assertFalse(DFA.from_regex("a{0}").match("a"))
+        self.assertTrue(DFA.from_regex("a{0}").match(""))
+
+    def test_finite_automaton_round_trip(self):
+        automaton_class = load_lab2_automaton()
+        if automaton_class is None:
+            self.skipTest("Lab 2 FiniteAutomaton needs graphviz")
+
+        dfa = DFA.from_regex("L(M|N)O{3}P*Q(2|3)")
+        automaton = dfa.to_finite_automaton(automaton_class)
+        for string in Generator("L(M|N)O{3}P*Q(2|3)", rng=random.Random(3)).generate_n(300):
+            self.assertTrue(automaton.string_belongs_to_language(string))
+        self.assertFalse(automaton.string_belongs_to_language("LMOOQ2"))
+
+        again = DFA.from_finite_automaton(automaton)
+        self.assertEqual((again.transitions, again.accepting), (dfa.transitions, dfa.accepting))
+        self.assertEqual(automaton_to_regex(automaton), "L[MN]OOOP*Q[23]")
+
+
+class TestEnumerator(unittest.TestCase):
+    def test_enumerates_each_string_once(self):
+        enumerator = Enumerator("L(M|N)O{3}P*Q(2|3)")
+        strings = list(enumerator)
+        self.assertEqual(len(enumerator), 2 * 6 * 2)
+        self.assertEqual(len(set(strings)), len(strings))
+        self.assertEqual(strings, sorted(strings))
+        regex = to_python_regex("L(M|N)O{3}P*Q(2|3)")
+        self.assertTrue(all(regex.fullmatch(s) for s in strings))
+
+    def test_overlapping_alternatives_are_not_duplicated(self):
+        # abc d^k comes from both a.bcd.d^(k-1) and ab.c.d^k
+        strings = list(Enumerator("(a|ab)(c|bcd)(d*)"))
+        self.assertEqual(len(strings), len(set(strings)))
+        self.assertEqual(len(strings), 19)
+
+    def test_length_bound(self):
+        enumerator = Enumerator("(a|b)*abb", max_repeat=None, max_length=7)
+        expected = {''.join(chars) for n in range(8) for chars in itertools.product('ab', repeat=n)
+                    if re.fullmatch("(a|b)*abb", ''.join(chars))}
+        self.assertEqual(set(enumerator), expected)
+        with self.assertRaises(ValueError):
+            Enumerator("a*", max_repeat=None)
+
+    def test_rank_and_unrank(self):
+        enumerator = Enumerator("(S|T)(U|V)W*Y+24")
+        for index, string in enumerate(enumerator):
+            self.assertEqual(enumerator.rank(string), index)
+            self.assertEqual(enumerator[index], string)
+        with self.assertRaises(ValueError):
+            enumerator.rank("SUW")
+        with self.assertRaises(IndexError):
+            enumerator.unrank(len(enumerator))
+
+        large = Enumerator("[a-z]{1,12}")
+        self.assertEqual(large.total, sum(26 ** n for n in range(1, 13)))
+        self.assertEqual(large.unrank(large.rank("regex")), "regex")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,406 @@
+import hashlib
+import json
+import os
+import sys
+from array import array
+
+from ll1 import GrammarAnalysis, END, EPSILON, format_production, production_symbols
+
+MAGIC = b'LALR'
+# Bumped whenever the table layout changes, so stale cache files are rebuilt
+FORMAT_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'lalr_tables')
+
+
+def grammar_hash(grammar):
+    # Stable digest of everything the tables depend on: the start symbol, the
+    # terminals and the productions in order (their order fixes the numbering)
+    rules = [[non_terminal, [list(production_symbols(production)) for production in productions]]
+             for non_terminal, productions in grammar.rules.items()]
+    terminals = [terminal for terminal in grammar.terminals if terminal != EPSILON]
+    text = json.dumps([FORMAT_VERSION, grammar.start, terminals, rules], ensure_ascii=False)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def digraph(edges, initial):
+    # DeRemer and Pennello's Digraph: F(x) = initial(x) | F(y) for every edge
+    # x -> y, solved in one pass with Tarjan's SCC walk, since every node of
+    # a strongly connected component ends up with the same set. Iterative,
+    # with (node, next edge, stack depth) frames.
+    count = len(edges)
+    result = list(initial)
+    depth = [0] * count
+    done = count + 1  # depth of nodes whose component is finished
+    stack = []
+    for root in range(count):
+        if depth[root]:
+            continue
+        stack.append(root)
+        depth[root] = len(stack)
+        frames = [(root, 0, len(stack))]
+        while frames:
+            node, index, node_depth = frames[-1]
+            targets = edges[node]
+            if index < len(targets):
+                frames[-1] = (node, index + 1, node_depth)
+                target = targets[index]
+                if not depth[target]:
+                    stack.append(target)
+                    depth[target] = len(stack)
+                    frames.append((target, 0, len(stack)))
+                    continue
+                depth[node] = min(depth[node], depth[target])
+                result[node] |= result[target]
+                continue
+
+            frames.pop()
+            if depth[node] == node_depth:
+                while True:
+                    member = stack.pop()
+                    depth[member] = done
+                    result[member] = result[node]
+                    if member == node:
+                        break
+            if frames:
+                parent = frames[-1][0]
+                depth[parent] = min(depth[parent], depth[node])
+                result[parent] |= result[node]
+    return result
+
+
+class LALRBuilder:
+    # LR(0) automaton plus DeRemer-Pennello lookaheads. Production 0 is the
+    # augmented S' -> S; items are (production, dot) pairs.
+    def __init__(self, grammar):
+        self.analysis = analysis = GrammarAnalysis(grammar)
+        self.start = grammar.start
+        augmented = self.start + "'"
+        while augmented in grammar.rules:
+            augmented += "'"
+        self.productions = [(augmented, (self.start,))] + analysis.productions
+        self.terminals = analysis.terminals
+        self.terminal_bits = analysis.terminal_bits
+        self.non_terminals = [augmented] + analysis.non_terminals
+        self.nullable = analysis.nullable
+
+        self.by_left = {}
+        for index, (non_terminal, _) in enumerate(self.productions):
+            self.by_left.setdefault(non_terminal, []).append(index)
+
+        self.states = []  # closed item lists
+        self.transitions = []  # transitions[state][symbol] -> state
+        self.build_lr0()
+
+    def closure(self, kernel):
+        items = list(kernel)
+        seen = set()
+        for production, dot in items:
+            symbols = self.productions[production][1]
+            if dot < len(symbols):
+                symbol = symbols[dot]
+                if symbol in self.by_left and symbol not in seen:
+                    seen.add(symbol)
+                    items.extend((index, 0) for index in self.by_left[symbol])
+        return items
+
+    def build_lr0(self):
+        ids = {frozenset([(0, 0)]): 0}
+        kernels = [((0, 0),)]
+        for kernel in kernels:
+            items = self.closure(kernel)
+            moves = {}
+            for production, dot in items:
+                symbols = self.productions[production][1]
+                if dot < len(symbols):
+                    moves.setdefault(symbols[dot], []).append((production, dot + 1))
+
+            row = {}
+            for symbol, next_kernel in moves.items():
+                key = frozenset(next_kernel)
+                target = ids.get(key)
+                if target is None:
+                    target = ids[key] = len(kernels)
+                    kernels.append(tuple(next_kernel))
+                row[symbol] = target
+            self.states.append(items)
+            self.transitions.append(row)
+
+    def lookaheads(self):
+        # Returns {(state, production): terminal bitset} for every reduction
+        transitions = self.transitions
+        terminal_bits = self.terminal_bits
+
+        # Nonterminal transitions (p, A) are the nodes of both relations
+        nodes = []
+        node_ids = {}
+        for state, row in enumerate(transitions):
+            for symbol in row:
+                if symbol in self.by_left:
+                    node_ids[state, symbol] = len(nodes)
+                    nodes.append((state, symbol))
+
+        # DR(p, A): terminals that can be shifted right after the A transition
+        direct = []
+        reads = []
+        for state, symbol in nodes:
+            target = transitions[state][symbol]
+            bits = 0
+            read_edges = []
+            for next_symbol, _ in transitions[target].items():
+                if next_symbol in terminal_bits:
+                    bits |= terminal_bits[next_symbol]
+                elif next_symbol in self.nullable:
+                    read_edges.append(node_ids[target, next_symbol])
+            if state == 0 and symbol == self.start:
+                bits |= terminal_bits[END]
+            direct.append(bits)
+            reads.append(read_edges)
+        read = digraph(reads, direct)
+
+        # includes and lookback, from walking each production from each
+        # state that has a transition on its left side
+        includes = [[] for _ in nodes]
+        lookback = {}
+        for node, (state, non_terminal) in enumerate(nodes):
+            for production in self.by_left[non_terminal]:
+                symbols = self.productions[production][1]
+                current = state
+                for position, symbol in enumerate(symbols):
+                    if symbol in self.by_left and all(rest in self.nullable for rest in symbols[position + 1:]):
+                        includes[node_ids[current, symbol]].append(node)
+                    current = transitions[current][symbol]
+                lookback.setdefault((current, production), []).append(node)
+        follow = digraph(includes, read)
+
+        # Production 0 is reduced, that is the input accepted, only at the end
+        result = {(transitions[0][self.start], 0): terminal_bits[END]}
+        for key, sources in lookback.items():
+            bits = 0
+            for node in sources:
+                bits |= follow[node]
+            result[key] = bits
+        return result
+
+
+class LALRTable:
+    # ACTION and GOTO as flat int arrays, one row per state. An ACTION entry
+    # is 0 for an error, s + 1 to shift and go to state s, and -(p + 1) to
+    # reduce by production p; reducing by production 0 accepts. A GOTO entry
+    # is the next state, or -1.
+    def __init__(self, terminals, non_terminals, productions, action, goto, conflicts=(), key=None):
+        self.terminals = terminals
+        self.non_terminals = non_terminals
+        self.productions = productions
+        self.action = action
+        self.goto = goto
+        self.conflicts = list(conflicts)
+        self.key = key
+
+        self.terminal_ids = {terminal: index for index, terminal in enumerate(terminals)}
+        non_terminal_ids = {non_terminal: index for index, non_terminal in enumerate(non_terminals)}
+        self.lengths = [len(symbols) for _, symbols in productions]
+        self.left_ids = [non_terminal_ids[non_terminal] for non_terminal, _ in productions]
+
+    def __len__(self):
+        return len(self.action) // len(self.terminals)
+
+    @classmethod
+    def from_grammar(cls, grammar):
+        builder = LALRBuilder(grammar)
+        terminals = builder.terminals
+        non_terminals = builder.non_terminals
+        width = len(terminals)
+        terminal_ids = {terminal: index for index, terminal in enumerate(terminals)}
+        non_terminal_ids = {non_terminal: index for index, non_terminal in enumerate(non_terminals)}
+
+        action = array('i', [0]) * (len(builder.states) * width)
+        goto = array('i', [-1]) * (len(builder.states) * len(non_terminals))
+        for state, row in enumerate(builder.transitions):
+            for symbol, target in row.items():
+                if symbol in terminal_ids:
+                    action[state * width + terminal_ids[symbol]] = target + 1
+                else:
+                    goto[state * len(non_terminals) + non_terminal_ids[symbol]] = target
+
+        # Conflicts are resolved the way yacc does it, preferring the shift
+        # and then the earlier production, and recorded for report()
+        conflicts = []
+        for (state, production), bits in sorted(builder.lookaheads().items()):
+            for index, terminal in enumerate(terminals):
+                if not bits >> index & 1:
+                    continue
+                cell = state * width + index
+                current = action[cell]
+                if current == 0:
+                    action[cell] = -(production + 1)
+                elif current > 0:
+                    conflicts.append((state, terminal, 'shift/reduce', ['shift', production]))
+                elif -current - 1 != production:
+                    kept = -current - 1
+                    conflicts.append((state, terminal, 'reduce/reduce', [kept, production]))
+
+        return cls(terminals, non_terminals, builder.productions, action, goto, conflicts, grammar_hash(grammar))
+
+    def is_lalr1(self):
+        return not self.conflicts
+
+    def report(self):
+        # One line per conflicting cell; the first option listed is the one kept
+        lines = []
+        for state, terminal, kind, options in self.conflicts:
+            names = ', '.join(option if option == 'shift' else format_production(*self.productions[option])
+                              for option in options)
+            lines.append(f"{kind} conflict in state {state} on {terminal!r}: {names}")
+        return lines
+
+    def to_bytes(self):
+        # MAGIC, a little-endian uint32 header length, a JSON header, then the
+        # ACTION and GOTO arrays as little-endian int32
+        header = json.dumps({
+            'version': FORMAT_VERSION,
+            'key': self.key,
+            'terminals': self.terminals,
+            'non_terminals': self.non_terminals,
+            'productions': [[non_terminal, list(symbols)] for non_terminal, symbols in self.productions],
+            'conflicts': self.conflicts,
+            'action': len(self.action),
+            'goto': len(self.goto)
+        }, ensure_ascii=False).encode('utf-8')
+        action = array('i', self.action)
+        goto = array('i', self.goto)
+        if sys.byteorder == 'big':
+            action.byteswap()
+            goto.byteswap()
+        return b''.join([MAGIC, len(header).to_bytes(4, 'little'), header, action.tobytes(), goto.tobytes()])
+
+    @classmethod
+    def from_bytes(cls, data):
+        if data[:4] != MAGIC:
+            raise ValueError("Not an LALR table")
+        length = int.from_bytes(data[4:8], 'little')
+        try:
+            header = json.loads(data[8:8 + length].decode('utf-8'))
+        except (UnicodeDecodeError, ValueError):
+            raise ValueError("Corrupt LALR table header")
+        if header.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported LALR table version {header.get('version')}")
+
+        offset = 8 + length
+        action = array('i')
+        goto = array('i')
+        action_end = offset + header['action'] * action.itemsize
+        goto_end = action_end + header['goto'] * goto.itemsize
+        if goto_end != len(data):
+            raise ValueError("Truncated LALR table")
+        action.frombytes(data[offset:action_end])
+        goto.frombytes(data[action_end:goto_end])
+        if sys.byteorder == 'big':
+            action.byteswap()
+            goto.byteswap()
+
+        productions = [(non_terminal, tuple(symbols)) for non_terminal, symbols in header['productions']]
+        conflicts = [tuple(conflict) for conflict in header['conflicts']]
+        return cls(header['terminals'], header['non_terminals'], productions, action, goto, conflicts, header['key'])
+
+    def save(self, path):
+        # Written to a temporary file first, so a reader never sees half a table
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'wb') as file:
+            file.write(self.to_bytes())
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as file:
+            return cls.from_bytes(file.read())
+
+    @classmethod
+    def cached(cls, grammar, cache_dir=DEFAULT_CACHE_DIR):
+        # Loads the tables for this grammar from cache_dir, building and saving
+        # them on a miss; unreadable or stale files are rebuilt
+        key = grammar_hash(grammar)
+        path = os.path.join(cache_dir, f"{key}.lalr")
+        try:
+            table = cls.load(path)
+            if table.key == key:
+                return table
+        except (OSError, ValueError, KeyError):
+            pass
+
+        table = cls.from_grammar(grammar)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            table.save(path)
+        except OSError:
+            pass  # a read-only cache only costs the rebuild
+        return table
+
+
+def token_terminal(token):
+    # Lab 3 and Lab 6 tokens are matched by the name of their TokenType, and
+    # their EOF token ends the input; anything else is its own terminal name
+    token_type = getattr(token, 'type', None)
+    if token_type is None:
+        return token
+    name = getattr(token_type, 'name', token_type)
+    return END if name == 'EOF' else name
+
+
+class LALRParser:
+    # Shift-reduce driver over an LALRTable. build(production, children) makes
+    # the value of each reduction; by default it is a (non-terminal, children)
+    # tuple, with the input tokens as leaves.
+    def __init__(self, table, terminal_of=token_terminal, build=None):
+        self.table = table if isinstance(table, LALRTable) else LALRTable.from_grammar(table)
+        self.terminal_of = terminal_of
+        self.build = build or (lambda production, children: (self.table.productions[production][0], children))
+
+    def parse(self, tokens):
+        table = self.table
+        action = table.action
+        goto = table.goto
+        width = len(table.terminals)
+        goto_width = len(table.non_terminals)
+        lengths = table.lengths
+        left_ids = table.left_ids
+        build = self.build
+
+        tokens = iter(tokens)
+        position = 0
+        token, column = self.next_terminal(tokens, position)
+
+        states = [0]
+        values = []
+        while True:
+            state = states[-1]
+            entry = action[state * width + column] if column is not None else 0
+            if entry > 0:
+                states.append(entry - 1)
+                values.append(token)
+                position += 1
+                token, column = self.next_terminal(tokens, position)
+            elif entry < 0:
+                production = -entry - 1
+                if production == 0:
+                    return values[-1]
+                count = lengths[production]
+                if count:
+                    children = values[-count:]
+                    del values[-count:]
+                    del states[-count:]
+                else:
+                    children = []
+                values.append(build(production, children))
+                states.append(goto[states[-1] * goto_width + left_ids[production]])
+            else:
+                expected = [terminal for index, terminal in enumerate(table.terminals)
+                            if action[state * width + index]]
+                found = END if token is None else self.terminal_of(token)
+                raise ValueError(f"Syntax error: expected one of {expected} but found {found!r} at position {position}")
+
+    def next_terminal(self, tokens, position):
+        # The next token and its ACTION column; None for a terminal the grammar lacks
+        token = next(tokens, None)
+        terminal = END if token is None else self.terminal_of(token)
+        return token, self.table.terminal_ids.get(terminal)
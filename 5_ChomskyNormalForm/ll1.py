@@ -0,0 +1,251 @@
+EPSILON = 'ε'
+# End-of-input marker, in FOLLOW of the start symbol
+END = '$'
+
+
+def production_symbols(production):
+    # Grammar keeps productions as strings of one-character symbols ('aXb');
+    # a list or tuple of names (['num', '+', 'E']) allows longer symbols
+    if production == EPSILON or not production:
+        return ()
+    return tuple(production)
+
+
+def format_production(non_terminal, symbols):
+    return f"{non_terminal} -> {' '.join(symbols) if symbols else EPSILON}"
+
+
+class GrammarAnalysis:
+    # Nullable, FIRST and FOLLOW sets of a Grammar. Terminals are numbered and
+    # every FIRST/FOLLOW set is an int used as a bitset, so a union is one `|`
+    # and "did it grow" is one comparison.
+    def __init__(self, grammar):
+        self.grammar = grammar
+        self.start = grammar.start
+        self.non_terminals = list(grammar.rules)
+        for non_terminal in grammar.non_terminals:
+            if non_terminal not in grammar.rules:
+                self.non_terminals.append(non_terminal)
+        self.terminals = [terminal for terminal in grammar.terminals if terminal != EPSILON] + [END]
+        self.terminal_bits = {terminal: 1 << index for index, terminal in enumerate(self.terminals)}
+
+        # productions[i] is (left side, tuple of right side symbols)
+        self.productions = []
+        for non_terminal, productions in grammar.rules.items():
+            for production in productions:
+                symbols = production_symbols(production)
+                for symbol in symbols:
+                    if symbol not in self.terminal_bits and symbol not in grammar.rules:
+                        raise ValueError(f"Unknown symbol {symbol!r} in {format_production(non_terminal, symbols)}")
+                self.productions.append((non_terminal, symbols))
+
+        self.nullable = self.compute_nullable()
+        self.first = self.compute_first()
+        self.follow = self.compute_follow()
+
+    def compute_nullable(self):
+        # Each production counts its symbols not yet known to be nullable;
+        # when a non-terminal becomes nullable, only the productions that
+        # mention it are revisited
+        remaining = []
+        uses = {}
+        nullable = set()
+        worklist = []
+        for index, (non_terminal, symbols) in enumerate(self.productions):
+            remaining.append(len(symbols))
+            for symbol in symbols:
+                # One entry per occurrence, so 'XX' waits for X twice
+                if symbol in self.grammar.rules:
+                    uses.setdefault(symbol, []).append(index)
+            if not symbols and non_terminal not in nullable:
+                nullable.add(non_terminal)
+                worklist.append(non_terminal)
+
+        while worklist:
+            symbol = worklist.pop()
+            for index in uses.get(symbol, ()):
+                remaining[index] -= 1
+                non_terminal = self.productions[index][0]
+                if remaining[index] == 0 and non_terminal not in nullable:
+                    nullable.add(non_terminal)
+                    worklist.append(non_terminal)
+        return nullable
+
+    def compute_first(self):
+        # FIRST(A) takes the terminals that start a production of A directly,
+        # and FIRST(B) for every B that can come first; changes flow along
+        # those B -> A edges until nothing grows
+        first = {non_terminal: 0 for non_terminal in self.non_terminals}
+        feeds = {}  # B -> non-terminals whose FIRST includes FIRST(B)
+        for non_terminal, symbols in self.productions:
+            for symbol in symbols:
+                if symbol in self.terminal_bits:
+                    first[non_terminal] |= self.terminal_bits[symbol]
+                    break
+                feeds.setdefault(symbol, set()).add(non_terminal)
+                if symbol not in self.nullable:
+                    break
+        self.propagate(first, feeds)
+        return first
+
+    def compute_follow(self):
+        # FOLLOW(B) takes FIRST of whatever follows B in a production, and
+        # FOLLOW(A) when the rest of A's production can vanish
+        follow = {non_terminal: 0 for non_terminal in self.non_terminals}
+        follow[self.start] |= self.terminal_bits[END]
+        feeds = {}  # A -> non-terminals whose FOLLOW includes FOLLOW(A)
+        for non_terminal, symbols in self.productions:
+            # Walk right to left, carrying FIRST of the suffix and whether it is nullable
+            suffix_first = 0
+            suffix_nullable = True
+            for symbol in reversed(symbols):
+                if symbol in self.terminal_bits:
+                    suffix_first = self.terminal_bits[symbol]
+                    suffix_nullable = False
+                    continue
+                follow[symbol] |= suffix_first
+                if suffix_nullable:
+                    feeds.setdefault(non_terminal, set()).add(symbol)
+                if symbol in self.nullable:
+                    suffix_first |= self.first[symbol]
+                else:
+                    suffix_first = self.first[symbol]
+                    suffix_nullable = False
+        self.propagate(follow, feeds)
+        return follow
+
+    def propagate(self, sets, feeds):
+        # Worklist fixpoint: sets[target] |= sets[source] for every source -> target edge
+        worklist = list(feeds)
+        queued = set(worklist)
+        while worklist:
+            source = worklist.pop()
+            queued.discard(source)
+            bits = sets[source]
+            for target in feeds.get(source, ()):
+                merged = sets[target] | bits
+                if merged != sets[target]:
+                    sets[target] = merged
+                    if target not in queued:
+                        queued.add(target)
+                        worklist.append(target)
+
+    def first_of(self, symbols):
+        # FIRST bitset of a sequence of symbols, and whether it can derive ε
+        bits = 0
+        for symbol in symbols:
+            if symbol in self.terminal_bits:
+                return bits | self.terminal_bits[symbol], False
+            bits |= self.first[symbol]
+            if symbol not in self.nullable:
+                return bits, False
+        return bits, True
+
+    def names(self, bits):
+        # Terminals of a bitset, in grammar order
+        return [terminal for index, terminal in enumerate(self.terminals) if bits >> index & 1]
+
+    def first_set(self, non_terminal):
+        return set(self.names(self.first[non_terminal]))
+
+    def follow_set(self, non_terminal):
+        return set(self.names(self.follow[non_terminal]))
+
+
+class LL1Table:
+    # Predictive table: table[A][a] is the index of the production to expand
+    # A with when the next terminal is a. Cells claimed by more than one
+    # production are kept in conflicts rather than raising, so a grammar can
+    # be checked and reported on in one pass.
+    def __init__(self, grammar):
+        self.analysis = analysis = GrammarAnalysis(grammar)
+        self.start = analysis.start
+        self.productions = analysis.productions
+        self.table = {non_terminal: {} for non_terminal in analysis.non_terminals}
+        self.conflicts = []
+
+        cells = {}
+        for index, (non_terminal, symbols) in enumerate(self.productions):
+            bits, nullable = analysis.first_of(symbols)
+            for terminal in analysis.names(bits):
+                cells.setdefault((non_terminal, terminal), []).append((index, 'FIRST'))
+            if nullable:
+                for terminal in analysis.names(analysis.follow[non_terminal]):
+                    cells.setdefault((non_terminal, terminal), []).append((index, 'FOLLOW'))
+
+        for (non_terminal, terminal), claims in cells.items():
+            self.table[non_terminal][terminal] = claims[0][0]
+            indices = []
+            for index, _ in claims:
+                if index not in indices:
+                    indices.append(index)
+            if len(indices) > 1:
+                kind = 'FIRST/FOLLOW' if any(source == 'FOLLOW' for _, source in claims) else 'FIRST/FIRST'
+                self.conflicts.append((non_terminal, terminal, kind, indices))
+
+    def is_ll1(self):
+        return not self.conflicts
+
+    def report(self):
+        # One line per conflicting cell
+        lines = []
+        for non_terminal, terminal, kind, indices in self.conflicts:
+            productions = ', '.join(format_production(*self.productions[index]) for index in indices)
+            lines.append(f"{kind} conflict on {non_terminal!r} with next terminal {terminal!r}: {productions}")
+        return lines
+
+
+class LL1Parser:
+    # Table-driven predictive parser. The explicit stack holds symbols still
+    # to match, each with the child list of the node it belongs to, so there
+    # is no recursion however deep the input nests.
+    def __init__(self, table, terminal_of=None):
+        if isinstance(table, LL1Table):
+            self.table = table
+        else:
+            self.table = LL1Table(table)
+        if not self.table.is_ll1():
+            raise ValueError("Grammar is not LL(1):\n" + '\n'.join(self.table.report()))
+        # Maps an input token to its terminal name; tokens are terminal names by default
+        self.terminal_of = terminal_of or (lambda token: token)
+
+    def parse(self, tokens):
+        # Returns the parse tree as (non-terminal, children) tuples whose
+        # leaves are the input tokens
+        terminal_of = self.terminal_of
+        table = self.table.table
+        productions = self.table.productions
+        non_terminals = table
+
+        tokens = iter(tokens)
+        position = 0
+        token = next(tokens, None)
+        terminal = END if token is None else terminal_of(token)
+
+        root = []
+        stack = [(self.table.start, root)]
+        while stack:
+            symbol, children = stack.pop()
+            if symbol in non_terminals:
+                index = table[symbol].get(terminal)
+                if index is None:
+                    expected = sorted(table[symbol])
+                    raise ValueError(f"Syntax error: expected one of {expected} for {symbol!r} "
+                                     f"but found {terminal!r} at position {position}")
+                node_children = []
+                children.append((symbol, node_children))
+                right = productions[index][1]
+                for i in range(len(right) - 1, -1, -1):
+                    stack.append((right[i], node_children))
+                continue
+
+            if symbol != terminal:
+                raise ValueError(f"Syntax error: expected {symbol!r} but found {terminal!r} at position {position}")
+            children.append(token)
+            position += 1
+            token = next(tokens, None)
+            terminal = END if token is None else terminal_of(token)
+
+        if terminal != END:
+            raise ValueError(f"Syntax error: unexpected {terminal!r} at position {position}")
+        return root[0]
@@ -1,6 +1,13 @@
+import importlib.util
+import os
+import random
+import sys
+import tempfile
 import unittest
 
 from grammar import Grammar
+from ll1 import GrammarAnalysis, LL1Table, LL1Parser
+from lalr import LALRTable, LALRParser, grammar_hash
 
 
 class TestGrammar(unittest.TestCase):
@@ -73,5 +80,217 @@ class TestGrammar(unittest.TestCase):
                         prod in self.grammar.terminals or prod == 'ε')
 
 
+def expression_grammar():
+    # E -> T E', E' -> + T E' | ε, T -> F T', T' -> * F T' | ε, F -> ( E ) | num
+    rules = {
+        'E': [('T', "E'")],
+        "E'": [('+', 'T', "E'"), 'ε'],
+        'T': [('F', "T'")],
+        "T'": [('*', 'F', "T'"), 'ε'],
+        'F': [('(', 'E', ')'), ('num',)]
+    }
+    return Grammar(list(rules), ['+', '*', '(', ')', 'num'], rules, start='E')
+
+
+class TestLL1(unittest.TestCase):
+    def setUp(self):
+        # variant 29 grammar
+        rules = {
+            'S': ['B'],
+            'A': ['aX', 'bX'],
+            'X': ['BX', 'b', 'ε'],
+            'B': ['AXaD'],
+            'D': ['a', 'aD'],
+            'C': ['Ca']
+        }
+        self.grammar = Grammar(['S', 'A', 'B', 'C', 'D', 'X'], ['a', 'b'], rules)
+
+    def test_first_and_follow(self):
+        analysis = GrammarAnalysis(self.grammar)
+        self.assertEqual(analysis.nullable, {'X'})
+        self.assertEqual(analysis.first_set('S'), {'a', 'b'})
+        self.assertEqual(analysis.first_set('D'), {'a'})
+        self.assertEqual(analysis.first_set('C'), set())
+        self.assertEqual(analysis.follow_set('S'), {'$'})
+        self.assertEqual(analysis.follow_set('A'), {'a', 'b'})
+        self.assertEqual(analysis.follow_set('X'), {'a', 'b'})
+        self.assertEqual(analysis.follow_set('D'), {'a', 'b', '$'})
+
+    def test_conflicts(self):
+        table = LL1Table(self.grammar)
+        self.assertFalse(table.is_ll1())
+        kinds = {(non_terminal, terminal): kind for non_terminal, terminal, kind, _ in table.conflicts}
+        self.assertEqual(kinds, {('X', 'a'): 'FIRST/FOLLOW', ('X', 'b'): 'FIRST/FOLLOW', ('D', 'a'): 'FIRST/FIRST'})
+        self.assertIn("FIRST/FIRST conflict on 'D' with next terminal 'a': D -> a, D -> a D", table.report())
+        with self.assertRaises(ValueError):
+            LL1Parser(table)
+
+    def test_parse_expressions(self):
+        table = LL1Table(expression_grammar())
+        self.assertTrue(table.is_ll1())
+        self.assertEqual(table.analysis.follow_set("T'"), {'+', ')', '$'})
+        parser = LL1Parser(table)
+        tree = parser.parse(['num', '*', 'num'])
+        self.assertEqual(tree, ('E', [('T', [('F', ['num']), ("T'", ['*', ('F', ['num']), ("T'", [])])]),
+                                      ("E'", [])]))
+        for tokens in (['num', '+'], ['num', 'num'], ['(', 'num'], []):
+            with self.assertRaises(ValueError):
+                parser.parse(tokens)
+
+    def test_deep_nesting(self):
+        depth = 20000
+        parser = LL1Parser(expression_grammar())
+        tree = parser.parse(['('] * depth + ['num'] + [')'] * depth)
+        levels = 0
+        factor = tree[1][0][1][0]  # E -> T -> F
+        while factor[1][0] == '(':
+            factor = factor[1][1][1][0][1][0]  # F -> ( E ) -> T -> F
+            levels += 1
+        self.assertEqual(levels, depth)
+
+    def test_custom_tokens(self):
+        parser = LL1Parser(expression_grammar(), terminal_of=lambda token: 'num' if token.isdigit() else token)
+        tree = parser.parse(['1', '+', '2'])
+        self.assertEqual(tree[1][0][1][0][1], ['1'])
+
+
+def left_recursive_grammar():
+    # Same language as expression_grammar, but not LL(1)
+    rules = {
+        'E': [('E', '+', 'T'), ('T',)],
+        'T': [('T', '*', 'F'), ('F',)],
+        'F': [('(', 'E', ')'), ('num',)]
+    }
+    return Grammar(list(rules), ['+', '*', '(', ')', 'num'], rules, start='E')
+
+
+def restore_module(name, module):
+    if module is None:
+        sys.modules.pop(name, None)
+    else:
+        sys.modules[name] = module
+
+
+def load_lab3_lexer(test):
+    # The Lab 3 Lexer class, or None when it cannot be imported. Its flat
+    # `import tokenizer` would leave Lab 3's module under a name Lab 6 also
+    # uses, so the previous entry is put back when the test finishes.
+    directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '3_LexerScanner')
+    test.addCleanup(restore_module, 'tokenizer', sys.modules.pop('tokenizer', None))
+    sys.path.insert(0, directory)
+    try:
+        spec = importlib.util.spec_from_file_location('lab3_lexer', os.path.join(directory, 'lexer.py'))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    except (ImportError, OSError):
+        return None
+    finally:
+        sys.path.remove(directory)
+    return module.Lexer
+
+
+class TestLALR(unittest.TestCase):
+    def test_agrees_with_ll1(self):
+        lalr = LALRParser(LALRTable.from_grammar(left_recursive_grammar()))
+        ll1 = LL1Parser(expression_grammar())
+        rng = random.Random(0)
+        accepted = 0
+        for _ in range(2000):
+            tokens = [rng.choice(['+', '*', '(', ')', 'num', 'num']) for _ in range(rng.randint(0, 9))]
+            results = []
+            for parser in (lalr, ll1):
+                try:
+                    parser.parse(tokens)
+                    results.append(True)
+                except ValueError:
+                    results.append(False)
+            self.assertEqual(results[0], results[1], tokens)
+            accepted += results[0]
+        self.assertGreater(accepted, 50)
+
+    def test_tree(self):
+        parser = LALRParser(LALRTable.from_grammar(left_recursive_grammar()))
+        self.assertEqual(parser.parse(['num', '+', 'num']),
+                         ('E', [('E', [('T', [('F', ['num'])])]), '+', ('T', [('F', ['num'])])]))
+        depth = 50000
+        self.assertEqual(parser.parse(['('] * depth + ['num'] + [')'] * depth)[0], 'E')
+
+    def test_lalr_but_not_slr(self):
+        # S -> L = R | R, L -> * R | id, R -> L
+        rules = {'S': [('L', '=', 'R'), ('R',)], 'L': [('*', 'R'), ('id',)], 'R': [('L',)]}
+        table = LALRTable.from_grammar(Grammar(list(rules), ['=', '*', 'id'], rules))
+        self.assertTrue(table.is_lalr1())
+        tree = LALRParser(table).parse(['*', 'id', '=', 'id'])
+        self.assertEqual(tree[1][1], '=')
+
+    def test_nullable_and_conflicts(self):
+        # A -> a B c, B -> b B | ε has nullable lookaheads through reads
+        rules = {'A': ['aBc'], 'B': ['bB', 'ε']}
+        parser = LALRParser(Grammar(['A', 'B'], ['a', 'b', 'c'], rules, start='A'))
+        self.assertTrue(parser.table.is_lalr1())
+        parser.parse('abbc')
+        parser.parse('ac')
+        with self.assertRaises(ValueError):
+            parser.parse('abb')
+
+        rules = {'E': [('E', '+', 'E'), ('num',)]}
+        table = LALRTable.from_grammar(Grammar(['E'], ['+', 'num'], rules, start='E'))
+        self.assertEqual(table.report(), ["shift/reduce conflict in state 4 on '+': shift, E -> E + E"])
+        self.assertTrue(LALRParser(table).parse(['num', '+', 'num', '+', 'num']))
+
+    def test_save_and_cache(self):
+        grammar = left_recursive_grammar()
+        table = LALRTable.from_grammar(grammar)
+        copy = LALRTable.from_bytes(table.to_bytes())
+        self.assertEqual((copy.action, copy.goto, copy.productions), (table.action, table.goto, table.productions))
+        with self.assertRaises(ValueError):
+            LALRTable.from_bytes(table.to_bytes()[:-1])
+
+        with tempfile.TemporaryDirectory() as directory:
+            built = LALRTable.cached(grammar, directory)
+            path = os.path.join(directory, grammar_hash(grammar) + '.lalr')
+            self.assertTrue(os.path.exists(path))
+            loaded = LALRTable.cached(grammar, directory)
+            self.assertIsNot(loaded, built)
+            self.assertEqual(loaded.action, built.action)
+
+            with open(path, 'wb') as file:
+                file.write(b'garbage')
+            self.assertEqual(LALRTable.cached(grammar, directory).action, built.action)
+
+        other = left_recursive_grammar()
+        other.rules['F'].append(('-', 'F'))
+        other.terminals.append('-')
+        self.assertNotEqual(grammar_hash(other), grammar_hash(grammar))
+
+    def test_lexer_tokens(self):
+        lexer_class = load_lab3_lexer(self)
+        if lexer_class is None:
+            self.skipTest("Lab 3 lexer is not available")
+        rules = {
+            'E': [('E', 'PLUS', 'T'), ('T',)],
+            'T': [('T', 'MULTIPLY', 'F'), ('F',)],
+            'F': [('LPAREN', 'E', 'RPAREN'), ('NUMBER',)]
+        }
+        grammar = Grammar(list(rules), ['PLUS', 'MULTIPLY', 'LPAREN', 'RPAREN', 'NUMBER'], rules, start='E')
+
+        def evaluate(production, children):
+            # Productions are numbered from 1 in the order of rules; 0 is the augmented start
+            if production == 1:
+                return children[0] + children[2]
+            if production == 3:
+                return children[0] * children[2]
+            if production == 5:
+                return children[1]  # ( E )
+            if production == 6:
+                return float(children[0].text)  # the NUMBER token's lexeme
+            return children[0]
+
+        parser = LALRParser(grammar, build=evaluate)
+        self.assertEqual(parser.parse(lexer_class("2 * (3 + 4) + 1").tokenize()), 15)
+        with self.assertRaises(ValueError):
+            parser.parse(lexer_class("2 + x").tokenize())
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,4 +1,9 @@
 class Node:
+    # Constructor arguments, in order
+    fields = ()
+    # Attributes holding child nodes, in evaluation order
+    child_fields = ()
+
     def __init__(self):
         pass
 
@@ -7,6 +12,9 @@ class Node:
 
 
 class BinaryOpNode(Node):
+    fields = ('left', 'op', 'right')
+    child_fields = ('left', 'right')
+
     def __init__(self, left, op, right):
         super().__init__()
         self.left = left
@@ -18,6 +26,9 @@ class BinaryOpNode(Node):
 
 
 class UnaryOpNode(Node):
+    fields = ('op', 'expr')
+    child_fields = ('expr',)
+
     def __init__(self, op, expr):
         super().__init__()
         self.op = op
@@ -28,6 +39,8 @@ class UnaryOpNode(Node):
 
 
 class NumberNode(Node):
+    fields = ('value',)
+
     def __init__(self, value):
         super().__init__()
         self.value = value
@@ -37,6 +50,8 @@ class NumberNode(Node):
 
 
 class VariableNode(Node):
+    fields = ('name',)
+
     def __init__(self, name):
         super().__init__()
         self.name = name
@@ -46,6 +61,9 @@ class VariableNode(Node):
 
 
 class AssignmentNode(Node):
+    fields = ('variable', 'value')
+    child_fields = ('value',)
+
     def __init__(self, variable, value):
         super().__init__()
         self.variable = variable
@@ -56,6 +74,9 @@ class AssignmentNode(Node):
 
 
 class FunctionCallNode(Node):
+    fields = ('name', 'args')
+    child_fields = ('args',)
+
     def __init__(self, name, args):
         super().__init__()
         self.name = name
@@ -66,6 +87,9 @@ class FunctionCallNode(Node):
 
 
 class AbsoluteValueNode(Node):
+    fields = ('expr',)
+    child_fields = ('expr',)
+
     def __init__(self, expr):
         super().__init__()
         self.expr = expr
@@ -1,3 +1,7 @@
+import io
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
 from ast_nodes import (
     BinaryOpNode,
     UnaryOpNode,
@@ -12,178 +16,326 @@ from ast_nodes import (
 class TextASTVisualizer:
     def __init__(self):
         self.indent_size = 2
+        # Indent strings by width, built once and shared by every line
+        self._indents = {}
 
-    def visualize(self, node, indent=0):
+    def visualize(self, node, indent=0, max_depth=None, max_nodes=None):
 
         if node is None:
             return "None"
 
-        lines = []
-        self._visualize_node(node, lines, indent)
-        return "\n".join(lines)
+        buffer = io.StringIO()
+        self.write(node, buffer, indent, max_depth, max_nodes)
+        return buffer.getvalue()[:-1]
 
-    def _visualize_node(self, node, lines, indent=0):
+    def write(self, node, out, indent=0, max_depth=None, max_nodes=None):
+        # Streams the tree to a text file-like object one line at a time and
+        # returns the number of nodes written. Nodes deeper than max_depth are
+        # shown as "...", and output stops after max_nodes nodes.
         if node is None:
-            return
-
-        indent_str = ' ' * (indent * self.indent_size)
+            out.write("None\n")
+            return 0
+
+        write = out.write
+        count = 0
+        # Work items are finished lines or (node, indent, depth) still to expand.
+        # An explicit stack keeps deep trees clear of the recursion limit.
+        stack = [(node, indent, 0)]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                write(item)
+                write("\n")
+                continue
+
+            node, indent, depth = item
+            if node is None:
+                continue
+            if max_nodes is not None and count >= max_nodes:
+                write(f"{self._indent(indent)}... (stopped after {max_nodes} nodes)\n")
+                break
+            if max_depth is not None and depth > max_depth:
+                write(f"{self._indent(indent)}...\n")
+                continue
+
+            count += 1
+            items = self._expand_node(node, indent)
+            for i in range(len(items) - 1, -1, -1):
+                item = items[i]
+                stack.append(item if isinstance(item, str) else (item[0], item[1], depth + 1))
+        return count
+
+    def _indent(self, indent):
+        width = indent * self.indent_size
+        indent_str = self._indents.get(width)
+        if indent_str is None:
+            indent_str = self._indents[width] = ' ' * width
+        return indent_str
+
+    def _expand_node(self, node, indent):
+        indent_str = self._indent(indent)
         node_type = node.__class__.__name__
 
         # Handle different node types with more readable formatting
         if isinstance(node, NumberNode):
-            lines.append(f"{indent_str}NumberNode")
-            lines.append(f"{indent_str}  value: {node.value}")
+            return [f"{indent_str}NumberNode",
+                    f"{indent_str}  value: {node.value}"]
 
         elif isinstance(node, VariableNode):
-            lines.append(f"{indent_str}VariableNode")
-            lines.append(f"{indent_str}  name: {node.name}")
+            return [f"{indent_str}VariableNode",
+                    f"{indent_str}  name: {node.name}"]
 
         elif isinstance(node, BinaryOpNode):
             op_value = node.op.value if hasattr(node.op, 'value') else node.op
-            lines.append(f"{indent_str}BinaryOpNode")
-            lines.append(f"{indent_str}  operator: {op_value}")
-
-            lines.append(f"{indent_str}  left:")
-            self._visualize_node(node.left, lines, indent + 1)
-
-            lines.append(f"{indent_str}  right:")
-            self._visualize_node(node.right, lines, indent + 1)
+            return [f"{indent_str}BinaryOpNode",
+                    f"{indent_str}  operator: {op_value}",
+                    f"{indent_str}  left:",
+                    (node.left, indent + 1),
+                    f"{indent_str}  right:",
+                    (node.right, indent + 1)]
 
         elif isinstance(node, UnaryOpNode):
             op_value = node.op.value if hasattr(node.op, 'value') else node.op
-            lines.append(f"{indent_str}UnaryOpNode")
-            lines.append(f"{indent_str}  operator: {op_value}")
-
-            lines.append(f"{indent_str}  expression:")
-            self._visualize_node(node.expr, lines, indent + 1)
+            return [f"{indent_str}UnaryOpNode",
+                    f"{indent_str}  operator: {op_value}",
+                    f"{indent_str}  expression:",
+                    (node.expr, indent + 1)]
 
         elif isinstance(node, AssignmentNode):
-            lines.append(f"{indent_str}AssignmentNode")
-
-            lines.append(f"{indent_str}  variable:")
+            items = [f"{indent_str}AssignmentNode",
+                     f"{indent_str}  variable:"]
             if isinstance(node.variable, str):
-                lines.append(f"{indent_str}    name: {node.variable}")
+                items.append(f"{indent_str}    name: {node.variable}")
             else:
-                self._visualize_node(node.variable, lines, indent + 1)
+                items.append((node.variable, indent + 1))
 
-            lines.append(f"{indent_str}  value:")
-            self._visualize_node(node.value, lines, indent + 1)
+            items.append(f"{indent_str}  value:")
+            items.append((node.value, indent + 1))
+            return items
 
         elif isinstance(node, FunctionCallNode):
-            lines.append(f"{indent_str}FunctionCallNode")
-            lines.append(f"{indent_str}  name: {node.name}")
-
-            lines.append(f"{indent_str}  arguments:")
-            self._visualize_node(node.args, lines, indent + 1)
+            return [f"{indent_str}FunctionCallNode",
+                    f"{indent_str}  name: {node.name}",
+                    f"{indent_str}  arguments:",
+                    (node.args, indent + 1)]
 
         elif isinstance(node, AbsoluteValueNode):
-            lines.append(f"{indent_str}AbsoluteValueNode")
-
-            lines.append(f"{indent_str}  expression:")
-            self._visualize_node(node.expr, lines, indent + 1)
-
-        else:
-            # Generic fallback
-            lines.append(f"{indent_str}{node_type}")
-            for attr_name, attr_value in node.__dict__.items():
-                if attr_name.startswith('_'):
-                    continue
-
-                if isinstance(attr_value, list):
-                    lines.append(f"{indent_str}  {attr_name}:")
-                    for i, item in enumerate(attr_value):
-                        lines.append(f"{indent_str}    [{i}]:")
-                        if hasattr(item, '__dict__'):
-                            self._visualize_node(item, lines, indent + 2)
-                        else:
-                            lines.append(f"{indent_str}      {item}")
-
-                elif hasattr(attr_value, '__dict__'):
-                    lines.append(f"{indent_str}  {attr_name}:")
-                    self._visualize_node(attr_value, lines, indent + 1)
+            return [f"{indent_str}AbsoluteValueNode",
+                    f"{indent_str}  expression:",
+                    (node.expr, indent + 1)]
+
+        # Generic fallback
+        items = [f"{indent_str}{node_type}"]
+        for attr_name, attr_value in node.__dict__.items():
+            if attr_name.startswith('_'):
+                continue
+
+            if isinstance(attr_value, list):
+                items.append(f"{indent_str}  {attr_name}:")
+                for i, item in enumerate(attr_value):
+                    items.append(f"{indent_str}    [{i}]:")
+                    if hasattr(item, '__dict__'):
+                        items.append((item, indent + 2))
+                    else:
+                        items.append(f"{indent_str}      {item}")
+
+            elif hasattr(attr_value, '__dict__'):
+                items.append(f"{indent_str}  {attr_name}:")
+                items.append((attr_value, indent + 1))
 
-                else:
-                    lines.append(f"{indent_str}  {attr_name}: {attr_value}")
+            else:
+                items.append(f"{indent_str}  {attr_name}: {attr_value}")
+        return items
 
 
 class ASCIITreeVisualizer:
-    def __init__(self):
-        self.result = []
-
-    def visualize(self, node):
-        self.result = []
-        self._build_tree(node, "", "", "")
-        return "\n".join(self.result)
-
-    def _build_tree(self, node, prefix, connector, label):
-        if node is None:
-            return
-
+    # Every level of a prefix is one of these two strings, so the prefix of
+    # the current line is a list of shared segments rather than a new string
+    BRANCH = "│   "
+    SPACE = "    "
+
+    def visualize(self, node, max_depth=None, max_nodes=None):
+        buffer = io.StringIO()
+        self.write(node, buffer, max_depth, max_nodes)
+        return buffer.getvalue()[:-1]
+
+    def write(self, node, out, max_depth=None, max_nodes=None):
+        # Streams the tree to a text file-like object and returns the number of
+        # nodes written; children below max_depth are shown as "...", and output
+        # stops after max_nodes nodes
+        write = out.write
+        count = 0
+        segments = []  # segments[d] continues the prefix below the ancestor at depth d
+
+        # Explicit stack of nodes still to print, so deep trees do not recurse
+        stack = [(node, 0, "", "")]
+        while stack:
+            node, depth, connector, label = stack.pop()
+            if node is None:
+                continue
+            del segments[depth:]
+
+            if max_nodes is not None and count >= max_nodes:
+                write(''.join(segments))
+                write(f"{connector}... (stopped after {max_nodes} nodes)\n")
+                break
+            count += 1
+
+            # Print current node
+            node_text = self._node_text(node)
+            if label:
+                node_text = f"{label}: {node_text}"
+            write(''.join(segments))
+            write(connector)
+            write(node_text)
+            write("\n")
+
+            # Prepare for children
+            children = self._children(node)
+            if not children:
+                continue
+            segments.append(self.BRANCH if connector.startswith("├") else self.SPACE)
+            if max_depth is not None and depth >= max_depth:
+                write(''.join(segments))
+                write("└── ...\n")
+                continue
+
+            # Push children in reverse so they come off the stack in order
+            for i in range(len(children) - 1, -1, -1):
+                child_label, child = children[i]
+                is_last = (i == len(children) - 1)
+                connector_char = "└── " if is_last else "├── "
+                stack.append((child, depth + 1, connector_char, child_label))
+        return count
+
+    def _node_text(self, node):
         # Get node display text based on type
         if isinstance(node, NumberNode):
-            node_text = f"Number({node.value})"
+            return f"Number({node.value})"
         elif isinstance(node, VariableNode):
-            node_text = f"Variable({node.name})"
+            return f"Variable({node.name})"
         elif isinstance(node, BinaryOpNode):
             op_value = node.op.value if hasattr(node.op, 'value') else node.op
-            node_text = f"BinaryOp({op_value})"
+            return f"BinaryOp({op_value})"
         elif isinstance(node, UnaryOpNode):
             op_value = node.op.value if hasattr(node.op, 'value') else node.op
-            node_text = f"UnaryOp({op_value})"
+            return f"UnaryOp({op_value})"
         elif isinstance(node, AssignmentNode):
-            node_text = "Assignment"
+            return "Assignment"
         elif isinstance(node, FunctionCallNode):
-            node_text = f"Function({node.name})"
+            return f"Function({node.name})"
         elif isinstance(node, AbsoluteValueNode):
-            node_text = "AbsoluteValue"
-        else:
-            node_text = str(node)
-
-        # Add label if present
-        if label:
-            node_text = f"{label}: {node_text}"
-
-        # Print current node
-        self.result.append(f"{prefix}{connector}{node_text}")
-
-        # Prepare for children
-        child_prefix = prefix + "│   " if connector.startswith("├") else prefix + "    "
+            return "AbsoluteValue"
+        return str(node)
 
+    def _children(self, node):
         # Process children based on node type
-        children = []
-
         if isinstance(node, BinaryOpNode):
-            children = [("left", node.left), ("right", node.right)]
+            return [("left", node.left), ("right", node.right)]
         elif isinstance(node, UnaryOpNode):
-            children = [("expr", node.expr)]
+            return [("expr", node.expr)]
         elif isinstance(node, AssignmentNode):
             if isinstance(node.variable, str):
-                children = [("variable", VariableNode(node.variable)), ("value", node.value)]
-            else:
-                children = [("variable", node.variable), ("value", node.value)]
+                return [("variable", VariableNode(node.variable)), ("value", node.value)]
+            return [("variable", node.variable), ("value", node.value)]
         elif isinstance(node, FunctionCallNode):
-            children = [("args", node.args)]
+            return [("args", node.args)]
         elif isinstance(node, AbsoluteValueNode):
-            children = [("expr", node.expr)]
-
-        # Process all children with proper branch connectors
-        for i, (child_label, child) in enumerate(children):
-            is_last = (i == len(children) - 1)
-            connector_char = "└── " if is_last else "├── "
-            self._build_tree(child, child_prefix, connector_char, child_label)
-
-def visualize_ast(ast_node, mode="text"):
+            return [("expr", node.expr)]
+        return []
+
+
+def dot_string(text):
+    return '"' + str(text).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+class DOTASTVisualizer(ASCIITreeVisualizer):
+    # Same labels and children as the ASCII tree, written as a Graphviz digraph
+
+    def write(self, node, out, max_depth=None, max_nodes=None):
+        # Streams DOT text and returns the number of nodes written. A node
+        # reached through several parents (as with a NodeFactory) is written
+        # once, with an edge from each parent. Children below max_depth are
+        # collapsed into one "..." node, and output stops after max_nodes nodes.
+        write = out.write
+        write("digraph AST {\n")
+        write("    node [shape=box fontname=\"Courier\"]\n")
+
+        ids = {}  # id(node) -> DOT name of the nodes already written
+        # _children() makes a temporary VariableNode for each assignment
+        # target; holding on to every written node keeps its id from being
+        # reused by a later temporary and mistaken for a shared node
+        written = []
+        count = 0
+        collapsed = 0
+        stack = [(node, 0, None, "")]
+        while stack:
+            node, depth, parent, label = stack.pop()
+            if node is None:
+                continue
+            name = ids.get(id(node))
+            if name is None:
+                if max_nodes is not None and count >= max_nodes:
+                    write(f'    stop [label="... (stopped after {max_nodes} nodes)" shape=plaintext]\n')
+                    break
+                name = ids[id(node)] = f"n{count}"
+                written.append(node)
+                count += 1
+                write(f"    {name} [label={dot_string(self._node_text(node))}]\n")
+
+                children = self._children(node)
+                if children and max_depth is not None and depth >= max_depth:
+                    write(f'    c{collapsed} [label="..." shape=plaintext]\n')
+                    write(f"    {name} -> c{collapsed}\n")
+                    collapsed += 1
+                else:
+                    for i in range(len(children) - 1, -1, -1):
+                        child_label, child = children[i]
+                        stack.append((child, depth + 1, name, child_label))
+            if parent is not None:
+                write(f"    {parent} -> {name} [label={dot_string(label)}]\n")
+        write("}\n")
+        return count
+
+
+def render_dot(path, format="png"):
+    # Runs Graphviz on one DOT file and returns the image path
+    output = f"{path.rsplit('.', 1)[0]}.{format}"
+    subprocess.run(["dot", f"-T{format}", path, "-o", output], check=True)
+    return output
+
+
+def render_asts(asts, prefix="ast", format="png", workers=4, max_depth=None, max_nodes=None):
+    # Writes prefix_0.dot, prefix_1.dot, ... and hands them to a pool of
+    # background Graphviz processes; returns one future per tree, whose result
+    # is the image path
+    visualizer = DOTASTVisualizer()
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = []
+    for i, ast in enumerate(asts):
+        path = f"{prefix}_{i}.dot"
+        with open(path, "w", encoding="utf-8") as out:
+            visualizer.write(ast, out, max_depth=max_depth, max_nodes=max_nodes)
+        futures.append(executor.submit(render_dot, path, format))
+    executor.shutdown(wait=False)
+    return futures
+
+
+def visualize_ast(ast_node, mode="text", stream=None, max_depth=None, max_nodes=None):
     if mode == "text":
         visualizer = TextASTVisualizer()
-        result = visualizer.visualize(ast_node)
-        print(result)
-        return result
-
     elif mode == "ascii":
         visualizer = ASCIITreeVisualizer()
-        result = visualizer.visualize(ast_node)
-        print(result)
-        return result
-
+    elif mode == "dot":
+        visualizer = DOTASTVisualizer()
     else:
         raise ValueError(f"Unknown visualization mode: {mode}")
+
+    # With a stream, lines are written as they are produced and nothing is kept
+    if stream is not None:
+        visualizer.write(ast_node, stream, max_depth=max_depth, max_nodes=max_nodes)
+        return None
+
+    result = visualizer.visualize(ast_node, max_depth=max_depth, max_nodes=max_nodes)
+    print(result)
+    return result
@@ -0,0 +1,100 @@
+import random
+import sys
+import time
+
+from tokenizer import tokenize
+from parser import Parser
+from stack_parser import StackParser
+from pratt_parser import PrattParser
+from flat_ast import FlatAST
+from serializer import serialize, deserialize
+
+BINARY_OPERATORS = ['+', '-', '*', '/', '%', '^']
+FUNCTIONS = ['sin', 'cos', 'sqrt']
+
+
+def random_expression(rng, terms, max_depth=3):
+    # `terms` operands joined by random operators, with shallow random nesting so
+    # the recursive parser stays well inside the recursion limit
+    parts = []
+    for i in range(terms):
+        if i:
+            parts.append(rng.choice(BINARY_OPERATORS))
+        parts.append(random_operand(rng, max_depth))
+    return ' '.join(parts)
+
+
+def random_operand(rng, depth):
+    choice = rng.random()
+    if depth <= 0 or choice < 0.5:
+        return random_atom(rng)
+    inner = random_expression(rng, rng.randint(1, 4), depth - 1)
+    if choice < 0.7:
+        return f"({inner})"
+    if choice < 0.8:
+        return f"|{inner}|"
+    if choice < 0.9:
+        return f"{rng.choice(FUNCTIONS)}({inner})"
+    # Unary minus takes a single factor and cannot be repeated
+    return f"-{random_atom(rng)}"
+
+
+def random_atom(rng):
+    return rng.choice([str(rng.randint(0, 99)), 'x', 'y', f"{rng.random():.3f}"])
+
+
+def flatten(node):
+    # Long operator chains are too deep for str(), so compare the flat encodings
+    flat = FlatAST.from_node(node)
+    return flat.opcodes, flat.operands, flat.floats, flat.names
+
+
+def best_time(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def benchmark_parsers(terms=20000, repeat=5, seed=0):
+    text = random_expression(random.Random(seed), terms)
+    tokens = tokenize(text)
+    print(f"Parsing {len(tokens)} tokens ({len(text)} characters), best of {repeat}")
+
+    expected = flatten(Parser(tokens).parse())
+    baseline = None
+    for parser_class in (Parser, StackParser, PrattParser):
+        if flatten(parser_class(tokens).parse()) != expected:
+            raise Exception(f"{parser_class.__name__} built a different tree")
+        elapsed = best_time(lambda: parser_class(tokens).parse(), repeat)
+        baseline = baseline or elapsed
+        print(f"  {parser_class.__name__:<12} {elapsed * 1000:9.2f} ms  {baseline / elapsed:5.2f}x")
+
+
+def benchmark_serializer(terms=20000, repeat=5, seed=0):
+    text = random_expression(random.Random(seed), terms)
+    tree = Parser(tokenize(text)).parse()
+    data = serialize(tree)
+    print(f"Loading {len(text)} characters of source vs {len(data)} serialized bytes, best of {repeat}")
+
+    if flatten(deserialize(data)) != flatten(tree):
+        raise Exception("Deserialized tree differs from the parsed one")
+    reparse = best_time(lambda: Parser(tokenize(text)).parse(), repeat)
+    decode = best_time(lambda: deserialize(data), repeat)
+    encode = best_time(lambda: serialize(tree), repeat)
+    print(f"  {'re-parse':<12} {reparse * 1000:9.2f} ms  {1:5.2f}x")
+    print(f"  {'deserialize':<12} {decode * 1000:9.2f} ms  {reparse / decode:5.2f}x")
+    print(f"  {'(serialize)':<12} {encode * 1000:9.2f} ms")
+
+
+def main():
+    terms = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    benchmark_parsers(terms)
+    benchmark_serializer(terms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import math
+import weakref
+
+from tokenizer import TokenType
+from evaluator import FUNCTIONS, factorial
+from ast_nodes import (
+    BinaryOpNode,
+    UnaryOpNode,
+    NumberNode,
+    VariableNode,
+    AssignmentNode,
+    FunctionCallNode,
+    AbsoluteValueNode
+)
+
+PYTHON_OPERATORS = {
+    TokenType.PLUS: '+',
+    TokenType.MINUS: '-',
+    TokenType.MULTIPLY: '*',
+    TokenType.DIVIDE: '/',
+    TokenType.MODULUS: '%',
+    TokenType.POWER: '**',
+}
+
+
+class CompiledExpression:
+    def __init__(self, function, variables, targets, source):
+        self.function = function
+        # Variable names in the order the function takes their values
+        self.variables = variables
+        # Variables assigned by the expression; their values follow the result
+        self.targets = targets
+        self.source = source
+
+    def __call__(self, *values):
+        if self.targets:
+            return self.function(*values)[0]
+        return self.function(*values)
+
+    def evaluate(self, env):
+        try:
+            values = [env[name] for name in self.variables]
+        except KeyError as e:
+            raise Exception(f"Evaluator error: Undefined variable: {e.args[0]}")
+
+        if not self.targets:
+            return self.function(*values)
+
+        result = self.function(*values)
+        for name, value in zip(self.targets, result[1:]):
+            env[name] = value
+        return result[0]
+
+
+class Compiler:
+    def __init__(self, functions=None):
+        self.functions = functions if functions is not None else dict(FUNCTIONS)
+        # Compiled forms live exactly as long as the tree they came from
+        self.cache = weakref.WeakKeyDictionary()
+
+        self.dispatch = {
+            NumberNode: self.emit_number,
+            VariableNode: self.emit_variable,
+            BinaryOpNode: self.emit_binary_op,
+            UnaryOpNode: self.emit_unary_op,
+            AssignmentNode: self.emit_assignment,
+            FunctionCallNode: self.emit_function_call,
+            AbsoluteValueNode: self.emit_absolute_value,
+        }
+
+    def error(self, message):
+        raise Exception(f"Compiler error: {message}")
+
+    def compile(self, node):
+        compiled = self.cache.get(node)
+        if compiled is None:
+            compiled = self.generate(node)
+            self.cache[node] = compiled
+        return compiled
+
+    def generate(self, root):
+        # Lower the tree to straight-line code with one temporary per operation,
+        # so nesting depth never reaches Python's own parser limits
+        self.lines = []
+        self.slots = {}
+        self.assigned = {}
+        self.targets = []
+        self.namespace = {'_factorial': factorial}
+        self.function_names = {}
+
+        # Results of finished children wait on a value stack for their parent.
+        # memo lets a subtree shared by several parents be emitted once; an
+        # assignment clears it, as in DAGEvaluator, since what was emitted
+        # before may have read the old value of the variable.
+        values = []
+        self.memo = {}
+        stack = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if not expanded:
+                result = self.memo.get(id(node))
+                if result is not None:
+                    values.append(result)
+                    continue
+                if node.child_fields:
+                    stack.append((node, True))
+                    for field in reversed(node.child_fields):
+                        stack.append((getattr(node, field), False))
+                    continue
+
+            emit = self.dispatch.get(node.__class__)
+            if emit is None:
+                self.error(f"Unsupported node: {node.__class__.__name__}")
+            count = len(node.child_fields)
+            args = values[len(values) - count:]
+            del values[len(values) - count:]
+            result = self.memo[id(node)] = emit(node, *args)
+            values.append(result)
+
+        returned = [values[-1]] + [value for _, value in self.targets]
+        variables = tuple(self.slots)
+        source = "\n".join(
+            [f"def _expression({', '.join(self.slots.values())}):"] +
+            [f"    {line}" for line in self.lines] +
+            [f"    return {', '.join(returned)}"]
+        )
+
+        exec(compile(source, "<expression>", "exec"), self.namespace)
+        return CompiledExpression(self.namespace['_expression'], variables,
+                                  tuple(name for name, _ in self.targets), source)
+
+    def temporary(self, expression):
+        name = f"_t{len(self.lines)}"
+        self.lines.append(f"{name} = {expression}")
+        return name
+
+    def emit_number(self, node):
+        # repr() of inf and nan is not a Python literal
+        if isinstance(node.value, float) and not math.isfinite(node.value):
+            return f"float('{node.value!r}')"
+        return f"({node.value!r})" if node.value < 0 else repr(node.value)
+
+    def emit_variable(self, node):
+        # A value assigned earlier in the same expression shadows the argument
+        if node.name in self.assigned:
+            return self.assigned[node.name]
+        slot = self.slots.get(node.name)
+        if slot is None:
+            slot = self.slots[node.name] = f"_v{len(self.slots)}"
+        return slot
+
+    def emit_binary_op(self, node, left, right):
+        operator = PYTHON_OPERATORS.get(node.op.type)
+        if operator is None:
+            self.error(f"Unsupported binary operator: {node.op.value}")
+        return self.temporary(f"{left} {operator} {right}")
+
+    def emit_unary_op(self, node, operand):
+        if node.op.type == TokenType.MINUS:
+            return self.temporary(f"-{operand}")
+        if node.op.type == TokenType.FACTORIAL:
+            return self.temporary(f"_factorial({operand})")
+        self.error(f"Unsupported unary operator: {node.op.value}")
+
+    def emit_assignment(self, node, value):
+        self.assigned[node.variable] = value
+        self.targets.append((node.variable, value))
+        self.memo.clear()
+        return value
+
+    def emit_function_call(self, node, argument):
+        name = self.function_names.get(node.name)
+        if name is None:
+            function = self.functions.get(node.name)
+            if function is None:
+                self.error(f"Unknown function: {node.name}")
+            name = self.function_names[node.name] = f"_f{len(self.function_names)}"
+            self.namespace[name] = function
+        return self.temporary(f"{name}({argument})")
+
+    def emit_absolute_value(self, node, operand):
+        return self.temporary(f"abs({operand})")
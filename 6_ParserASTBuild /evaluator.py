@@ -0,0 +1,132 @@
+import math
+import operator
+
+from tokenizer import TokenType
+from ast_nodes import (
+    BinaryOpNode,
+    UnaryOpNode,
+    NumberNode,
+    VariableNode,
+    AssignmentNode,
+    FunctionCallNode,
+    AbsoluteValueNode
+)
+
+
+def factorial(value):
+    # Exact for whole numbers, gamma function for everything else
+    if isinstance(value, int) or float(value).is_integer():
+        return math.factorial(int(value))
+    return math.gamma(value + 1)
+
+
+FUNCTIONS = {
+    'sin': math.sin,
+    'cos': math.cos,
+    'tan': math.tan,
+    'log': math.log,
+    'sqrt': math.sqrt,
+}
+
+BINARY_OPERATORS = {
+    TokenType.PLUS: operator.add,
+    TokenType.MINUS: operator.sub,
+    TokenType.MULTIPLY: operator.mul,
+    TokenType.DIVIDE: operator.truediv,
+    TokenType.MODULUS: operator.mod,
+    TokenType.POWER: operator.pow,
+}
+
+UNARY_OPERATORS = {
+    TokenType.MINUS: operator.neg,
+    TokenType.FACTORIAL: factorial,
+}
+
+
+class Evaluator:
+    def __init__(self, env=None, functions=None):
+        # Variable values, updated by every evaluated assignment
+        self.env = env if env is not None else {}
+        self.functions = functions if functions is not None else dict(FUNCTIONS)
+
+        # One handler per node class instead of an isinstance chain
+        self.dispatch = {
+            NumberNode: self.eval_number,
+            VariableNode: self.eval_variable,
+            BinaryOpNode: self.eval_binary_op,
+            UnaryOpNode: self.eval_unary_op,
+            AssignmentNode: self.eval_assignment,
+            FunctionCallNode: self.eval_function_call,
+            AbsoluteValueNode: self.eval_absolute_value,
+        }
+
+    def error(self, message):
+        raise Exception(f"Evaluator error: {message}")
+
+    def evaluate(self, node):
+        handler = self.dispatch.get(node.__class__)
+        if handler is None:
+            self.error(f"Unsupported node: {node.__class__.__name__}")
+        return handler(node)
+
+    def eval_number(self, node):
+        return node.value
+
+    def eval_variable(self, node):
+        try:
+            return self.env[node.name]
+        except KeyError:
+            self.error(f"Undefined variable: {node.name}")
+
+    def eval_binary_op(self, node):
+        function = BINARY_OPERATORS.get(node.op.type)
+        if function is None:
+            self.error(f"Unsupported binary operator: {node.op.value}")
+        return function(self.evaluate(node.left), self.evaluate(node.right))
+
+    def eval_unary_op(self, node):
+        function = UNARY_OPERATORS.get(node.op.type)
+        if function is None:
+            self.error(f"Unsupported unary operator: {node.op.value}")
+        return function(self.evaluate(node.expr))
+
+    def eval_assignment(self, node):
+        value = self.evaluate(node.value)
+        self.env[node.variable] = value
+        return value
+
+    def eval_function_call(self, node):
+        function = self.functions.get(node.name)
+        if function is None:
+            self.error(f"Unknown function: {node.name}")
+        return function(self.evaluate(node.args))
+
+    def eval_absolute_value(self, node):
+        return abs(self.evaluate(node.expr))
+
+
+class DAGEvaluator(Evaluator):
+    # For trees built by a NodeFactory: a node shared by several parents is
+    # evaluated once per call instead of once per occurrence
+    def __init__(self, env=None, functions=None):
+        super().__init__(env, functions)
+        self.memo = None
+
+    def evaluate(self, node):
+        if self.memo is None:
+            self.memo = {}
+            try:
+                return self.evaluate(node)
+            finally:
+                self.memo = None
+
+        value = self.memo.get(id(node), self.memo)
+        if value is self.memo:
+            value = self.memo[id(node)] = super().evaluate(node)
+        return value
+
+    def eval_assignment(self, node):
+        value = super().eval_assignment(node)
+        # Values remembered so far may depend on the old value of the variable
+        self.memo.clear()
+        return value
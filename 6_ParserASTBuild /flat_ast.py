@@ -0,0 +1,255 @@
+import struct
+import sys
+from array import array
+
+from tokenizer import Token, TokenType
+from evaluator import BINARY_OPERATORS, FUNCTIONS, factorial
+from ast_nodes import (
+    BinaryOpNode,
+    UnaryOpNode,
+    NumberNode,
+    VariableNode,
+    AssignmentNode,
+    FunctionCallNode,
+    AbsoluteValueNode
+)
+
+# Opcodes. The operand of a node is an index into the float or name pool,
+# the integer literal itself, or unused (0) for operators.
+INTEGER = 0       # operand: the value
+FLOAT = 1         # operand: index into floats
+BIG_INTEGER = 2   # operand: index into names, holding hex(value)
+VARIABLE = 3      # operand: index into names
+ADD = 4
+SUBTRACT = 5
+MULTIPLY = 6
+DIVIDE = 7
+MODULUS = 8
+POWER = 9
+NEGATE = 10
+FACTORIAL = 11
+ABSOLUTE = 12
+CALL = 13         # operand: index into names, the function name
+ASSIGN = 14       # operand: index into names, the variable name
+
+BINARY_OPCODES = {
+    TokenType.PLUS: ADD,
+    TokenType.MINUS: SUBTRACT,
+    TokenType.MULTIPLY: MULTIPLY,
+    TokenType.DIVIDE: DIVIDE,
+    TokenType.MODULUS: MODULUS,
+    TokenType.POWER: POWER,
+}
+
+UNARY_OPCODES = {
+    TokenType.MINUS: NEGATE,
+    TokenType.FACTORIAL: FACTORIAL,
+}
+
+# Operator tokens recreated when converting back to nodes
+OPCODE_TOKENS = {
+    ADD: Token(TokenType.PLUS, '+'),
+    SUBTRACT: Token(TokenType.MINUS, '-'),
+    MULTIPLY: Token(TokenType.MULTIPLY, '*'),
+    DIVIDE: Token(TokenType.DIVIDE, '/'),
+    MODULUS: Token(TokenType.MODULUS, '%'),
+    POWER: Token(TokenType.POWER, '^'),
+    NEGATE: Token(TokenType.MINUS, '-'),
+    FACTORIAL: Token(TokenType.FACTORIAL, '!'),
+}
+
+# Indexed by opcode, for the evaluation loop
+BINARY_FUNCTIONS = [None] * (ASSIGN + 1)
+for _token_type, _opcode in BINARY_OPCODES.items():
+    BINARY_FUNCTIONS[_opcode] = BINARY_OPERATORS[_token_type]
+
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+HEADER = struct.Struct('<4sQQQ')
+MAGIC = b'FAST'
+
+
+class FlatAST:
+    def __init__(self):
+        # One entry per node, in post-order: children come right before their parent
+        self.opcodes = array('B')
+        self.operands = array('q')
+        # Size of the subtree rooted at each node; the child before node i
+        # starts at i - 1, the one before that at i - 1 - sizes[i - 1]
+        self.sizes = array('q')
+        self.floats = array('d')
+        self.names = []
+        self.name_ids = {}
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    def name_id(self, name):
+        index = self.name_ids.get(name)
+        if index is None:
+            index = self.name_ids[name] = len(self.names)
+            self.names.append(name)
+        return index
+
+    def append(self, opcode, operand, size):
+        self.opcodes.append(opcode)
+        self.operands.append(operand)
+        self.sizes.append(size)
+
+    @classmethod
+    def from_node(cls, root):
+        flat = cls()
+        stack = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if not expanded and node.child_fields:
+                stack.append((node, True))
+                for field in reversed(node.child_fields):
+                    stack.append((getattr(node, field), False))
+                continue
+            flat.add_node(node)
+        return flat
+
+    def add_node(self, node):
+        # Called in post-order, so the node's children are the entries just before it
+        end = len(self.opcodes)
+        size = 1
+        for _ in node.child_fields:
+            size += self.sizes[end - size]
+
+        if isinstance(node, NumberNode):
+            value = node.value
+            if isinstance(value, float):
+                self.append(FLOAT, len(self.floats), 1)
+                self.floats.append(value)
+            elif INT64_MIN <= value <= INT64_MAX:
+                self.append(INTEGER, value, 1)
+            else:
+                # Hex, since int <-> decimal str is capped at 4300 digits
+                self.append(BIG_INTEGER, self.name_id(hex(value)), 1)
+        elif isinstance(node, VariableNode):
+            self.append(VARIABLE, self.name_id(node.name), 1)
+        elif isinstance(node, BinaryOpNode):
+            self.append(BINARY_OPCODES[node.op.type], 0, size)
+        elif isinstance(node, UnaryOpNode):
+            self.append(UNARY_OPCODES[node.op.type], 0, size)
+        elif isinstance(node, AbsoluteValueNode):
+            self.append(ABSOLUTE, 0, size)
+        elif isinstance(node, FunctionCallNode):
+            self.append(CALL, self.name_id(node.name), size)
+        elif isinstance(node, AssignmentNode):
+            self.append(ASSIGN, self.name_id(node.variable), size)
+        else:
+            raise ValueError(f"Unsupported node: {node.__class__.__name__}")
+
+    def to_node(self):
+        names = self.names
+        floats = self.floats
+        stack = []
+        for opcode, operand in zip(self.opcodes, self.operands):
+            if opcode == INTEGER:
+                stack.append(NumberNode(operand))
+            elif opcode == FLOAT:
+                stack.append(NumberNode(floats[operand]))
+            elif opcode == BIG_INTEGER:
+                stack.append(NumberNode(int(names[operand], 16)))
+            elif opcode == VARIABLE:
+                stack.append(VariableNode(names[operand]))
+            elif opcode <= POWER:
+                right = stack.pop()
+                stack[-1] = BinaryOpNode(stack[-1], OPCODE_TOKENS[opcode], right)
+            elif opcode <= FACTORIAL:
+                stack[-1] = UnaryOpNode(OPCODE_TOKENS[opcode], stack[-1])
+            elif opcode == ABSOLUTE:
+                stack[-1] = AbsoluteValueNode(stack[-1])
+            elif opcode == CALL:
+                stack[-1] = FunctionCallNode(names[operand], stack[-1])
+            else:
+                stack[-1] = AssignmentNode(names[operand], stack[-1])
+        return stack[-1] if stack else None
+
+    def children(self, index):
+        # Indices of a node's children, left to right
+        result = []
+        child = index - 1
+        remaining = self.sizes[index] - 1
+        while remaining > 0:
+            result.append(child)
+            remaining -= self.sizes[child]
+            child -= self.sizes[child]
+        result.reverse()
+        return result
+
+    def evaluate(self, env=None, functions=None):
+        env = env if env is not None else {}
+        functions = functions if functions is not None else FUNCTIONS
+        names = self.names
+        floats = self.floats
+        binary = BINARY_FUNCTIONS
+
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        for opcode, operand in zip(self.opcodes, self.operands):
+            if opcode == INTEGER:
+                push(operand)
+            elif opcode == VARIABLE:
+                try:
+                    push(env[names[operand]])
+                except KeyError:
+                    raise Exception(f"Evaluator error: Undefined variable: {names[operand]}")
+            elif opcode <= POWER and opcode >= ADD:
+                right = pop()
+                stack[-1] = binary[opcode](stack[-1], right)
+            elif opcode == FLOAT:
+                push(floats[operand])
+            elif opcode == NEGATE:
+                stack[-1] = -stack[-1]
+            elif opcode == ABSOLUTE:
+                stack[-1] = abs(stack[-1])
+            elif opcode == CALL:
+                function = functions.get(names[operand])
+                if function is None:
+                    raise Exception(f"Evaluator error: Unknown function: {names[operand]}")
+                stack[-1] = function(stack[-1])
+            elif opcode == FACTORIAL:
+                stack[-1] = factorial(stack[-1])
+            elif opcode == ASSIGN:
+                env[names[operand]] = stack[-1]
+            else:
+                push(int(names[operand], 16))
+        return stack[-1] if stack else None
+
+    def to_bytes(self):
+        # Header, then the raw arrays, all little-endian, then the name pool
+        arrays = [self.opcodes, self.operands, self.sizes, self.floats]
+        if sys.byteorder == 'big':
+            arrays = [array(a.typecode, a) for a in arrays]
+            for a in arrays:
+                a.byteswap()
+        names = '\0'.join(self.names).encode('utf-8')
+        header = HEADER.pack(MAGIC, len(self.opcodes), len(self.floats), len(self.names))
+        return b''.join([header] + [a.tobytes() for a in arrays] + [names])
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = memoryview(data)
+        magic, count, float_count, name_count = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a flat AST buffer")
+
+        flat = cls()
+        offset = HEADER.size
+        for a, length in ((flat.opcodes, count), (flat.operands, count),
+                          (flat.sizes, count), (flat.floats, float_count)):
+            end = offset + length * a.itemsize
+            a.frombytes(data[offset:end])
+            if sys.byteorder == 'big':
+                a.byteswap()
+            offset = end
+
+        if name_count:
+            flat.names = str(data[offset:], 'utf-8').split('\0')
+        flat.name_ids = {name: index for index, name in enumerate(flat.names)}
+        return flat
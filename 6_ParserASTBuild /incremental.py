@@ -0,0 +1,242 @@
+from bisect import bisect_left
+
+from tokenizer import SINGLE_CHAR_TOKENS, Token, Tokenizer, TokenType, tokenize
+from parser import Parser
+from symbol_table import SymbolTable
+
+# Operators are single characters, so they never merge with a neighbour
+OPERATOR_TYPES = set(SINGLE_CHAR_TOKENS.values())
+
+
+class IncrementalDocument:
+    # Tokens before the gap index hold offsets from the start of the text and
+    # the rest hold offsets from its end, stored as negative numbers. An edit
+    # leaves both kinds valid as long as the gap sits at the edit, so only
+    # the tokens the gap moves over and the relexed window are rewritten.
+    # Reading tokens settles every offset; tokens reached through the AST
+    # before that may still hold end-relative offsets.
+    def __init__(self, text, symbols=None):
+        self.text = text
+        self.symbols = symbols if symbols is not None else SymbolTable()
+        self._tokens = None
+        self._gap = 0
+        self.ast = None
+        self.error = None
+        self.groups = []
+        self.parents = {}
+
+        # Size of the work done by the last update, in tokens
+        self.relexed = 0
+        self.reparsed = 0
+        self.shifted = 0
+
+        self._relex_all()
+
+    @property
+    def tokens(self):
+        if self._tokens is not None:
+            self._move_gap(len(self._tokens))
+        return self._tokens
+
+    def __getitem__(self, index):
+        # Document tokens use the document as their source, so Token.text
+        # always slices the current text
+        if isinstance(index, slice):
+            index = slice(self._offset(index.start), self._offset(index.stop))
+        return self.text[index]
+
+    def edit(self, offset, deleted, inserted):
+        if offset < 0 or deleted < 0 or offset + deleted > len(self.text):
+            raise ValueError(f"Edit ({offset}, {deleted}) is outside the document")
+
+        self.shifted = 0
+        if self._tokens is None:
+            self.text = self.text[:offset] + inserted + self.text[offset + deleted:]
+            self._relex_all()
+        else:
+            self._relex_window(offset, deleted, inserted)
+        return self.ast
+
+    def _offset(self, position):
+        if position is None or position >= 0:
+            return position
+        return position + len(self.text) + 1
+
+    def _token_start(self, token):
+        return self._offset(token.start)
+
+    def _token_end(self, token):
+        return self._offset(token.end)
+
+    def _move_gap(self, index):
+        # Only one of the two loops runs, over the tokens between the old and new gap
+        tokens = self._tokens
+        length = len(self.text) + 1
+        for token in tokens[self._gap:index]:
+            token.start += length
+            token.end += length
+        for token in tokens[index:self._gap]:
+            token.start -= length
+            token.end -= length
+        self.shifted += abs(index - self._gap)
+        self._gap = index
+
+    def _relex_all(self):
+        try:
+            tokens = tokenize(self.text, symbols=self.symbols)
+        except Exception as e:
+            self._tokens = None
+            self.ast = None
+            self.error = str(e)
+            return
+
+        for token in tokens:
+            token.source = self
+        self._tokens = tokens
+        self._gap = len(tokens)
+        self.relexed = len(tokens)
+        self._parse_all()
+
+    def _relex_window(self, offset, deleted, inserted):
+        tokens = self._tokens
+
+        # Start at the first token touching the edit: it may merge with the inserted text
+        first = bisect_left(tokens, offset, key=self._token_end)
+        if self._token_end(tokens[first]) == offset and tokens[first].type in OPERATOR_TYPES:
+            first += 1
+        relex_from = min(self._token_start(tokens[first]), offset)
+
+        # Old tokens lying wholly after the deleted range are candidates for reuse
+        k = max(first, bisect_left(tokens, offset + deleted, key=self._token_start))
+
+        # Counted from the end, the tokens from the window on follow the edit by themselves
+        self._move_gap(first)
+        old_text = self.text
+        self.text = self.text[:offset] + inserted + self.text[offset + deleted:]
+
+        lexer = Tokenizer(self.text, self.symbols, relex_from)
+        fresh = []
+        try:
+            while True:
+                token = lexer.get_next_token()
+                while self._token_start(tokens[k]) < token.start:
+                    k += 1
+                old = tokens[k]
+                # The lexer keeps no state between tokens, so once a new token lines
+                # up with an old one, the rest of the old stream is still valid
+                if (self._token_start(old) == token.start and self._token_end(old) == token.end
+                        and old.type == token.type):
+                    break
+                fresh.append(token)
+        except Exception as e:
+            self._tokens = None
+            self.ast = None
+            self.error = str(e)
+            return
+
+        # Replaced tokens keep their place in the old text and no longer
+        # count as part of the document
+        length = len(old_text) + 1
+        for token in tokens[first:k]:
+            token.start += length
+            token.end += length
+            token.source = old_text
+        for token in fresh:
+            token.source = self
+        group = self._enclosing_group(relex_from, self._token_start(tokens[k]))
+
+        tokens[first:k] = fresh
+        self._gap = first + len(fresh)
+
+        self.relexed = len(fresh)
+        if self.ast is None or group is None or not self._reparse_group(group):
+            self._parse_all()
+
+    def _enclosing_group(self, start, end):
+        # Innermost bracketed group whose delimiters lie outside the changed window
+        best = None
+        for group in self.groups:
+            if group[0].source is not self or group[1].source is not self:
+                continue  # a delimiter was replaced by this edit
+            if self._token_end(group[0]) <= start and self._token_start(group[1]) >= end:
+                if best is None or self._token_start(group[0]) > self._token_start(best[0]):
+                    best = group
+        return best
+
+    def _parse_all(self):
+        self.groups = []
+        self.parents = {}
+        tokens = self.tokens  # a full parse reads every token, so settle them first
+        self.reparsed = len(tokens)
+        try:
+            self.ast = Parser(tokens, self.groups).parse()
+            self.error = None
+        except Exception as e:
+            self.ast = None
+            self.error = str(e)
+            return
+        self._link(self.ast)
+
+    def _reparse_group(self, group):
+        open_token, close_token, old_node, method = group
+        tokens = self._tokens
+        inner_start = self._token_end(open_token)
+        inner_end = self._token_start(close_token)
+        lo = bisect_left(tokens, self._token_start(open_token), key=self._token_start) + 1
+        hi = bisect_left(tokens, inner_end, key=self._token_start)
+
+        eof = Token(TokenType.EOF, None, inner_end, inner_end, self)
+        groups = []
+        parser = Parser(tokens[lo:hi] + [eof], groups)
+        try:
+            node = getattr(parser, method)()
+        except Exception:
+            return False
+        if parser.current_token is not eof:
+            return False
+
+        # Swap the new subtree in where the old one hung
+        link = self.parents.pop(old_node, None)
+        if link is None:
+            self.ast = node
+        else:
+            setattr(link[0], link[1], node)
+        self._unlink(old_node)
+        self._link(node)
+        if link is not None:
+            self.parents[node] = link
+
+        kept = []
+        for g in self.groups:
+            if g[0].source is not self or g[1].source is not self:
+                continue
+            if self._token_start(g[0]) >= inner_start and self._token_end(g[1]) <= inner_end:
+                continue
+            if g[2] is old_node:
+                g = (g[0], g[1], node, g[3])
+            kept.append(g)
+        self.groups = kept + groups
+
+        self.reparsed = hi - lo
+        self.error = None
+        return True
+
+    def _link(self, root):
+        parents = self.parents
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            for field in node.child_fields:
+                child = getattr(node, field)
+                parents[child] = (node, field)
+                stack.append(child)
+
+    def _unlink(self, root):
+        parents = self.parents
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            for field in node.child_fields:
+                child = getattr(node, field)
+                parents.pop(child, None)
+                stack.append(child)
@@ -1,6 +1,7 @@
 from tokenizer import tokenize
 from parser import Parser
 from ast_visualizer import visualize_ast
+from evaluator import Evaluator
 
 from ast_nodes import (
     BinaryOpNode,
@@ -61,42 +62,40 @@ def print_ast(node, indent=0):
 
 
 def print_ast_value(node):
-    if node is None:
-        print("None", end='')
-        return
+    # Pieces are printed left to right off an explicit stack, so deep trees
+    # do not hit the recursion limit
+    stack = [node]
+    while stack:
+        node = stack.pop()
 
-    if isinstance(node, NumberNode):
-        print(f"Number({node.value})", end='')
+        if isinstance(node, str):
+            print(node, end='')
 
-    elif isinstance(node, BinaryOpNode):
-        op_value = node.op.value if hasattr(node.op, 'value') else node.op
-        print(f"BinaryOp({op_value}, ", end='')
-        print_ast_value(node.left)
-        print(", ", end='')
-        print_ast_value(node.right)
-        print(")", end='')
+        elif node is None:
+            print("None", end='')
 
-    elif isinstance(node, UnaryOpNode):
-        op_value = node.op.value if hasattr(node.op, 'value') else node.op
-        print(f"UnaryOp({op_value}, ", end='')
-        print_ast_value(node.expr)
-        print(")", end='')
+        elif isinstance(node, NumberNode):
+            print(f"Number({node.value})", end='')
 
-    elif isinstance(node, FunctionCallNode):
-        print(f"Function({node.name}, ", end='')
-        print_ast_value(node.args)
-        print(")", end='')
+        elif isinstance(node, BinaryOpNode):
+            op_value = node.op.value if hasattr(node.op, 'value') else node.op
+            stack.extend([")", node.right, ", ", node.left, f"BinaryOp({op_value}, "])
 
-    elif isinstance(node, AbsoluteValueNode):
-        print(f"Abs(", end='')
-        print_ast_value(node.expr)
-        print(")", end='')
+        elif isinstance(node, UnaryOpNode):
+            op_value = node.op.value if hasattr(node.op, 'value') else node.op
+            stack.extend([")", node.expr, f"UnaryOp({op_value}, "])
 
-    elif isinstance(node, VariableNode):
-        print(f"Variable({node.name})", end='')
+        elif isinstance(node, FunctionCallNode):
+            stack.extend([")", node.args, f"Function({node.name}, "])
 
-    else:
-        print(f"{node}", end='')
+        elif isinstance(node, AbsoluteValueNode):
+            stack.extend([")", node.expr, "Abs("])
+
+        elif isinstance(node, VariableNode):
+            print(f"Variable({node.name})", end='')
+
+        else:
+            print(f"{node}", end='')
 
 
 def test_parser(expr, use_regex_lexer=False):
@@ -129,6 +128,8 @@ def test_visualize(expr):
     print("\nASCII TREE VISUALIZATION:")
     visualize_ast(ast, "ascii")
 
+    print("\nVALUE:")
+    print(evaluator.evaluate(ast))
 
     print("\n" + "*" * 50 + "\n")
 
@@ -147,6 +148,9 @@ expressions = [
 
 print("*" * 50)
 
+# Shared across expressions so later ones can use earlier assignments
+evaluator = Evaluator()
+
 for expr in expressions:
     test_parser(expr, use_regex_lexer=False)
     test_visualize(expr)
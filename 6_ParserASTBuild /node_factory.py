@@ -0,0 +1,61 @@
+import weakref
+
+from tokenizer import Token
+from ast_nodes import Node
+
+
+class NodeFactory:
+    def __init__(self):
+        # Structural key -> the one live node with that structure
+        self.table = weakref.WeakValueDictionary()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.table)
+
+    def key(self, node_class, args):
+        # Children are already shared, so their identity stands for their structure
+        parts = [node_class]
+        for arg in args:
+            if isinstance(arg, Node):
+                parts.append(id(arg))
+            elif isinstance(arg, Token):
+                parts.append(arg.type)
+            else:
+                # Keep 1 and 1.0 apart: they print and divide differently
+                parts.append((arg.__class__, arg))
+        return tuple(parts)
+
+    def __call__(self, node_class, *args):
+        key = self.key(node_class, args)
+        node = self.table.get(key)
+        if node is None:
+            node = node_class(*args)
+            self.table[key] = node
+            self.misses += 1
+        else:
+            self.hits += 1
+        return node
+
+    def intern(self, root):
+        # Rebuild an existing tree bottom-up so identical subtrees become one node
+        results = {}
+        stack = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if id(node) in results:
+                continue
+            if not expanded and node.child_fields:
+                stack.append((node, True))
+                for field in reversed(node.child_fields):
+                    stack.append((getattr(node, field), False))
+                continue
+
+            args = []
+            for field in node.fields:
+                value = getattr(node, field)
+                args.append(results[id(value)] if field in node.child_fields else value)
+            results[id(node)] = self(node.__class__, *args)
+
+        return results[id(root)]
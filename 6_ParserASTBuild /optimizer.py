@@ -0,0 +1,199 @@
+import math
+
+from tokenizer import TokenType
+from evaluator import BINARY_OPERATORS, FUNCTIONS, factorial
+from ast_nodes import (
+    BinaryOpNode,
+    UnaryOpNode,
+    NumberNode,
+    VariableNode,
+    AssignmentNode,
+    FunctionCallNode,
+    AbsoluteValueNode
+)
+
+# (operator, literal on the right) pairs for which `x op literal` is just x
+RIGHT_IDENTITIES = {
+    (TokenType.PLUS, 0),
+    (TokenType.MINUS, 0),
+    (TokenType.MULTIPLY, 1),
+    (TokenType.DIVIDE, 1),
+    (TokenType.POWER, 1),
+}
+
+# Same for `literal op x`
+LEFT_IDENTITIES = {
+    (TokenType.PLUS, 0),
+    (TokenType.MULTIPLY, 1),
+}
+
+# Folded integers stay well under the 4300-digit limit on int -> str, so
+# printing and serializing an optimized tree keeps working, and no single
+# fold spends long on arithmetic
+MAX_FOLDED_BITS = 10000
+# 1000! has 2568 digits
+MAX_FACTORIAL_ARGUMENT = 1000
+
+
+def power_too_large(base, exponent):
+    # Estimates the size of an integer power from bit lengths instead of computing it
+    if not isinstance(base, int) or not isinstance(exponent, int) or exponent <= 0 or abs(base) <= 1:
+        return False
+    return (abs(base).bit_length() - 1) * exponent > MAX_FOLDED_BITS
+
+
+def count_nodes(root):
+    seen = set()
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if id(node) not in seen:
+            seen.add(id(node))
+            stack.extend(getattr(node, field) for field in node.child_fields)
+    return len(seen)
+
+
+def is_number(node):
+    return isinstance(node, NumberNode)
+
+
+class Optimizer:
+    def __init__(self, functions=None):
+        self.functions = functions if functions is not None else dict(FUNCTIONS)
+
+        self.dispatch = {
+            NumberNode: self.optimize_leaf,
+            VariableNode: self.optimize_leaf,
+            BinaryOpNode: self.optimize_binary_op,
+            UnaryOpNode: self.optimize_unary_op,
+            AssignmentNode: self.optimize_assignment,
+            FunctionCallNode: self.optimize_function_call,
+            AbsoluteValueNode: self.optimize_absolute_value,
+        }
+
+    def optimize(self, root):
+        # Returns a new tree (unchanged subtrees are shared with the input) and stats
+        self.folded = 0
+        self.simplified = 0
+
+        results = {}
+        stack = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if id(node) in results:
+                continue
+            if not expanded and node.child_fields:
+                stack.append((node, True))
+                for field in reversed(node.child_fields):
+                    stack.append((getattr(node, field), False))
+                continue
+            results[id(node)] = self.dispatch[node.__class__](node, results)
+
+        optimized = results[id(root)]
+        before = count_nodes(root)
+        after = count_nodes(optimized)
+        stats = {
+            'nodes_before': before,
+            'nodes_after': after,
+            'removed': before - after,
+            'folded': self.folded,
+            'simplified': self.simplified,
+        }
+        return optimized, stats
+
+    def fold(self, function, *values):
+        # Leave the expression alone if computing it fails, leaves the reals,
+        # overflows to inf or nan, or gives an integer too long to keep
+        try:
+            value = function(*values)
+        except (ArithmeticError, ValueError):
+            return None
+        if not isinstance(value, (int, float)):
+            return None
+        if isinstance(value, float) and not math.isfinite(value):
+            return None
+        if isinstance(value, int) and value.bit_length() > MAX_FOLDED_BITS:
+            return None
+        self.folded += 1
+        return NumberNode(value)
+
+    def optimize_leaf(self, node, results):
+        return node
+
+    def optimize_binary_op(self, node, results):
+        left = results[id(node.left)]
+        right = results[id(node.right)]
+        op = node.op.type
+
+        if is_number(left) and is_number(right) and not (
+                op == TokenType.POWER and power_too_large(left.value, right.value)):
+            folded = self.fold(BINARY_OPERATORS[op], left.value, right.value)
+            if folded is not None:
+                return folded
+
+        if is_number(right) and (op, right.value) in RIGHT_IDENTITIES:
+            self.simplified += 1
+            return left
+        if is_number(left) and (op, left.value) in LEFT_IDENTITIES:
+            self.simplified += 1
+            return right
+
+        if left is node.left and right is node.right:
+            return node
+        return BinaryOpNode(left, node.op, right)
+
+    def optimize_unary_op(self, node, results):
+        expr = results[id(node.expr)]
+
+        if node.op.type == TokenType.MINUS:
+            # -5 becomes the literal -5, and --x becomes x
+            if is_number(expr):
+                self.folded += 1
+                return NumberNode(-expr.value)
+            if isinstance(expr, UnaryOpNode) and expr.op.type == TokenType.MINUS:
+                self.simplified += 1
+                return expr.expr
+
+        elif (node.op.type == TokenType.FACTORIAL and is_number(expr)
+              and expr.value <= MAX_FACTORIAL_ARGUMENT):
+            folded = self.fold(factorial, expr.value)
+            if folded is not None:
+                return folded
+
+        if expr is node.expr:
+            return node
+        return UnaryOpNode(node.op, expr)
+
+    def optimize_assignment(self, node, results):
+        value = results[id(node.value)]
+        if value is node.value:
+            return node
+        return AssignmentNode(node.variable, value)
+
+    def optimize_function_call(self, node, results):
+        args = results[id(node.args)]
+
+        function = self.functions.get(node.name)
+        if function is not None and is_number(args):
+            folded = self.fold(function, args.value)
+            if folded is not None:
+                return folded
+
+        if args is node.args:
+            return node
+        return FunctionCallNode(node.name, args)
+
+    def optimize_absolute_value(self, node, results):
+        expr = results[id(node.expr)]
+
+        if is_number(expr):
+            self.folded += 1
+            return NumberNode(abs(expr.value))
+        if isinstance(expr, AbsoluteValueNode):
+            # ||x|| is |x|
+            self.simplified += 1
+            return expr
+
+        if expr is node.expr:
+            return node
+        return AbsoluteValueNode(expr)
@@ -0,0 +1,128 @@
+import sys
+import threading
+import types
+from collections import OrderedDict
+
+from tokenizer import tokenize
+from parser import Parser
+from symbol_table import SymbolTable
+from ast_nodes import Node
+
+
+def estimate_size(source, value):
+    # Rough memory cost of an entry: the key plus every node object and its
+    # attribute dict. Other values, such as a CompiledExpression, count their
+    # attributes, the containers they hold and the code of their functions;
+    # function globals and modules are shared, so they are left out.
+    size = sys.getsizeof(source)
+    seen = set()
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, Node):
+            size += sys.getsizeof(item.__dict__)
+            stack.extend(getattr(item, field) for field in item.child_fields)
+        elif isinstance(item, (tuple, list, set, frozenset)):
+            stack.extend(item)
+        elif isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, types.FunctionType):
+            stack.append(item.__code__)
+        elif isinstance(item, types.CodeType):
+            stack.extend((item.co_code, item.co_consts, item.co_names, item.co_varnames))
+        elif hasattr(item, '__dict__') and not isinstance(item, (type, types.ModuleType)):
+            stack.append(item.__dict__)
+    return size
+
+
+class ParseCache:
+    # Source text -> parsed (and optionally transformed) expression, least
+    # recently used entries evicted first. Cached trees are shared between
+    # callers and must not be modified.
+    def __init__(self, max_entries=1024, max_bytes=None, transform=None, symbols=None,
+                 parser_class=Parser, factory=None, sizeof=estimate_size):
+        if max_entries is not None and max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # Applied to each new AST before it is stored, e.g. Compiler().compile
+        self.transform = transform
+        self.symbols = symbols if symbols is not None else SymbolTable()
+        self.parser_class = parser_class
+        self.factory = factory
+        self.sizeof = sizeof
+
+        self.entries = OrderedDict()  # source -> (value, size)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, source):
+        return source in self.entries
+
+    def get(self, source):
+        with self.lock:
+            entry = self.entries.get(source)
+            if entry is not None:
+                self.entries.move_to_end(source)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Parse without holding the lock so other threads can still hit the
+        # cache; syntax errors propagate and are not cached
+        value = self.build(source)
+        size = self.sizeof(source, value)
+
+        with self.lock:
+            entry = self.entries.get(source)
+            if entry is not None:
+                # Another thread stored the same source meanwhile; keep its value
+                self.entries.move_to_end(source)
+                return entry[0]
+            self.entries[source] = (value, size)
+            self.bytes += size
+            self.evict()
+        return value
+
+    def build(self, source):
+        tokens = tokenize(source, symbols=self.symbols)
+        value = self.parser_class(tokens, factory=self.factory).parse()
+        if self.transform is not None:
+            value = self.transform(value)
+        return value
+
+    def evict(self):
+        # Always keep the newest entry, even if it alone is over max_bytes
+        while len(self.entries) > 1 and (
+                (self.max_entries is not None and len(self.entries) > self.max_entries) or
+                (self.max_bytes is not None and self.bytes > self.max_bytes)):
+            _, (_, size) = self.entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        # Needed after changing the symbol table's functions, which changes tokenization
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
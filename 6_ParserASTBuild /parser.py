@@ -1,4 +1,7 @@
-from tokenizer import TokenType
+from collections import deque
+
+from tokenizer import Token, Tokenizer, TokenType
+from symbol_table import SymbolTable
 from ast_nodes import (
     BinaryOpNode,
     UnaryOpNode,
@@ -10,13 +13,26 @@ from ast_nodes import (
 )
 
 
+def build_node(node_class, *args):
+    return node_class(*args)
+
+
 class Parser:
-    def __init__(self, tokens):
+    def __init__(self, tokens, groups=None, factory=None):
         self.tokens = tokens
+        # Every node is created through this callable, e.g. a NodeFactory that shares subtrees
+        self.make = factory if factory is not None else build_node
+        # When a list is given, every bracketed group is recorded in it as
+        # (opening token, closing token, inner node, method that parsed it)
+        self.groups = groups
         self.pos = 0
         self.current_token = self.tokens[self.pos] if self.tokens else None
 
     def error(self, message):
+        # Tokens carry their source span, so report the character offset too
+        token = self.current_token
+        if token is not None and token.start is not None:
+            raise Exception(f"Parser error: {message} at position {self.pos} (offset {token.start})")
         raise Exception(f"Parser error: {message} at position {self.pos}")
 
     def advance(self):
@@ -61,7 +77,7 @@ class Parser:
             self.advance()  # consume the '=' operator
 
             value = self.add_expr()  # parse the expression after '='
-            return AssignmentNode(var_name, value)
+            return self.make(AssignmentNode, var_name, value)
 
         # otherwise, parse as an addition/subtraction expression
         return self.add_expr()
@@ -74,7 +90,7 @@ class Parser:
             op = self.current_token
             self.advance()
             right = self.mul_expr()
-            node = BinaryOpNode(node, op, right)
+            node = self.make(BinaryOpNode, node, op, right)
 
         return node
 
@@ -86,7 +102,7 @@ class Parser:
             op = self.current_token
             self.advance()
             right = self.pow_expr()
-            node = BinaryOpNode(node, op, right)
+            node = self.make(BinaryOpNode, node, op, right)
 
         return node
 
@@ -97,7 +113,7 @@ class Parser:
             op = self.current_token
             self.advance()
             right = self.unary_expr()
-            node = BinaryOpNode(node, op, right)
+            node = self.make(BinaryOpNode, node, op, right)
 
         return node
 
@@ -107,7 +123,7 @@ class Parser:
             op = self.current_token
             self.advance()
             expr = self.factor()
-            return UnaryOpNode(op, expr)
+            return self.make(UnaryOpNode, op, expr)
 
         # Parse regular factor
         node = self.factor()
@@ -116,7 +132,7 @@ class Parser:
         if self.current_token and self.current_token.type == TokenType.FACTORIAL:
             op = self.current_token
             self.advance()
-            return UnaryOpNode(op, node)
+            return self.make(UnaryOpNode, op, node)
 
         return node
 
@@ -129,14 +145,14 @@ class Parser:
         if token.type == TokenType.NUMBER:
             self.advance()
             value = token.value.value if hasattr(token.value, 'value') else token.value
-            return NumberNode(value)
+            return self.make(NumberNode, value)
 
         elif token.type == TokenType.IDENTIFIER:
             if self.peek() and self.peek().type == TokenType.LPAREN:
                 return self.func_call()
             else:
                 self.advance()
-                return VariableNode(token.value)
+                return self.make(VariableNode, token.value)
 
         elif token.type == TokenType.FUNCTION:
             return self.func_call()
@@ -152,14 +168,18 @@ class Parser:
                 self.error(
                     f"Expected ')', got {self.current_token.type} with value {getattr(self.current_token, 'value', 'unknown')}")
 
-            self.eat(TokenType.RPAREN)  # consume ')'
+            close = self.eat(TokenType.RPAREN)  # consume ')'
+            if self.groups is not None:
+                self.groups.append((token, close, node, 'add_expr'))
             return node
 
         elif token.type == TokenType.ABS_BAR:
             self.advance()  # consume '|'
             expr = self.expr()
-            self.eat(TokenType.ABS_BAR)  # consume '|'
-            return AbsoluteValueNode(expr)
+            close = self.eat(TokenType.ABS_BAR)  # consume '|'
+            if self.groups is not None:
+                self.groups.append((token, close, expr, 'expr'))
+            return self.make(AbsoluteValueNode, expr)
 
         else:
             self.error(f"Unexpected token: {token.type}")
@@ -169,8 +189,99 @@ class Parser:
         func_name = self.current_token.value
         self.advance()  # consume function name
 
-        self.eat(TokenType.LPAREN)  # consume '('
+        open_token = self.eat(TokenType.LPAREN)  # consume '('
         args = self.expr()
-        self.eat(TokenType.RPAREN)  # consume ')'
+        close = self.eat(TokenType.RPAREN)  # consume ')'
+        if self.groups is not None:
+            self.groups.append((open_token, close, args, 'expr'))
+
+        return self.make(FunctionCallNode, func_name, args)
+
 
-        return FunctionCallNode(func_name, args)
\ No newline at end of file
+STATEMENT_END = (TokenType.SEMICOLON, TokenType.NEWLINE, TokenType.EOF)
+
+
+class ProgramParser:
+    def __init__(self, source, symbols=None, factory=None, max_errors=100, on_error=None):
+        # A whole program as a string, or an iterable of lines such as an open file
+        self.source = source
+        self.symbols = symbols if symbols is not None else SymbolTable()
+        self.factory = factory
+        # (statement index, message, line, column, offset) of the latest
+        # max_errors failed statements; on_error, if given, is called with the
+        # same values for every one of them. Lines and columns count from 1,
+        # offsets are characters from the start of the source.
+        self.errors = deque(maxlen=max_errors)
+        self.error_count = 0
+        self.on_error = on_error
+
+        # Where the chunk of source being tokenized starts
+        self.chunk = ""
+        self.chunk_offset = 0
+        self.chunk_line = 1
+
+    def parse(self):
+        # Yield the AST of each statement as soon as it is parsed; a statement
+        # with a syntax error is recorded in self.errors and skipped
+        index = 0
+        for tokens, error, position in self.statements():
+            if error is None:
+                parser = Parser(tokens, factory=self.factory)
+                try:
+                    node = parser.parse()
+                except Exception as e:
+                    error = str(e)
+                    token = parser.current_token or tokens[-1]
+                    position = token.start
+                else:
+                    yield node
+
+            if error is not None:
+                self.record_error(index, error, position)
+            index += 1
+
+    def record_error(self, index, message, position):
+        chunk = self.chunk
+        line = self.chunk_line + chunk.count('\n', 0, position)
+        column = position - (chunk.rfind('\n', 0, position) + 1) + 1
+        error = (index, message, line, column, self.chunk_offset + position)
+        self.errors.append(error)
+        self.error_count += 1
+        if self.on_error is not None:
+            self.on_error(*error)
+
+    def statements(self):
+        # Only the tokens of the current statement are held at any time
+        lines = [self.source] if isinstance(self.source, str) else self.source
+
+        for line in lines:
+            # Lines handed over without their '\n' still count as lines
+            self.chunk_offset += len(self.chunk)
+            self.chunk_line += self.chunk.count('\n') + (self.chunk != "" and not self.chunk.endswith('\n'))
+            self.chunk = line
+            lexer = Tokenizer(line, self.symbols, newlines=True)
+            tokens = []
+
+            while True:
+                try:
+                    token = lexer.get_next_token()
+                except Exception as e:
+                    # Drop the rest of the statement and resume after its separator
+                    position = lexer.pos
+                    while lexer.current_char is not None and lexer.current_char not in ';\n':
+                        lexer.advance()
+                    tokens = []
+                    yield None, str(e), position
+                    continue
+
+                if token.type not in STATEMENT_END:
+                    tokens.append(token)
+                    continue
+
+                if tokens:
+                    tokens.append(Token(TokenType.EOF, None, token.start, token.start, line))
+                    yield tokens, None, None
+                    tokens = []
+
+                if token.type == TokenType.EOF:
+                    break
@@ -0,0 +1,131 @@
+from tokenizer import TokenType
+from parser import Parser
+from ast_nodes import BinaryOpNode, UnaryOpNode
+
+LEFT = 'left'
+RIGHT = 'right'
+
+
+def binary_node(parser, left, op, right):
+    return parser.make(BinaryOpNode, left, op, right)
+
+
+def prefix_node(parser, op):
+    # Like Parser.unary_expr, a prefix operator applies to a single factor
+    return parser.make(UnaryOpNode, op, parser.factor())
+
+
+def postfix_node(parser, op, node):
+    return parser.make(UnaryOpNode, op, node)
+
+
+class InfixOperator:
+    __slots__ = ('precedence', 'associativity', 'handler', 'left_power', 'right_power')
+
+    def __init__(self, precedence, associativity, handler):
+        if associativity not in (LEFT, RIGHT):
+            raise ValueError(f"Unknown associativity: {associativity}")
+        self.precedence = precedence
+        self.associativity = associativity
+        self.handler = handler
+        # An operator keeps climbing while the next one binds at least as tightly as
+        # its right power; the odd/even split decides which side wins on a tie
+        if associativity == LEFT:
+            self.left_power, self.right_power = 2 * precedence, 2 * precedence + 1
+        else:
+            self.left_power, self.right_power = 2 * precedence + 1, 2 * precedence
+
+
+class OperatorRegistry:
+    def __init__(self):
+        # Token type -> InfixOperator / handler
+        self.infix = {}
+        self.prefix = {}
+        self.postfix = {}
+
+    def add_infix(self, token_type, precedence, associativity=LEFT, handler=binary_node):
+        if precedence < 1:
+            raise ValueError("Precedence must be at least 1")
+        self.infix[token_type] = InfixOperator(precedence, associativity, handler)
+
+    def add_prefix(self, token_type, handler=prefix_node):
+        self.prefix[token_type] = handler
+
+    def add_postfix(self, token_type, handler=postfix_node):
+        self.postfix[token_type] = handler
+
+    def remove(self, token_type):
+        self.infix.pop(token_type, None)
+        self.prefix.pop(token_type, None)
+        self.postfix.pop(token_type, None)
+
+    def copy(self):
+        registry = OperatorRegistry()
+        registry.infix = dict(self.infix)
+        registry.prefix = dict(self.prefix)
+        registry.postfix = dict(self.postfix)
+        return registry
+
+
+def default_operators():
+    # The grammar of Parser: ^ binds tightest and, like the other operators, groups to the left
+    registry = OperatorRegistry()
+    registry.add_infix(TokenType.PLUS, 1)
+    registry.add_infix(TokenType.MINUS, 1)
+    registry.add_infix(TokenType.MULTIPLY, 2)
+    registry.add_infix(TokenType.DIVIDE, 2)
+    registry.add_infix(TokenType.MODULUS, 2)
+    registry.add_infix(TokenType.POWER, 3)
+    registry.add_prefix(TokenType.MINUS)
+    registry.add_postfix(TokenType.FACTORIAL)
+    return registry
+
+
+DEFAULT_OPERATORS = default_operators()
+
+
+class PrattParser(Parser):
+    # Replaces the add_expr/mul_expr/pow_expr chain with a single precedence
+    # climbing loop over an OperatorRegistry; factors, groups, function calls
+    # and assignments are still parsed by Parser
+    def __init__(self, tokens, operators=None, groups=None, factory=None):
+        super().__init__(tokens, groups, factory)
+        self.operators = operators if operators is not None else DEFAULT_OPERATORS
+
+    def add_expr(self):
+        return self.binary_expr(0)
+
+    def binary_expr(self, min_power):
+        infix = self.operators.infix
+        node = self.unary_expr()
+
+        while self.current_token:
+            op = self.current_token
+            operator = infix.get(op.type)
+            if operator is None or operator.left_power < min_power:
+                break
+            self.advance()
+            right = self.binary_expr(operator.right_power)
+            node = operator.handler(self, node, op, right)
+
+        return node
+
+    def unary_expr(self):
+        token = self.current_token
+        if token:
+            handler = self.operators.prefix.get(token.type)
+            if handler is not None:
+                self.advance()
+                return handler(self, token)
+
+        node = self.factor()
+
+        # At most one postfix operator, and only after an unprefixed factor
+        token = self.current_token
+        if token:
+            handler = self.operators.postfix.get(token.type)
+            if handler is not None:
+                self.advance()
+                return handler(self, token, node)
+
+        return node
@@ -0,0 +1,224 @@
+import struct
+
+from flat_ast import (
+    INTEGER,
+    FLOAT,
+    VARIABLE,
+    ADD,
+    POWER,
+    NEGATE,
+    FACTORIAL,
+    ABSOLUTE,
+    CALL,
+    ASSIGN,
+    BINARY_OPCODES,
+    UNARY_OPCODES,
+    OPCODE_TOKENS,
+)
+from parser import build_node
+from ast_nodes import (
+    BinaryOpNode,
+    UnaryOpNode,
+    NumberNode,
+    VariableNode,
+    AssignmentNode,
+    FunctionCallNode,
+    AbsoluteValueNode
+)
+
+# Layout: MAGIC, varint constant count, the constant pool, varint node count,
+# then one opcode byte per node in pre-order, each followed by a varint index
+# into the pool for numbers, variables, calls and assignments.
+# Pool entries are a tag byte and the value: a zigzag varint for integers of
+# any size, 8 little-endian bytes for floats, varint length + UTF-8 for names.
+MAGIC = b'ASTS'
+
+CONSTANT_INTEGER = 0
+CONSTANT_FLOAT = 1
+CONSTANT_NAME = 2
+
+# Opcodes followed by a pool index
+POOL_OPCODES = frozenset((INTEGER, FLOAT, VARIABLE, CALL, ASSIGN))
+
+DOUBLE = struct.Struct('<d')
+
+
+def write_varint(out, value):
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    # Returns (value, position after the varint)
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class ConstantPool:
+    def __init__(self):
+        self.values = []
+        self.indices = {}
+
+    def index(self, kind, value):
+        # Keep 1 and 1.0 apart, as NodeFactory does
+        key = (kind, value.__class__, value)
+        index = self.indices.get(key)
+        if index is None:
+            index = self.indices[key] = len(self.values)
+            self.values.append((kind, value))
+        return index
+
+    def write(self, out):
+        write_varint(out, len(self.values))
+        for kind, value in self.values:
+            out.append(kind)
+            if kind == CONSTANT_INTEGER:
+                write_varint(out, value << 1 if value >= 0 else ((-value) << 1) - 1)
+            elif kind == CONSTANT_FLOAT:
+                out += DOUBLE.pack(value)
+            else:
+                encoded = value.encode('utf-8')
+                write_varint(out, len(encoded))
+                out += encoded
+
+
+def serialize(root):
+    pool = ConstantPool()
+    stream = bytearray()
+    count = 0
+
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+
+        if isinstance(node, NumberNode):
+            if isinstance(node.value, float):
+                stream.append(FLOAT)
+                write_varint(stream, pool.index(CONSTANT_FLOAT, node.value))
+            else:
+                stream.append(INTEGER)
+                write_varint(stream, pool.index(CONSTANT_INTEGER, node.value))
+        elif isinstance(node, VariableNode):
+            stream.append(VARIABLE)
+            write_varint(stream, pool.index(CONSTANT_NAME, node.name))
+        elif isinstance(node, BinaryOpNode):
+            stream.append(BINARY_OPCODES[node.op.type])
+        elif isinstance(node, UnaryOpNode):
+            stream.append(UNARY_OPCODES[node.op.type])
+        elif isinstance(node, AbsoluteValueNode):
+            stream.append(ABSOLUTE)
+        elif isinstance(node, FunctionCallNode):
+            stream.append(CALL)
+            write_varint(stream, pool.index(CONSTANT_NAME, node.name))
+        elif isinstance(node, AssignmentNode):
+            stream.append(ASSIGN)
+            write_varint(stream, pool.index(CONSTANT_NAME, node.variable))
+        else:
+            raise ValueError(f"Unsupported node: {node.__class__.__name__}")
+
+        # Pushed right to left so the leftmost child is written next
+        for field in reversed(node.child_fields):
+            stack.append(getattr(node, field))
+
+    out = bytearray(MAGIC)
+    pool.write(out)
+    write_varint(out, count)
+    out += stream
+    return bytes(out)
+
+
+def read_constants(data, pos):
+    count, pos = read_varint(data, pos)
+    constants = []
+    for _ in range(count):
+        kind = data[pos]
+        pos += 1
+        if kind == CONSTANT_INTEGER:
+            value, pos = read_varint(data, pos)
+            constants.append(value >> 1 if not value & 1 else -((value + 1) >> 1))
+        elif kind == CONSTANT_FLOAT:
+            constants.append(DOUBLE.unpack_from(data, pos)[0])
+            pos += DOUBLE.size
+        elif kind == CONSTANT_NAME:
+            length, pos = read_varint(data, pos)
+            constants.append(str(data[pos:pos + length], 'utf-8'))
+            pos += length
+        else:
+            raise ValueError(f"Unknown constant kind: {kind}")
+    return constants, pos
+
+
+def deserialize(data, factory=None):
+    # Accepts bytes, bytearray or a memoryview into a larger buffer; only the
+    # names are copied out of it
+    data = memoryview(data)
+    if data.format != 'B':
+        data = data.cast('B')
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a serialized AST")
+    make = factory if factory is not None else build_node
+
+    try:
+        return build_tree(data, make)
+    except IndexError:
+        raise ValueError("Malformed serialized AST")
+
+
+def build_tree(data, make):
+    constants, pos = read_constants(data, len(MAGIC))
+    count, pos = read_varint(data, pos)
+
+    # First pass: split the stream into opcodes and pool operands
+    opcodes = []
+    operands = []
+    pool_opcodes = POOL_OPCODES
+    for _ in range(count):
+        opcode = data[pos]
+        pos += 1
+        operand = 0
+        if opcode in pool_opcodes:
+            operand = data[pos]
+            pos += 1
+            if operand > 0x7f:
+                operand, pos = read_varint(data, pos - 1)
+        opcodes.append(opcode)
+        operands.append(operand)
+
+    # Second pass: pre-order read backwards is a post-order walk of the
+    # mirrored tree, so every node finds its children on the stack, leftmost on top
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    for index in range(count - 1, -1, -1):
+        opcode = opcodes[index]
+        if opcode == INTEGER or opcode == FLOAT:
+            push(make(NumberNode, constants[operands[index]]))
+        elif opcode == VARIABLE:
+            push(make(VariableNode, constants[operands[index]]))
+        elif ADD <= opcode <= POWER:
+            left = pop()
+            stack[-1] = make(BinaryOpNode, left, OPCODE_TOKENS[opcode], stack[-1])
+        elif opcode == NEGATE or opcode == FACTORIAL:
+            stack[-1] = make(UnaryOpNode, OPCODE_TOKENS[opcode], stack[-1])
+        elif opcode == ABSOLUTE:
+            stack[-1] = make(AbsoluteValueNode, stack[-1])
+        elif opcode == CALL:
+            stack[-1] = make(FunctionCallNode, constants[operands[index]], stack[-1])
+        elif opcode == ASSIGN:
+            stack[-1] = make(AssignmentNode, constants[operands[index]], stack[-1])
+        else:
+            raise ValueError(f"Unknown opcode: {opcode}")
+
+    if len(stack) != 1:
+        raise ValueError("Malformed serialized AST")
+    return stack[0]
@@ -0,0 +1,155 @@
+from tokenizer import TokenType
+from parser import Parser
+from ast_nodes import (
+    BinaryOpNode,
+    UnaryOpNode,
+    NumberNode,
+    VariableNode,
+    AssignmentNode,
+    FunctionCallNode,
+    AbsoluteValueNode
+)
+
+# Binding strength of the binary operators; all of them are left-associative
+PRECEDENCE = {
+    TokenType.PLUS: 1,
+    TokenType.MINUS: 1,
+    TokenType.MULTIPLY: 2,
+    TokenType.DIVIDE: 2,
+    TokenType.MODULUS: 2,
+    TokenType.POWER: 3,
+}
+
+# Kinds of bracketed context, each with its own operand and operator stacks
+TOP = 'top'
+PAREN = 'paren'
+ABS = 'abs'
+CALL = 'call'
+
+
+class Frame:
+    __slots__ = ('kind', 'operands', 'operators', 'negation', 'target', 'name')
+
+    def __init__(self, kind, name=None):
+        self.kind = kind
+        self.operands = []
+        self.operators = []
+        self.negation = None  # a unary minus waiting for the next factor
+        self.target = None  # variable name when the frame is an assignment
+        self.name = name  # function name of a CALL frame
+
+
+class StackParser(Parser):
+    # Shunting-yard version of Parser: same grammar and trees, but nesting is
+    # kept on an explicit stack of frames, so the depth of the input is not
+    # limited by the Python call stack
+
+    def parse(self):
+        if not self.tokens:
+            return None
+
+        frames = [self.open_frame(TOP)]
+        expect_operand = True
+
+        while True:
+            frame = frames[-1]
+            token = self.current_token
+
+            if expect_operand:
+                if not token:
+                    self.error("Unexpected end of input")
+
+                if token.type == TokenType.MINUS and frame.negation is None:
+                    frame.negation = token
+                    self.advance()
+
+                elif token.type == TokenType.NUMBER:
+                    self.advance()
+                    value = token.value.value if hasattr(token.value, 'value') else token.value
+                    self.complete_factor(frame, self.make(NumberNode, value))
+                    expect_operand = False
+
+                elif token.type == TokenType.IDENTIFIER and not (self.peek() and self.peek().type == TokenType.LPAREN):
+                    self.advance()
+                    self.complete_factor(frame, self.make(VariableNode, token.value))
+                    expect_operand = False
+
+                elif token.type in (TokenType.IDENTIFIER, TokenType.FUNCTION):
+                    self.advance()  # consume function name
+                    self.eat(TokenType.LPAREN)
+                    frames.append(self.open_frame(CALL, token.value))
+
+                elif token.type == TokenType.LPAREN:
+                    self.advance()
+                    frames.append(Frame(PAREN))
+
+                elif token.type == TokenType.ABS_BAR:
+                    self.advance()
+                    frames.append(self.open_frame(ABS))
+
+                else:
+                    self.error(f"Unexpected token: {token.type}")
+                continue
+
+            precedence = PRECEDENCE.get(token.type) if token else None
+            if precedence is not None:
+                self.reduce(frame, precedence)
+                frame.operators.append(token)
+                self.advance()
+                expect_operand = True
+                continue
+
+            # Nothing binds any further: finish the innermost frame
+            self.reduce(frame, 0)
+            node = frame.operands[0]
+            if frame.target is not None:
+                node = self.make(AssignmentNode, frame.target, node)
+
+            if frame.kind == TOP:
+                if self.current_token and self.current_token.type != TokenType.EOF:
+                    self.error(f"Unexpected token: {self.current_token.type}")
+                return node
+
+            if frame.kind == PAREN:
+                if not self.current_token:
+                    self.error("Unexpected end of input, expected ')'")
+                if self.current_token.type != TokenType.RPAREN:
+                    self.error(
+                        f"Expected ')', got {self.current_token.type} with value {getattr(self.current_token, 'value', 'unknown')}")
+                self.advance()
+            elif frame.kind == ABS:
+                self.eat(TokenType.ABS_BAR)
+                node = self.make(AbsoluteValueNode, node)
+            else:
+                self.eat(TokenType.RPAREN)
+                node = self.make(FunctionCallNode, frame.name, node)
+
+            frames.pop()
+            self.complete_factor(frames[-1], node)
+
+    def open_frame(self, kind, name=None):
+        # Frames parsed like Parser.expr may start with `name =`
+        frame = Frame(kind, name)
+        if (self.current_token and self.current_token.type == TokenType.IDENTIFIER and
+                self.peek() and self.peek().type == TokenType.ASSIGN):
+            frame.target = self.current_token.value
+            self.advance()  # consume the identifier
+            self.advance()  # consume the '=' operator
+        return frame
+
+    def complete_factor(self, frame, node):
+        # A negated factor takes no factorial, matching Parser.unary_expr
+        if frame.negation is not None:
+            node = self.make(UnaryOpNode, frame.negation, node)
+            frame.negation = None
+        elif self.current_token and self.current_token.type == TokenType.FACTORIAL:
+            node = self.make(UnaryOpNode, self.current_token, node)
+            self.advance()
+        frame.operands.append(node)
+
+    def reduce(self, frame, precedence):
+        operands = frame.operands
+        operators = frame.operators
+        while operators and PRECEDENCE[operators[-1].type] >= precedence:
+            right = operands.pop()
+            operands[-1] = self.make(BinaryOpNode, operands[-1], operators.pop(), right)
@@ -0,0 +1,49 @@
+import threading
+
+# Names the lexers classify as FUNCTION tokens. New tables start from a copy
+# of this set, so adding to it extends every table created afterwards.
+FUNCTIONS = {'sin', 'cos', 'tan', 'log', 'sqrt'}
+
+
+class SymbolTable:
+    def __init__(self, functions=None):
+        self.functions = set(FUNCTIONS if functions is None else functions)
+        self.ids = {}
+        self.names = []
+        # Lexers sharing the table may run in several threads (see ParseCache)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def intern(self, name):
+        # Return the shared copy of the name, registering it on first sight
+        return self.names[self.id_of(name)]
+
+    def id_of(self, name):
+        # Ids are handed out in order of first appearance and never change
+        index = self.ids.get(name)
+        if index is None:
+            with self.lock:
+                # Look again: another thread may have added it in the meantime
+                index = self.ids.get(name)
+                if index is None:
+                    index = len(self.names)
+                    self.names.append(name)
+                    self.ids[name] = index
+        return index
+
+    def name_of(self, index):
+        return self.names[index]
+
+    def is_function(self, name):
+        return name in self.functions
+
+    def add_function(self, name):
+        self.functions.add(name)
+
+    def remove_function(self, name):
+        self.functions.discard(name)
@@ -0,0 +1,678 @@
+import io
+import math
+import os
+import re
+import tempfile
+import threading
+import unittest
+
+from tokenizer import tokenize, Token, TokenType
+from parser import Parser, ProgramParser
+from symbol_table import SymbolTable
+from incremental import IncrementalDocument
+from evaluator import DAGEvaluator, Evaluator
+from compiler import Compiler
+from optimizer import Optimizer
+from node_factory import NodeFactory
+from ast_nodes import BinaryOpNode, FunctionCallNode, NumberNode, VariableNode
+from parse_cache import ParseCache, estimate_size
+from serializer import serialize, deserialize
+from flat_ast import FlatAST
+from stack_parser import StackParser
+from pratt_parser import PrattParser, OperatorRegistry, DEFAULT_OPERATORS, RIGHT
+from ast_visualizer import TextASTVisualizer, ASCIITreeVisualizer, DOTASTVisualizer, visualize_ast, render_asts
+
+try:
+    import numpy as np
+    from vectorized import VectorEvaluator, factorial
+except ImportError:
+    np = None
+
+
+class TestTokenizer(unittest.TestCase):
+    def test_tokens_have_no_dict(self):
+        token = tokenize("x")[0]
+        self.assertFalse(hasattr(token, '__dict__'))
+
+    def test_token_spans(self):
+        text = "x = sin(3.5) + |y|"
+        for use_regex in (False, True):
+            tokens = tokenize(text, use_regex=use_regex)
+            self.assertEqual([t.text for t in tokens[:-1]],
+                             ['x', '=', 'sin', '(', '3.5', ')', '+', '|', 'y', '|'])
+            self.assertEqual(tokens[4].span, (8, 11))
+            self.assertEqual(tokens[-1].type, TokenType.EOF)
+            self.assertEqual(tokens[-1].span, (len(text), len(text)))
+
+    def test_token_without_source(self):
+        self.assertEqual(Token(TokenType.PLUS, '+').text, '+')
+
+    def test_parser_error_reports_offset(self):
+        with self.assertRaises(Exception) as context:
+            Parser(tokenize("1 + (2 * 3")).parse()
+        self.assertIn("offset 10", str(context.exception))
+
+
+class TestSymbolTable(unittest.TestCase):
+    def test_identifiers_are_interned(self):
+        symbols = SymbolTable()
+        text = "alpha + alpha * beta - alpha"
+        for use_regex in (False, True):
+            tokens = tokenize(text, use_regex=use_regex, symbols=symbols)
+            names = [t.value for t in tokens if t.type == TokenType.IDENTIFIER]
+            self.assertIs(names[0], names[1])
+            self.assertIs(names[0], names[3])
+        self.assertEqual(symbols.id_of('alpha'), 0)
+        self.assertEqual(symbols.id_of('beta'), 1)
+        self.assertEqual(symbols.name_of(1), 'beta')
+        self.assertEqual(len(symbols), 2)
+
+    def test_functions_are_extensible(self):
+        symbols = SymbolTable()
+        self.assertEqual(tokenize("exp(1)", symbols=symbols)[0].type, TokenType.IDENTIFIER)
+        symbols.add_function('exp')
+        self.assertEqual(tokenize("exp(1)", symbols=symbols)[0].type, TokenType.FUNCTION)
+        self.assertEqual(tokenize("exp(1)", use_regex=True, symbols=symbols)[0].type, TokenType.FUNCTION)
+        self.assertEqual(tokenize("exp", use_regex=True, symbols=symbols)[0].type, TokenType.IDENTIFIER)
+
+    def test_concurrent_interning(self):
+        symbols = SymbolTable()
+        names = [f"v{i}" for i in range(2000)]
+
+        def work(offset):
+            for name in names[offset:] + names[:offset]:
+                symbols.id_of(name)
+
+        threads = [threading.Thread(target=work, args=(i * 500,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(symbols), len(names))
+        self.assertEqual(sorted(symbols.names), sorted(names))
+        for name in names:
+            self.assertEqual(symbols.name_of(symbols.id_of(name)), name)
+
+
+class TestIncrementalDocument(unittest.TestCase):
+    def assert_matches_full_parse(self, doc):
+        expected = [(t.type, t.value, t.span, t.text) for t in tokenize(doc.text)]
+        self.assertEqual([(t.type, t.value, t.span, t.text) for t in doc.tokens], expected)
+        self.assertEqual(str(doc.ast), str(Parser(tokenize(doc.text)).parse()))
+
+    def test_edit_inside_group_reparses_only_the_group(self):
+        doc = IncrementalDocument("a + sin(x * 2) + |y - 3| * (b + c)")
+        doc.edit(doc.text.index("x"), 1, "xyz")
+        self.assert_matches_full_parse(doc)
+        self.assertEqual(doc.relexed, 1)
+        self.assertEqual(doc.reparsed, 3)
+
+        doc.edit(doc.text.index("3"), 1, "3 ^ z")
+        self.assert_matches_full_parse(doc)
+        self.assertEqual(doc.reparsed, 5)
+
+    def test_edits_merging_and_splitting_tokens(self):
+        doc = IncrementalDocument("(ab + 12) * c")
+        doc.edit(3, 3, "")  # "(a12) * c"
+        self.assert_matches_full_parse(doc)
+        doc.edit(2, 0, " + ")  # "(a + 12) * c"
+        self.assert_matches_full_parse(doc)
+        doc.edit(0, 1, "")  # unbalanced
+        self.assertIsNone(doc.ast)
+        self.assertIsNotNone(doc.error)
+        doc.edit(0, 0, "(")
+        self.assert_matches_full_parse(doc)
+
+    def test_typing_does_not_touch_the_rest_of_the_document(self):
+        doc = IncrementalDocument("sin(x) + " + " + ".join(f"(a{i} * {i})" for i in range(200)))
+        doc.edit(5, 0, "y")
+        # Each keystroke inside the group relexes and reparses only a token or two
+        for i, char in enumerate("z_12"):
+            doc.edit(6 + i, 0, char)
+            self.assertLessEqual(doc.shifted + doc.relexed + doc.reparsed, 4)
+        doc.edit(9, 1, "")
+        self.assertLessEqual(doc.shifted + doc.relexed + doc.reparsed, 4)
+        self.assertTrue(doc.text.startswith("sin(xyz_1) + (a0 * 0)"))
+        self.assert_matches_full_parse(doc)
+
+    def test_lexer_error_recovers_on_next_edit(self):
+        doc = IncrementalDocument("x + 1")
+        doc.edit(4, 0, "$")
+        self.assertIsNone(doc.tokens)
+        doc.edit(4, 1, "")
+        self.assert_matches_full_parse(doc)
+
+
+class TestProgramParser(unittest.TestCase):
+    def test_statements_split_on_newlines_and_semicolons(self):
+        program = ProgramParser("x = 1; y = x + 2\n\nz = |y|;")
+        self.assertEqual([str(node) for node in program.parse()], [
+            "Assignment(x, Number(1))",
+            "Assignment(y, BinaryOp(+, Variable(x), Number(2)))",
+            "Assignment(z, Abs(Variable(y)))",
+        ])
+        self.assertEqual(list(program.errors), [])
+
+    def test_errors_do_not_stop_parsing(self):
+        program = ProgramParser("a = (1 +\nb = 2 $ 3; c = 3")
+        self.assertEqual([str(node) for node in program.parse()], ["Assignment(c, Number(3))"])
+        self.assertEqual([error[0] for error in program.errors], [0, 1])
+        self.assertIn("Lexer error", program.errors[1][1])
+        # (index, message, line, column, offset), with the offset counted from the start of the source
+        self.assertEqual([error[2:] for error in program.errors], [(1, 9, 8), (2, 7, 15)])
+
+    def test_error_positions_across_lines(self):
+        reported = []
+        program = ProgramParser(io.StringIO("a = 1\nb = 2 +\n\nc = )\n"),
+                                on_error=lambda *error: reported.append(error))
+        self.assertEqual(len(list(program.parse())), 1)
+        self.assertEqual([error[2:] for error in reported], [(2, 8, 13), (4, 5, 19)])
+        self.assertEqual(list(program.errors), reported)
+
+    def test_errors_are_bounded(self):
+        program = ProgramParser(("x = (\n" for _ in range(1000)), max_errors=10)
+        self.assertEqual(list(program.parse()), [])
+        self.assertEqual(program.error_count, 1000)
+        self.assertEqual(len(program.errors), 10)
+        self.assertEqual(program.errors[-1][:1] + program.errors[-1][2:], (999, 1000, 6, 5999))
+
+    def test_parses_lines_from_a_file(self):
+        program = ProgramParser(io.StringIO("a = 1\nb = 2; c = a * b\n"))
+        nodes = program.parse()
+        self.assertEqual(str(next(nodes)), "Assignment(a, Number(1))")
+        self.assertEqual(len(list(nodes)), 2)
+
+
+def parse(text):
+    return Parser(tokenize(text)).parse()
+
+
+class TestEvaluator(unittest.TestCase):
+    def test_arithmetic(self):
+        evaluator = Evaluator()
+        cases = {
+            "1 + 2 * 3": 7,
+            "2 * (4 - 1)": 6,
+            "10 / (2 + 3)": 2.0,
+            "2^3^2": 64,
+            "-5 + 2": -3,
+            "7 % 3": 1,
+            "5!": 120,
+            "|3 - 7|": 4,
+        }
+        for text, expected in cases.items():
+            self.assertEqual(evaluator.evaluate(parse(text)), expected, text)
+
+    def test_functions_use_math(self):
+        evaluator = Evaluator()
+        self.assertAlmostEqual(evaluator.evaluate(parse("sin(30)")), math.sin(30))
+        self.assertAlmostEqual(evaluator.evaluate(parse("sqrt(16) + log(1)")), 4.0)
+
+    def test_assignments_update_environment(self):
+        evaluator = Evaluator()
+        evaluator.evaluate(parse("x = 5 + 3"))
+        evaluator.evaluate(parse("y = 2 * (4 - 1)"))
+        self.assertEqual(evaluator.evaluate(parse("c = |y - x|")), 2)
+        self.assertEqual(evaluator.env, {'x': 8, 'y': 6, 'c': 2})
+
+    def test_undefined_variable(self):
+        with self.assertRaises(Exception) as context:
+            Evaluator().evaluate(parse("x + 1"))
+        self.assertIn("Undefined variable: x", str(context.exception))
+
+
+class TestCompiler(unittest.TestCase):
+    def test_matches_evaluator(self):
+        compiler = Compiler()
+        for text in ["2 * (x - 1)^3 + sin(x)", "|x - 7| % 3", "-x + 4!", "sqrt(x) / (x + 1)", "3.14"]:
+            ast = parse(text)
+            expected = Evaluator({'x': 2.5}).evaluate(ast)
+            self.assertEqual(compiler.compile(ast).evaluate({'x': 2.5}), expected, text)
+
+    def test_non_finite_literals(self):
+        for text in ["1" + "0" * 309 + ".0 - x", "-" + "1" * 310 + ".5 * x", "1" + "0" * 308 + ".0 * 10 - x"]:
+            ast = parse(text)
+            expected = Evaluator({'x': 1}).evaluate(ast)
+            self.assertTrue(math.isinf(expected))
+            self.assertEqual(Compiler().compile(ast).evaluate({'x': 1}), expected, text)
+            self.assertEqual(Compiler().compile(Optimizer().optimize(ast)[0]).evaluate({'x': 1}), expected, text)
+        ast = BinaryOpNode(NumberNode(float('nan')), Token(TokenType.PLUS, '+'), VariableNode('x'))
+        self.assertTrue(math.isnan(Compiler().compile(ast)(1)))
+
+    def test_variables_resolved_to_argument_slots(self):
+        compiled = Compiler().compile(parse("y * 2 + x - y"))
+        self.assertEqual(compiled.variables, ('y', 'x'))
+        self.assertEqual(compiled(3, 1), 4)
+
+    def test_assignments_write_back(self):
+        env = {'x': 4}
+        compiled = Compiler().compile(parse("y = |z = x - 6| + z"))
+        self.assertEqual(compiled.targets, ('z', 'y'))
+        self.assertEqual(compiled.evaluate(env), 0)
+        self.assertEqual(env, {'x': 4, 'z': -2, 'y': 0})
+
+    def test_compiled_form_is_cached_per_tree(self):
+        compiler = Compiler()
+        ast = parse("x + 1")
+        self.assertIs(compiler.compile(ast), compiler.compile(ast))
+        self.assertIsNot(compiler.compile(ast), compiler.compile(parse("x + 1")))
+
+    def test_deep_expression(self):
+        ast = parse("+".join(["x"] * 3000))
+        self.assertEqual(Compiler().compile(ast)(1), 3000)
+
+    def test_shared_nodes_after_assignment(self):
+        # The factory shares one node for every x, so an assignment between
+        # two uses must not reuse the value computed before it
+        cases = {"x + sqrt(x = 4) + x": 7, "x * |x = x + 1| + x": 4,
+                 "|y = x + 1| * |x = y * 2| + (x + 1) * y + |x = x + y| + x": 30}
+        for text, expected in cases.items():
+            ast = Parser(tokenize(text), factory=NodeFactory()).parse()
+            self.assertEqual(Evaluator({'x': 1}).evaluate(ast), expected, text)
+            self.assertEqual(DAGEvaluator({'x': 1}).evaluate(ast), expected, text)
+            self.assertEqual(Compiler().compile(ast).evaluate({'x': 1}), expected, text)
+            self.assertEqual(FlatAST.from_node(ast).evaluate({'x': 1}), expected, text)
+            if np is not None:
+                self.assertEqual(VectorEvaluator({'x': np.array([1.0])}).evaluate(ast).tolist(), [expected], text)
+
+
+class TestOptimizer(unittest.TestCase):
+    def optimize(self, text):
+        return Optimizer().optimize(parse(text))
+
+    def test_constant_folding(self):
+        node, stats = self.optimize("2^3 + |3 - 7| * -5")
+        self.assertEqual(str(node), "Number(-12)")
+        self.assertEqual(stats['nodes_before'], 11)
+        self.assertEqual(stats['removed'], 10)
+
+    def test_identities(self):
+        node, stats = self.optimize("y = 1 * (x / 1) + 0 - -(-(z^1))")
+        self.assertEqual(str(node), "Assignment(y, BinaryOp(-, Variable(x), Variable(z)))")
+        self.assertEqual(stats['simplified'], 5)
+
+    def test_unary_minus_on_literal(self):
+        node, _ = self.optimize("x * -5")
+        self.assertEqual(str(node), "BinaryOp(*, Variable(x), Number(-5))")
+        self.assertEqual(Compiler().compile(node)(2), -10)
+
+    def test_failing_constants_are_kept(self):
+        node, stats = self.optimize("1 / 0 + sqrt(-1)")
+        self.assertEqual(stats['removed'], 1)
+        self.assertEqual(stats['folded'], 1)
+
+    def test_oversized_constants_are_kept(self):
+        node, stats = self.optimize("x + 2^20000")
+        self.assertEqual(str(node), "BinaryOp(+, Variable(x), BinaryOp(^, Number(2), Number(20000)))")
+        self.assertEqual(stats['folded'], 0)
+        self.assertEqual(len(FlatAST.from_node(node)), 5)
+
+        node, stats = self.optimize("(2^20)! + 9^(9^7)")
+        self.assertEqual(str(node), "BinaryOp(+, UnaryOp(!, Number(1048576)), BinaryOp(^, Number(9), Number(4782969)))")
+        self.assertEqual(stats['folded'], 2)
+
+        node, _ = self.optimize("2^1000 * 3!")
+        self.assertEqual(node.value, 2 ** 1000 * 6)
+
+    def test_overflow_to_inf_is_kept(self):
+        node, stats = self.optimize("1" + "0" * 308 + ".0 * 10 - x")
+        self.assertIsInstance(node.left, BinaryOpNode)
+        self.assertEqual(stats['folded'], 0)
+
+    def test_input_tree_is_not_modified(self):
+        ast = parse("(x + 0) * (2 + 3)")
+        Optimizer().optimize(ast)
+        self.assertEqual(str(ast), "BinaryOp(*, BinaryOp(+, Variable(x), Number(0)), BinaryOp(+, Number(2), Number(3)))")
+
+
+class TestNodeFactory(unittest.TestCase):
+    def test_identical_subtrees_are_shared(self):
+        factory = NodeFactory()
+        ast = Parser(tokenize("(x + 1) * (x + 1) - sin(x + 1)"), factory=factory).parse()
+        self.assertIs(ast.left.left, ast.left.right)
+        self.assertIs(ast.left.left, ast.right.args)
+        self.assertEqual(len(factory), 6)
+
+        other = Parser(tokenize("x + 1"), factory=factory).parse()
+        self.assertIs(other, ast.left.left)
+        self.assertIsNot(Parser(tokenize("x + 1.0"), factory=factory).parse(), other)
+
+    def test_intern_existing_tree(self):
+        ast = parse("|y - 2| + |y - 2|")
+        shared = NodeFactory().intern(ast)
+        self.assertIs(shared.left, shared.right)
+        self.assertEqual(str(shared), str(ast))
+
+    def test_dag_evaluator_computes_shared_nodes_once(self):
+        calls = []
+        functions = {'sin': lambda value: calls.append(value) or math.sin(value)}
+        ast = NodeFactory().intern(parse("sin(x) * sin(x) + sin(x)"))
+        evaluator = DAGEvaluator({'x': 0.5}, functions)
+        self.assertAlmostEqual(evaluator.evaluate(ast), math.sin(0.5) ** 2 + math.sin(0.5))
+        self.assertEqual(len(calls), 1)
+
+    def test_dag_evaluator_sees_assignments(self):
+        ast = NodeFactory().intern(parse("x + |x = 2| + x"))
+        self.assertEqual(DAGEvaluator({'x': 1}).evaluate(ast), 5)
+
+
+class TestFlatAST(unittest.TestCase):
+    text = "y = 2 * (x - 1)^3 + sin(x) - |x|! + 3.5 + 123456789012345678901234567890"
+
+    def test_round_trip(self):
+        ast = parse(self.text)
+        flat = FlatAST.from_node(ast)
+        self.assertEqual(len(flat), 19)
+        self.assertEqual(str(flat.to_node()), str(ast))
+
+    def test_children_offsets(self):
+        flat = FlatAST.from_node(parse("(a + b) * c"))
+        root = len(flat) - 1
+        self.assertEqual(flat.children(root), [2, 3])
+        self.assertEqual(flat.children(2), [0, 1])
+        self.assertEqual(flat.children(0), [])
+
+    def test_evaluate_matches_evaluator(self):
+        ast = parse(self.text)
+        env = {'x': 2.0}
+        self.assertEqual(FlatAST.from_node(ast).evaluate(env), Evaluator({'x': 2.0}).evaluate(ast))
+        self.assertIn('y', env)
+
+    def test_bytes_round_trip(self):
+        flat = FlatAST.from_node(parse(self.text))
+        loaded = FlatAST.from_bytes(flat.to_bytes())
+        self.assertEqual(str(loaded.to_node()), str(parse(self.text)))
+        self.assertEqual(loaded.names, flat.names)
+
+    def test_huge_integers(self):
+        value = 7 ** 5915  # 5000 digits
+        ast = BinaryOpNode(NumberNode(value), Token(TokenType.MINUS, '-'), NumberNode(-value - 1))
+        flat = FlatAST.from_bytes(FlatAST.from_node(ast).to_bytes())
+        copy = flat.to_node()
+        self.assertEqual((copy.left.value, copy.right.value), (value, -value - 1))
+        self.assertEqual(flat.evaluate(), 2 * value + 1)
+
+    def test_deep_tree(self):
+        flat = FlatAST.from_node(parse("+".join(["x"] * 5000)))
+        self.assertEqual(flat.evaluate({'x': 2}), 10000)
+
+
+class TestStackParser(unittest.TestCase):
+    valid = [
+        "3.14", "x = 5 + 3", "y = 2 * (4 - 1)", "a = 2^3^2", "b = -5", "c = |x - y|",
+        "sin(30)", "5!", "7 % 3", "-(x + 1) * 2", "f(|z = 2| + 1) - 3! / 4",
+        "1 - 2 - 3 * 4 ^ 5 % 6", "|-x| + sqrt(y = 4)",
+    ]
+    invalid = ["", "1 +", "(1 + 2", "x = y = 1", "(x = 1)", "--1", "-5!", "5!!", "sin 3", "|x", "1 2"]
+
+    def test_same_trees_as_parser(self):
+        for text in self.valid:
+            self.assertEqual(str(StackParser(tokenize(text)).parse()), str(parse(text)), text)
+
+    def test_same_errors_as_parser(self):
+        for text in self.invalid:
+            with self.assertRaises(Exception):
+                parse(text)
+            with self.assertRaises(Exception):
+                StackParser(tokenize(text)).parse()
+
+    def test_deep_nesting(self):
+        depth = 5000
+        ast = StackParser(tokenize("(" * depth + "x" + ")" * depth)).parse()
+        self.assertEqual(str(ast), "Variable(x)")
+
+        ast = StackParser(tokenize("|" * depth + "-x" + "|" * depth)).parse()
+        self.assertEqual(FlatAST.from_node(ast).evaluate({'x': 3}), 3)
+
+        lines = TextASTVisualizer().visualize(ast).split("\n")
+        self.assertEqual(len(lines), 2 * depth + 5)
+        lines = ASCIITreeVisualizer().visualize(ast).split("\n")
+        self.assertEqual(len(lines), depth + 2)
+
+
+class TestPrattParser(unittest.TestCase):
+    def test_same_trees_and_errors_as_parser(self):
+        for text in TestStackParser.valid:
+            self.assertEqual(str(PrattParser(tokenize(text)).parse()), str(parse(text)), text)
+        for text in TestStackParser.invalid:
+            with self.assertRaises(Exception):
+                PrattParser(tokenize(text)).parse()
+
+    def test_registered_associativity(self):
+        operators = DEFAULT_OPERATORS.copy()
+        operators.add_infix(TokenType.POWER, 3, RIGHT)
+        ast = PrattParser(tokenize("2 ^ 3 ^ 2 * 2"), operators).parse()
+        self.assertEqual(Evaluator().evaluate(ast), 2 ** 9 * 2)
+        # The shared default registry is left untouched
+        self.assertEqual(Evaluator().evaluate(PrattParser(tokenize("2 ^ 3 ^ 2")).parse()), 64)
+
+    def test_registered_handlers(self):
+        operators = OperatorRegistry()
+        operators.add_infix(TokenType.PLUS, 2)
+        operators.add_infix(TokenType.MULTIPLY, 1)
+        operators.add_infix(TokenType.MODULUS, 1,
+                            handler=lambda parser, left, op, right: FunctionCallNode('mod', BinaryOpNode(left, op, right)))
+        ast = PrattParser(tokenize("1 + 2 * 3 % 4"), operators).parse()
+        self.assertEqual(str(ast), "Function(mod, BinaryOp(%, BinaryOp(*, BinaryOp(+, Number(1), Number(2)), "
+                                   "Number(3)), Number(4)))")
+        with self.assertRaises(Exception):
+            PrattParser(tokenize("-1"), operators).parse()
+
+
+class TestParseCache(unittest.TestCase):
+    def test_hits_misses_and_lru_eviction(self):
+        cache = ParseCache(max_entries=2)
+        first = cache.get("x + 1")
+        self.assertIs(cache.get("x + 1"), first)
+        cache.get("y * 2")
+        cache.get("x + 1")
+        cache.get("z")  # evicts "y * 2", the least recently used
+        self.assertIn("x + 1", cache)
+        self.assertNotIn("y * 2", cache)
+        self.assertEqual(str(first), str(parse("x + 1")))
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (2, 3, 1))
+        self.assertEqual(stats['entries'], 2)
+
+    def test_byte_limit(self):
+        cache = ParseCache(max_entries=None, max_bytes=3000)
+        for i in range(50):
+            cache.get(f"a{i} = {i} * (b + c) - sin(d)")
+            self.assertLessEqual(cache.bytes, 3000)
+        self.assertGreater(cache.evictions, 0)
+        self.assertEqual(cache.stats()['entries'] + cache.evictions, 50)
+
+    def test_transform_and_errors(self):
+        cache = ParseCache(transform=Compiler().compile)
+        self.assertEqual(cache.get("x * 2 + 1").evaluate({'x': 4}), 9)
+        for _ in range(2):
+            with self.assertRaises(Exception):
+                cache.get("1 +")
+        self.assertEqual(len(cache), 1)
+
+    def test_byte_limit_counts_compiled_forms(self):
+        source = "a = " + " + ".join(f"x{i} * {i}" for i in range(40))
+        compiled = Compiler().compile(parse(source))
+        self.assertGreater(estimate_size(source, compiled), len(compiled.source))
+        cache = ParseCache(max_entries=None, max_bytes=40000, transform=Compiler().compile)
+        for i in range(20):
+            cache.get(source + f" + {i}")
+            self.assertLessEqual(cache.bytes, 40000)
+        self.assertGreater(cache.evictions, 0)
+
+    def test_concurrent_access(self):
+        cache = ParseCache(max_entries=8)
+        sources = [f"x{i % 12} + {i % 12}" for i in range(600)]
+        errors = []
+
+        def work(offset):
+            try:
+                for source in sources[offset:] + sources[:offset]:
+                    self.assertEqual(str(cache.get(source)), str(parse(source)))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=work, args=(i * 50,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        stats = cache.stats()
+        self.assertEqual(stats['hits'] + stats['misses'], 2400)
+        self.assertLessEqual(stats['entries'], 8)
+
+
+class TestSerializer(unittest.TestCase):
+    def test_round_trip(self):
+        for text in TestStackParser.valid + ["n = 123456789012345678901234567890 - -7 + 0.5 * 1.0"]:
+            ast = parse(text)
+            self.assertEqual(str(deserialize(serialize(ast))), str(ast), text)
+
+    def test_constant_pool_and_memoryview(self):
+        data = serialize(parse("x * x + x * 1000 + 1000"))
+        self.assertEqual(data.count(b'x'), 1)
+        buffer = bytearray(b'header') + data
+        ast = deserialize(memoryview(buffer)[6:])
+        self.assertEqual(Evaluator({'x': 2}).evaluate(ast), 2 * 2 + 2000 + 1000)
+
+    def test_deep_tree_and_factory(self):
+        depth = 5000
+        ast = StackParser(tokenize("|" * depth + "-x" + "|" * depth)).parse()
+        factory = NodeFactory()
+        copy = deserialize(serialize(ast), factory)
+        self.assertEqual(len(FlatAST.from_node(copy)), depth + 2)
+        self.assertEqual(len(factory), depth + 2)
+
+    def test_rejects_bad_input(self):
+        data = serialize(parse("a + b"))
+        with self.assertRaises(ValueError):
+            deserialize(b'nope' + data[4:])
+        with self.assertRaises(ValueError):
+            deserialize(data[:-1])
+
+
+class TestStreamingVisualizers(unittest.TestCase):
+    def test_stream_matches_visualize(self):
+        ast = parse("x = sin(1 + |y|) * 2 - 3!")
+        for visualizer in (TextASTVisualizer(), ASCIITreeVisualizer()):
+            out = io.StringIO()
+            count = visualizer.write(ast, out)
+            self.assertEqual(count, 11 if isinstance(visualizer, TextASTVisualizer) else 12)
+            self.assertEqual(out.getvalue(), visualizer.visualize(ast) + "\n")
+
+    def test_visualize_ast_to_stream(self):
+        out = io.StringIO()
+        self.assertIsNone(visualize_ast(parse("a + b"), "ascii", stream=out))
+        self.assertEqual(out.getvalue(), "BinaryOp(+)\n    ├── left: Variable(a)\n    └── right: Variable(b)\n")
+
+    def test_cutoffs(self):
+        ast = parse("1 + 2 * (3 - 4)")
+        text = ASCIITreeVisualizer().visualize(ast, max_depth=1)
+        self.assertEqual(text.split("\n"), ["BinaryOp(+)",
+                                            "    ├── left: Number(1)",
+                                            "    └── right: BinaryOp(*)",
+                                            "        └── ..."])
+        text = TextASTVisualizer().visualize(ast, max_nodes=2)
+        self.assertTrue(text.endswith("... (stopped after 2 nodes)"))
+        self.assertEqual(text.count("Node"), 2)
+
+        depth = 20000
+        ast = StackParser(tokenize("|" * depth + "x" + "|" * depth)).parse()
+        for visualizer in (TextASTVisualizer(), ASCIITreeVisualizer()):
+            out = io.StringIO()
+            self.assertEqual(visualizer.write(ast, out, max_nodes=100), 100)
+            self.assertLess(len(out.getvalue().split("\n")), 300)
+
+    def test_dot_output(self):
+        out = io.StringIO()
+        self.assertIsNone(visualize_ast(parse("a + 1"), "dot", stream=out))
+        self.assertEqual(out.getvalue().split("\n"), ['digraph AST {',
+                                                      '    node [shape=box fontname="Courier"]',
+                                                      '    n0 [label="BinaryOp(+)"]',
+                                                      '    n1 [label="Variable(a)"]',
+                                                      '    n0 -> n1 [label="left"]',
+                                                      '    n2 [label="Number(1)"]',
+                                                      '    n0 -> n2 [label="right"]',
+                                                      '}',
+                                                      ''])
+
+    def test_dot_shared_subtrees(self):
+        ast = NodeFactory().intern(parse("(a + b) * (a + b) - (a + b)"))
+        text = DOTASTVisualizer().visualize(ast)
+        self.assertEqual(len(re.findall(r"^    n\d+ \[label", text, re.MULTILINE)), 5)
+        self.assertEqual(len(re.findall(r"-> n2 ", text)), 3)
+
+    def test_dot_assignment_targets_are_not_merged(self):
+        text = DOTASTVisualizer().visualize(parse("|a = |b = |c = 1|||"))
+        self.assertEqual(re.findall(r'label="Variable\((\w)\)"', text), ['a', 'b', 'c'])
+
+        program = ProgramParser("; ".join(f"v{i} = {i}" for i in range(200)))
+        visualizer = DOTASTVisualizer()
+        for node in program.parse():
+            out = io.StringIO()
+            visualizer.write(node, out)
+            self.assertEqual(len(re.findall(r'label="Variable', out.getvalue())), 1)
+
+        # All targets in one tree, so temporaries from earlier assignments are freed mid-write
+        names = "".join(f"|v{i} = " for i in range(50))
+        text = DOTASTVisualizer().visualize(parse(names + "1" + "|" * 50))
+        self.assertEqual(len(re.findall(r'label="Variable', text)), 50)
+
+    def test_dot_cutoffs(self):
+        depth = 20000
+        ast = StackParser(tokenize("|" * depth + "x" + "|" * depth)).parse()
+        out = io.StringIO()
+        self.assertEqual(DOTASTVisualizer().write(ast, out, max_depth=3), 4)
+        self.assertIn("n3 -> c0", out.getvalue())
+        out = io.StringIO()
+        self.assertEqual(DOTASTVisualizer().write(ast, out), depth + 1)
+        out = io.StringIO()
+        self.assertEqual(DOTASTVisualizer().write(ast, out, max_nodes=10), 10)
+        self.assertIn("stopped after 10 nodes", out.getvalue())
+
+    def test_render_asts_writes_dot_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            prefix = os.path.join(directory, "ast")
+            futures = render_asts([parse("1 + 2"), parse("x")], prefix, workers=2)
+            self.assertEqual(len(futures), 2)
+            for future in futures:
+                try:
+                    self.assertTrue(future.result().endswith(".png"))
+                except FileNotFoundError:
+                    pass  # Graphviz is not installed
+            self.assertTrue(os.path.exists(prefix + "_1.dot"))
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestVectorEvaluator(unittest.TestCase):
+    def test_matches_scalar_evaluator(self):
+        xs = np.linspace(-3, 3, 25)
+        for text in ["2 * (x - 1)^3 + sin(x)", "|x - 7| % 3 + cos(x) / 2", "-x * x + 4!", "sqrt(x * x) + 1"]:
+            ast = parse(text)
+            result = VectorEvaluator({'x': xs}).evaluate(ast)
+            expected = [Evaluator({'x': float(x)}).evaluate(ast) for x in xs]
+            self.assertTrue(np.allclose(result, expected), text)
+
+    def test_assignment_binds_array(self):
+        evaluator = VectorEvaluator({'x': np.arange(4)})
+        result = evaluator.evaluate(parse("y = (x + 1) * 2"))
+        self.assertIs(evaluator.env['y'], result)
+        self.assertEqual(result.tolist(), [2.0, 4.0, 6.0, 8.0])
+        self.assertEqual(evaluator.evaluate(parse("y - x")).tolist(), [2.0, 3.0, 4.0, 5.0])
+
+    def test_inputs_are_not_overwritten(self):
+        xs = np.array([1.0, 2.0, 3.0])
+        VectorEvaluator({'x': xs}).evaluate(parse("-(x * 2) + |x|"))
+        self.assertEqual(xs.tolist(), [1.0, 2.0, 3.0])
+
+    def test_factorial(self):
+        values = factorial(np.array([0.0, 5.0, 3.5, -1.0, 200.0]))
+        self.assertEqual(values[:2].tolist(), [1.0, 120.0])
+        self.assertAlmostEqual(values[2], math.gamma(4.5))
+        self.assertTrue(np.isnan(values[3]))
+        self.assertTrue(np.isinf(values[4]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,8 @@
+import re
 from enum import Enum, auto
 
+from symbol_table import SymbolTable
+
 
 class TokenType(Enum):
     NUMBER = auto()
@@ -16,6 +19,8 @@ class TokenType(Enum):
     IDENTIFIER = auto()
     FUNCTION = auto()
     ABS_BAR = auto()
+    SEMICOLON = auto()
+    NEWLINE = auto()
     EOF = auto()
 
     def __repr__(self):
@@ -23,19 +28,54 @@ class TokenType(Enum):
 
 
 class Token:
-    def __init__(self, token_type, value):
+    __slots__ = ('type', 'value', 'start', 'end', 'source')
+
+    def __init__(self, token_type, value, start=None, end=None, source=None):
         self.type = token_type
         self.value = value
+        self.start = start
+        self.end = end
+        self.source = source
+
+    @property
+    def span(self):
+        return self.start, self.end
+
+    @property
+    def text(self):
+        # The lexeme is only sliced out of the source when asked for
+        if self.source is None or self.start is None:
+            return None if self.value is None else str(self.value)
+        return self.source[self.start:self.end]
 
     def __repr__(self):
         return f"Token({self.type}, {self.value})"
 
 
+SINGLE_CHAR_TOKENS = {
+    '+': TokenType.PLUS,
+    '-': TokenType.MINUS,
+    '*': TokenType.MULTIPLY,
+    '/': TokenType.DIVIDE,
+    '^': TokenType.POWER,
+    '!': TokenType.FACTORIAL,
+    '%': TokenType.MODULUS,
+    '(': TokenType.LPAREN,
+    ')': TokenType.RPAREN,
+    '=': TokenType.ASSIGN,
+    '|': TokenType.ABS_BAR,
+    ';': TokenType.SEMICOLON,
+}
+
+
 class Tokenizer:
-    def __init__(self, text):
+    def __init__(self, text, symbols=None, pos=0, newlines=False):
         self.text = text
-        self.pos = 0
-        self.current_char = self.text[self.pos] if self.text else None
+        self.symbols = symbols if symbols is not None else SymbolTable()
+        # Emit NEWLINE tokens instead of skipping line breaks as whitespace
+        self.newlines = newlines
+        self.pos = pos
+        self.current_char = self.text[self.pos] if self.pos < len(self.text) else None
 
     def error(self, message):
         raise Exception(f"Lexer error: {message} at position {self.pos}")
@@ -49,6 +89,8 @@ class Tokenizer:
 
     def skip_whitespace(self):
         while self.current_char is not None and self.current_char.isspace():
+            if self.newlines and self.current_char == '\n':
+                break
             self.advance()
 
     def parse_number(self):
@@ -69,114 +111,79 @@ class Tokenizer:
             self.error(f"Invalid number format: {result}")
 
     def parse_identifier(self):
-        result = ""
+        start = self.pos
 
         while self.current_char is not None and (self.current_char.isalnum() or self.current_char == '_'):
-            result += self.current_char
             self.advance()
 
-        # Check if it's a predefined function
-        functions = {'sin', 'cos', 'tan', 'log', 'sqrt'}
-        if result in functions:
-            return Token(TokenType.FUNCTION, result)
+        # Repeated names share one string object from the symbol table
+        return self.symbols.intern(self.text[start:self.pos])
 
-        return result
+    def make_token(self, token_type, value, start):
+        return Token(token_type, value, start, self.pos, self.text)
 
     def get_next_token(self):
         while self.current_char is not None:
+            start = self.pos
+
             if self.current_char.isspace():
+                if self.newlines and self.current_char == '\n':
+                    self.advance()
+                    return self.make_token(TokenType.NEWLINE, '\n', start)
                 self.skip_whitespace()
                 continue
 
             if self.current_char.isdigit() or self.current_char == '.':
-                return Token(TokenType.NUMBER, self.parse_number())
+                return self.make_token(TokenType.NUMBER, self.parse_number(), start)
 
             if self.current_char.isalpha() or self.current_char == '_':
                 identifier = self.parse_identifier()
-                if isinstance(identifier, Token):  # It's a function
-                    return identifier
-                return Token(TokenType.IDENTIFIER, identifier)
+                if identifier in self.symbols.functions:
+                    return self.make_token(TokenType.FUNCTION, identifier, start)
+                return self.make_token(TokenType.IDENTIFIER, identifier, start)
 
             # Handle operators
-            if self.current_char == '+':
-                self.advance()
-                return Token(TokenType.PLUS, '+')
-
-            if self.current_char == '-':
-                self.advance()
-                return Token(TokenType.MINUS, '-')
-
-            if self.current_char == '*':
-                self.advance()
-                return Token(TokenType.MULTIPLY, '*')
-
-            if self.current_char == '/':
-                self.advance()
-                return Token(TokenType.DIVIDE, '/')
-
-            if self.current_char == '^':
-                self.advance()
-                return Token(TokenType.POWER, '^')
-
-            if self.current_char == '!':
-                self.advance()
-                return Token(TokenType.FACTORIAL, '!')
-
-            if self.current_char == '%':
+            token_type = SINGLE_CHAR_TOKENS.get(self.current_char)
+            if token_type is not None:
+                char = self.current_char
                 self.advance()
-                return Token(TokenType.MODULUS, '%')
+                return self.make_token(token_type, char, start)
 
-            if self.current_char == '(':
-                self.advance()
-                return Token(TokenType.LPAREN, '(')
-
-            if self.current_char == ')':
-                self.advance()
-                return Token(TokenType.RPAREN, ')')
+            # If we get here, we have an unexpected character
+            self.error(f"Unexpected character: {self.current_char}")
 
-            if self.current_char == '=':
-                self.advance()
-                return Token(TokenType.ASSIGN, '=')
+        return self.make_token(TokenType.EOF, None, self.pos)
 
-            if self.current_char == '|':
-                self.advance()
-                return Token(TokenType.ABS_BAR, '|')
 
-            # If we get here, we have an unexpected character
-            self.error(f"Unexpected character: {self.current_char}")
+# Function names are not part of the pattern: identifiers are looked up in
+# the symbol table instead, so functions can be registered at runtime.
+TOKEN_PATTERNS = [
+    ('NUMBER', r'\d+(\.\d+)?'),
+    ('PLUS', r'\+'),
+    ('MINUS', r'-'),
+    ('MULTIPLY', r'\*'),
+    ('DIVIDE', r'/'),
+    ('POWER', r'\^'),
+    ('FACTORIAL', r'!'),
+    ('MODULUS', r'%'),
+    ('LPAREN', r'\('),
+    ('RPAREN', r'\)'),
+    ('ASSIGN', r'='),
+    ('ABS_BAR', r'\|'),
+    ('IDENTIFIER', r'[a-zA-Z_][a-zA-Z0-9_]*'),
+    ('WHITESPACE', r'\s+')
+]
 
-        return Token(TokenType.EOF, None)
+TOKEN_REGEX = re.compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern in TOKEN_PATTERNS))
 
 
 class RegexLexer:
-    def __init__(self, text):
-        import re
+    def __init__(self, text, symbols=None):
         self.text = text
+        self.symbols = symbols if symbols is not None else SymbolTable()
         self.tokens = []
         self.pos = 0
-
-        # Define token patterns
-        token_patterns = [
-            ('NUMBER', r'\d+(\.\d+)?'),
-            ('PLUS', r'\+'),
-            ('MINUS', r'-'),
-            ('MULTIPLY', r'\*'),
-            ('DIVIDE', r'/'),
-            ('POWER', r'\^'),
-            ('FACTORIAL', r'!'),
-            ('MODULUS', r'%'),
-            ('LPAREN', r'\('),
-            ('RPAREN', r'\)'),
-            ('ASSIGN', r'='),
-            ('ABS_BAR', r'\|'),
-            ('FUNCTION', r'(sin|cos|tan|log|sqrt)(?=\()'),  # functions followed by '('
-            ('IDENTIFIER', r'[a-zA-Z_][a-zA-Z0-9_]*'),
-            ('WHITESPACE', r'\s+')
-        ]
-
-        # Build the regex pattern
-        pattern = '|'.join(f'(?P<{name}>{pattern})' for name, pattern in token_patterns)
-        self.regex = re.compile(pattern)
+        self.regex = TOKEN_REGEX
 
         # Tokenize the input
         self.tokenize()
@@ -197,12 +204,18 @@ class RegexLexer:
                 if token_type == TokenType.NUMBER:
                     value = float(value) if '.' in value else int(value)
 
-                self.tokens.append(Token(token_type, value))
+                # Functions are only recognised when directly followed by '('
+                elif token_type == TokenType.IDENTIFIER:
+                    value = self.symbols.intern(value)
+                    if value in self.symbols.functions and self.text.startswith('(', match.end()):
+                        token_type = TokenType.FUNCTION
+
+                self.tokens.append(Token(token_type, value, pos, match.end(), self.text))
 
             pos = match.end()
 
         # Add EOF token
-        self.tokens.append(Token(TokenType.EOF, None))
+        self.tokens.append(Token(TokenType.EOF, None, pos, pos, self.text))
 
     def get_next_token(self):
         if self.pos < len(self.tokens):
@@ -212,8 +225,8 @@ class RegexLexer:
         return Token(TokenType.EOF, None)
 
 
-def tokenize(text, use_regex=False):
-    lexer = RegexLexer(text) if use_regex else Tokenizer(text)
+def tokenize(text, use_regex=False, symbols=None):
+    lexer = RegexLexer(text, symbols) if use_regex else Tokenizer(text, symbols)
     tokens = []
 
     if use_regex:
@@ -0,0 +1,196 @@
+import math
+
+import numpy as np
+
+from tokenizer import TokenType
+from ast_nodes import (
+    BinaryOpNode,
+    UnaryOpNode,
+    NumberNode,
+    VariableNode,
+    AssignmentNode,
+    FunctionCallNode,
+    AbsoluteValueNode
+)
+
+# n! for every n whose factorial fits in a float64; larger ones overflow to inf
+FACTORIAL_TABLE = np.array([math.factorial(n) for n in range(171)], dtype=np.float64)
+
+_gamma = np.vectorize(lambda value: math.gamma(value) if value < 171.6 else math.inf, otypes=[np.float64])
+
+
+def factorial(values, out=None):
+    # Whole numbers come from the lookup table, fractions from the gamma function
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(values.shape, np.nan)
+
+    whole = values == np.floor(values)
+    small = whole & (values >= 0) & (values < len(FACTORIAL_TABLE))
+    result[small] = FACTORIAL_TABLE[values[small].astype(np.intp)]
+    result[whole & (values >= len(FACTORIAL_TABLE))] = np.inf
+
+    fractional = ~whole & np.isfinite(values)
+    if fractional.any():
+        result[fractional] = _gamma(values[fractional] + 1)
+
+    if out is None:
+        return result
+    out[...] = result
+    return out
+
+
+FUNCTIONS = {
+    'sin': np.sin,
+    'cos': np.cos,
+    'tan': np.tan,
+    'log': np.log,
+    'sqrt': np.sqrt,
+}
+
+BINARY_UFUNCS = {
+    TokenType.PLUS: np.add,
+    TokenType.MINUS: np.subtract,
+    TokenType.MULTIPLY: np.multiply,
+    TokenType.DIVIDE: np.true_divide,
+    TokenType.MODULUS: np.remainder,
+    TokenType.POWER: np.power,
+}
+
+UNARY_UFUNCS = {
+    TokenType.MINUS: np.negative,
+    TokenType.FACTORIAL: factorial,
+}
+
+
+class VectorEvaluator:
+    def __init__(self, env=None, functions=None):
+        # Variables bind to arrays (or scalars, which broadcast)
+        self.env = env if env is not None else {}
+        self.functions = functions if functions is not None else dict(FUNCTIONS)
+
+        self.dispatch = {
+            NumberNode: self.eval_number,
+            VariableNode: self.eval_variable,
+            BinaryOpNode: self.eval_binary_op,
+            UnaryOpNode: self.eval_unary_op,
+            AssignmentNode: self.eval_assignment,
+            FunctionCallNode: self.eval_function_call,
+            AbsoluteValueNode: self.eval_absolute_value,
+        }
+
+    def error(self, message):
+        raise Exception(f"Evaluator error: {message}")
+
+    def evaluate(self, root):
+        # Count parents so a subtree shared by several of them is never overwritten
+        uses = {}
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            uses[id(node)] = uses.get(id(node), 0) + 1
+            if uses[id(node)] == 1:
+                stack.extend(getattr(node, field) for field in node.child_fields)
+
+        self.uses = uses
+        # Temporaries this evaluation allocated and may still overwrite
+        self.owned = set()
+        # Spare temporaries by shape, handed out again instead of allocating
+        self.pool = {}
+
+        # Children's results wait on a value stack for their parent; memo
+        # reuses a shared subtree's result until an assignment clears it
+        values = []
+        self.memo = {}
+        stack = [(root, False)]
+        with np.errstate(all='ignore'):
+            while stack:
+                node, expanded = stack.pop()
+                if not expanded:
+                    result = self.memo.get(id(node), self.memo)
+                    if result is not self.memo:
+                        values.append(result)
+                        continue
+                    if node.child_fields:
+                        stack.append((node, True))
+                        for field in reversed(node.child_fields):
+                            stack.append((getattr(node, field), False))
+                        continue
+
+                handler = self.dispatch.get(node.__class__)
+                if handler is None:
+                    self.error(f"Unsupported node: {node.__class__.__name__}")
+                count = len(node.child_fields)
+                args = values[len(values) - count:]
+                del values[len(values) - count:]
+                result = handler(node, *args)
+                if uses[id(node)] > 1:
+                    self.owned.discard(id(result))
+                self.memo[id(node)] = result
+                values.append(result)
+
+        return values[-1]
+
+    def output(self, shape, *operands):
+        # Write into an operand we own when its shape matches, else into a pooled buffer
+        out = None
+        for operand in operands:
+            if id(operand) in self.owned and operand.shape == shape:
+                if out is None:
+                    out = operand
+                    continue
+            self.release(operand)
+        if out is not None or shape == ():
+            return out
+
+        spare = self.pool.get(shape)
+        out = spare.pop() if spare else np.empty(shape)
+        self.owned.add(id(out))
+        return out
+
+    def release(self, operand):
+        if id(operand) in self.owned:
+            self.owned.discard(id(operand))
+            self.pool.setdefault(operand.shape, []).append(operand)
+
+    def eval_number(self, node):
+        return float(node.value)
+
+    def eval_variable(self, node):
+        try:
+            value = self.env[node.name]
+        except KeyError:
+            self.error(f"Undefined variable: {node.name}")
+        return np.asarray(value, dtype=np.float64)
+
+    def eval_binary_op(self, node, left, right):
+        ufunc = BINARY_UFUNCS.get(node.op.type)
+        if ufunc is None:
+            self.error(f"Unsupported binary operator: {node.op.value}")
+        shape = np.broadcast_shapes(np.shape(left), np.shape(right))
+        return ufunc(left, right, out=self.output(shape, left, right))
+
+    def apply(self, function, operand):
+        return function(operand, out=self.output(np.shape(operand), operand))
+
+    def eval_unary_op(self, node, operand):
+        function = UNARY_UFUNCS.get(node.op.type)
+        if function is None:
+            self.error(f"Unsupported unary operator: {node.op.value}")
+        return self.apply(function, operand)
+
+    def eval_assignment(self, node, value):
+        # The environment now refers to the array, so it must not be reused
+        self.owned.discard(id(value))
+        self.env[node.variable] = value
+        # Results remembered so far may depend on the old value of the variable
+        self.memo.clear()
+        return value
+
+    def eval_function_call(self, node, argument):
+        function = self.functions.get(node.name)
+        if function is None:
+            self.error(f"Unknown function: {node.name}")
+        return self.apply(function, argument)
+
+    def eval_absolute_value(self, node, operand):
+        return self.apply(np.absolute, operand)